@@ -3,22 +3,58 @@ import os
 from pathlib import Path
 from flask import Flask, jsonify
 
-from .extensions import db, alembic, jwt, ma, swagger
+from .extensions import db, alembic, jwt, ma
+from .aio import async_views
+from .availability import availability
+from .cache import cache
 from .cli import register_cli
+from .conditional import NotModified, set_validators
+from .docs import api_docs
+from .engines import configure_engines, init_engines
+from .events import events
+from .hashing import hasher, HasherBusy
+from .instrumentation import instrumentation
+from .jobs import jobs
+from .likes import likes
+from .metrics import metrics
+from .replicas import router
+from .revocation import denylist
+from .serializers import init_json
+from .timeline import timeline
+from .trending import trending
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DOCS_DIR = os.path.join(BASE_DIR, 'docs/')
 
 
-def create_app(config_file='config.py'):
+def create_app(config_file='config.py', config=None):
     app = Flask(__name__)
     app.config.from_pyfile(config_file)
+    if config:
+        app.config.update(config)
 
+    init_json(app)
+    configure_engines(app)
     db.init_app(app)
+    init_engines(app)
+    router.init_app(app)
+    async_views.init_app(app)
+    instrumentation.init_app(app)
     alembic.init_app(app)
     jwt.init_app(app)
+    denylist.init_app(app)
     ma.init_app(app)
-    swagger.init_app(app)
+    api_docs.init_app(app)
+
+    cache.init_app(app)
+    hasher.init_app(app)
+    jobs.init_app(app)
+    events.init_app(app)
+    timeline.init_app(app)
+    likes.init_app(app)
+    availability.init_app(app)
+    trending.init_app(app)
+    metrics.init_app(app)
 
     register_cli(app)
 
@@ -30,12 +66,46 @@ def create_app(config_file='config.py'):
             status=404,
         ), 404
 
+    @app.errorhandler(NotModified)
+    def not_modified(error):
+        return '', 304
+
+    app.after_request(set_validators)
+
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(error):
+        return (
+            jsonify(
+                error='Service unavailable',
+                message='The server is busy, try again shortly',
+                status=503,
+            ),
+            503,
+            {'Retry-After': '1'},
+        )
+
     from .routes.auth import auth_bp
     from .routes.users import users_bp
     from .routes.posts import posts_bp
+    from .routes.feed import feed_bp
+    from .routes.tags import tags_bp
+    from .routes.stream import stream_bp
+    from .routes.cache import cache_bp
+    from .routes.health import health_bp
+    from .routes.metrics import metrics_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
     app.register_blueprint(posts_bp)
+    app.register_blueprint(feed_bp)
+    app.register_blueprint(tags_bp)
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(cache_bp)
+    app.register_blueprint(health_bp)
+    if app.config['METRICS']:
+        app.register_blueprint(metrics_bp)
+
+    if app.config['ASYNC_VIEWS']:
+        async_views.wrap_views(app)
 
     return app
@@ -0,0 +1,173 @@
+import asyncio
+import inspect
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from flask import current_app, g
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.extensions import RoutingSession, db
+
+
+class _State:
+    """Per-app event loop and async session factory"""
+
+    def __init__(self, sessionmaker):
+        self.sessionmaker = sessionmaker
+        self.lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self.thread = None
+
+    def loop(self):
+        # A loop inherited through fork has no thread running it, start anew
+        if self._loop is None or self._pid != os.getpid():
+            with self.lock:
+                if self._loop is None or self._pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    self.thread = threading.Thread(
+                        target=loop.run_forever, name='async-views', daemon=True
+                    )
+                    self.thread.start()
+                    self._loop = loop
+                    self._pid = os.getpid()
+        return self._loop
+
+
+class AsyncViews:
+    """Async serving mode, enabled with `ASYNC_VIEWS`.
+
+    The views are the same functions as in the sync mode. `wrap_views`
+    turns each into a coroutine that calls it through `AsyncSession.run_sync`
+    on a session of the `SQLALCHEMY_ASYNC_ENGINES` default engine. Inside,
+    `db.session` is that session's sync facade, so the view's queries (and
+    its password hashing, see `app.hashing`) are awaited on an event loop
+    by the async driver instead of blocking. Flask would run each async
+    view in a fresh event loop, which an asyncpg pool cannot survive, so
+    every view of a process runs on one long-lived loop instead.
+
+    Flask stays a WSGI framework though: the thread that dispatched a
+    request waits for its view to return, so a worker serves at most
+    `ASYNC_VIEWS_THREADS` requests at once (see `AsgiApp`), as a threaded
+    sync worker with as many threads would. What the ASGI server adds is
+    that connections, and slow clients sending request bodies, wait on its
+    event loop without holding one of them.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASYNC_VIEWS', False)
+        app.config.setdefault('ASYNC_VIEWS_THREADS', 64)
+        if not app.config['ASYNC_VIEWS']:
+            return
+
+        with app.app_context():
+            sessionmaker = async_sessionmaker(
+                db.async_engine, sync_session_class=RoutingSession
+            )
+        app.extensions['async_views'] = _State(sessionmaker)
+
+        # Flask's documented hook for how coroutines are run
+        app.async_to_sync = self.async_to_sync
+        app.teardown_appcontext(self._close_session)
+
+    def wrap_views(self, app):
+        """Serve the app's registered views through `run_sync`. Call once
+        every blueprint is registered.
+        """
+        for endpoint, view in app.view_functions.items():
+            if endpoint != 'static' and not inspect.iscoroutinefunction(view):
+                app.view_functions[endpoint] = self._wrap(view)
+
+    def _wrap(self, view):
+        @wraps(view)
+        async def run(*args, **kwargs):
+            return await self.session.run_sync(lambda _: view(*args, **kwargs))
+
+        return run
+
+    @property
+    def state(self):
+        return current_app.extensions['async_views']
+
+    @property
+    def session(self):
+        """The async session for the current app context"""
+        if 'async_session' not in g:
+            g.async_session = self.state.sessionmaker()
+        return g.async_session
+
+    def async_to_sync(self, func):
+        state = self.state
+        loop = state.loop()
+
+        def run(*args, **kwargs):
+            if threading.current_thread() is state.thread:
+                raise RuntimeError('Cannot block the async views loop on itself.')
+            # The coroutine runs in a copy of this thread's context, so the
+            # request and app contexts are available to it
+            coro = func(*args, **kwargs)
+            return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+        return run
+
+    def iterate(self, items):
+        """Consume an iterator that uses `db.session`, such as a streamed
+        response body, one `run_sync` round trip to the views loop per item
+        """
+        run = current_app.async_to_sync(self.session.run_sync)
+        done = object()
+        while (item := run(lambda _: next(items, done))) is not done:
+            yield item
+
+    async def _close_session(self, error):
+        session = g.pop('async_session', None)
+        if session is not None:
+            await session.close()
+
+
+class _AsgiRequest(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, duplicate_header_limit, executor):
+        super().__init__(wsgi_application, duplicate_header_limit)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        # The plain function under asgiref's thread-sensitive wrapper
+        run = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+        await sync_to_async(run, thread_sensitive=False, executor=self.executor)(
+            self, body
+        )
+
+
+class AsgiApp(WsgiToAsgi):
+    """The app as an ASGI application, for `asgi.py`.
+
+    asgiref's `WsgiToAsgi` calls the app through a thread-sensitive
+    `sync_to_async`, which runs every request of the process on one
+    thread, so requests took turns however many the server had in flight.
+    Here each request runs on a pool of `ASYNC_VIEWS_THREADS` threads,
+    where it mostly waits on the views loop; that bounds how many requests
+    a worker serves at once.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.executor = ThreadPoolExecutor(
+            app.config['ASYNC_VIEWS_THREADS'], thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        request = _AsgiRequest(
+            self.wsgi_application, self.duplicate_header_limit, self.executor
+        )
+        await request(scope, receive, send)
+
+
+async_views = AsyncViews()
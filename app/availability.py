@@ -0,0 +1,148 @@
+import hashlib
+import math
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models import User
+from app.snapshot import Snapshot
+
+FIELDS = {'username': User.username, 'email': User.email}
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings. `in` can return a false
+    positive at about `error_rate` once `capacity` items are added, never
+    a false negative.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(
+            math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8
+        )
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class Availability:
+    """Answers "is this username or email taken" mostly from memory.
+
+    A Bloom filter of every lower-cased username and email is built at
+    startup (or on first use, if the tables did not exist yet) and then
+    rebuilt every `AVAILABILITY_REFRESH_SECONDS`. A miss in the filter
+    means the name is free; a hit is confirmed against the database. Each
+    worker has its own filter and only sees other workers' sign-ups after a
+    rebuild, so a name can briefly show as free when it is not. Sign-up
+    itself relies on the unique indexes, not on this.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AVAILABILITY_CAPACITY', 1_000_000)
+        app.config.setdefault('AVAILABILITY_ERROR_RATE', 0.01)
+        app.config.setdefault('AVAILABILITY_REFRESH_SECONDS', 300)
+        app.extensions['availability'] = Snapshot()
+
+        with app.app_context():
+            try:
+                self.warm()
+            except SQLAlchemyError:
+                # No users table yet, e.g. before `flask db upgrade`
+                app.logger.info('Availability filter not warmed at startup')
+
+    @property
+    def state(self):
+        return current_app.extensions['availability']
+
+    @property
+    def stale(self):
+        return self.state.stale(current_app.config['AVAILABILITY_REFRESH_SECONDS'])
+
+    def warm(self, session=None):
+        """Rebuild the filter from the users table. Concurrent callers
+        return at once and keep using the current filter.
+        """
+        session = session or db.session
+
+        def build():
+            count = session.scalar(select(func.count()).select_from(User))
+            bloom = BloomFilter(
+                max(current_app.config['AVAILABILITY_CAPACITY'], 2 * count),
+                current_app.config['AVAILABILITY_ERROR_RATE'],
+            )
+            rows = session.execute(
+                select(
+                    func.lower(User.username), func.lower(User.email)
+                ).execution_options(yield_per=10000)
+            )
+            for username, email in rows:
+                bloom.add(f'username:{username}')
+                bloom.add(f'email:{email}')
+            return bloom
+
+        self.state.rebuild(build, BloomFilter.add)
+
+    def add(self, username, email):
+        """Record a committed sign-up"""
+        items = (f'username:{username.lower()}', f'email:{email.lower()}')
+        self.state.record(items, BloomFilter.add)
+
+    def might_exist(self, field, value):
+        """False only when `value` is certainly not taken"""
+        bloom = self.state.value
+        return bloom is None or f'{field}:{value.lower()}' in bloom
+
+    def lookup(self, field, value):
+        """Case-insensitive lookup, served by the `lower()` indexes"""
+        column = FIELDS[field]
+        return select(User.id).where(func.lower(column) == value.lower()).limit(1)
+
+    def taken(self, field, value, session=None):
+        if not self.might_exist(field, value):
+            return False
+        return (session or db.session).scalar(self.lookup(field, value)) is not None
+
+
+def duplicate_field(error):
+    """'email' or 'username', whichever unique index an `IntegrityError`
+    from inserting a user violated, or None for any other integrity error
+    """
+    orig = error.orig
+    # psycopg2 and asyncpg name the constraint, SQLite only has the message
+    constraint = getattr(getattr(orig, 'diag', None), 'constraint_name', None)
+    constraint = constraint or getattr(orig.__cause__, 'constraint_name', None)
+    if constraint is None:
+        message = str(orig)
+        if not message.startswith('UNIQUE constraint failed'):
+            return None
+        constraint = message
+    return next((field for field in ('email', 'username') if field in constraint), None)
+
+
+availability = Availability()
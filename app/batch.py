@@ -0,0 +1,67 @@
+from flask import current_app, request
+from sqlalchemy import select
+
+from app.cache import cache
+from app.extensions import db
+
+DEFAULT_MAX_IDS = 100
+
+
+def batch_ids(arg='ids'):
+    """Read ids from the query string, as `ids=1,2,3` or repeated.
+
+    Returns the unique ids in request order. Raises ValueError on bad input
+    or more than `BATCH_MAX_IDS` ids.
+    """
+    maximum = current_app.config.get('BATCH_MAX_IDS', DEFAULT_MAX_IDS)
+
+    try:
+        ids = [
+            int(part)
+            for value in request.args.getlist(arg)
+            for part in value.split(',')
+            if part.strip()
+        ]
+    except ValueError:
+        raise ValueError(f'{arg} must be a comma separated list of integers') from None
+
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError(f'{arg} is required')
+    if len(ids) > maximum:
+        raise ValueError(f'At most {maximum} ids per request')
+    return ids
+
+
+def cached_payloads(ids, key):
+    """Cached payloads by id, fetched in one round trip, and the ids that
+    missed
+    """
+    values = cache.get_many([key(id) for id in ids])
+    payloads = {id: value for id, value in zip(ids, values) if value is not None}
+    return payloads, [id for id in ids if id not in payloads]
+
+
+def store_payloads(rows, key, schema):
+    """Serialize rows in one pass and cache them. Returns payloads by id."""
+    payloads = {payload['id']: payload for payload in schema.dump(rows, many=True)}
+    if payloads:
+        cache.set_many({key(id): payload for id, payload in payloads.items()})
+    return payloads
+
+
+def ordered(ids, payloads):
+    """`(found, missing)` with found payloads in request order"""
+    found = [payloads[id] for id in ids if id in payloads]
+    return found, [id for id in ids if id not in payloads]
+
+
+def batch_resources(ids, key, model, schema):
+    """Resolve ids through the cache, then one `WHERE id IN (...)` query for
+    the misses. Returns `(found, missing)`.
+    """
+    payloads, misses = cached_payloads(ids, key)
+    if misses:
+        rows = db.session.scalars(select(model).where(model.id.in_(misses))).all()
+        payloads.update(store_payloads(rows, key, schema))
+    return ordered(ids, payloads)
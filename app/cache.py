@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from flask import current_app
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class MemoryCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Each worker process has its own copy, so invalidation only reaches the
+    worker that handled the write; other workers may serve a stale entry
+    for up to `ttl` seconds.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < now:
+            del self._data[key]
+            self.stats.misses += 1
+            self.stats.evictions += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key, time.monotonic())
+
+    def get_many(self, keys):
+        with self._lock:
+            now = time.monotonic()
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, mapping):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl
+            for key, value in mapping.items():
+                self._data[key] = (value, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Cache shared by all workers, stored in Redis as JSON with a TTL.
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url, ttl=60, prefix='cache:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "CACHE_BACKEND = 'redis' requires the 'redis' package"
+            ) from e
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return json.loads(raw)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        values = []
+        for raw in self._client.mget([self.prefix + key for key in keys]):
+            if raw is None:
+                self.stats.misses += 1
+                values.append(None)
+            else:
+                self.stats.hits += 1
+                values.append(json.loads(raw))
+        return values
+
+    def set(self, key, value):
+        self._client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def set_many(self, mapping):
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+        pipeline.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def __len__(self):
+        return 0
+
+
+class NullCache:
+    """Caches nothing, every lookup is a miss"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key):
+        self.stats.misses += 1
+        return None
+
+    def get_many(self, keys):
+        self.stats.misses += len(keys)
+        return [None] * len(keys)
+
+    def set(self, key, value):
+        pass
+
+    def set_many(self, mapping):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class Cache:
+    """Read-through cache for serialized API payloads.
+
+    The backend is picked by `CACHE_BACKEND`: `memory` (default), `redis`
+    or `null`. Values must be JSON-serializable.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memory')
+        app.config.setdefault('CACHE_TTL', 60)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'memory':
+            app.extensions['cache'] = MemoryCache(
+                app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_TTL']
+            )
+        elif backend == 'redis':
+            app.extensions['cache'] = RedisCache(
+                app.config['CACHE_REDIS_URL'], app.config['CACHE_TTL']
+            )
+        elif backend == 'null':
+            app.extensions['cache'] = NullCache()
+        else:
+            raise RuntimeError(f'Unknown CACHE_BACKEND {backend!r}')
+
+    @property
+    def backend(self):
+        return current_app.extensions['cache']
+
+    def get_or_set(self, key, load):
+        """Return the cached value for `key`, calling `load` on a miss.
+        Exceptions from `load` (e.g. a 404 abort) are not cached.
+        """
+        value = self.backend.get(key)
+        if value is None:
+            value = load()
+            self.backend.set(key, value)
+        return value
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def get_many(self, keys):
+        """Values for `keys` in one round trip, None for each miss"""
+        return self.backend.get_many(keys)
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def set_many(self, mapping):
+        self.backend.set_many(mapping)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def stats(self):
+        return {
+            'backend': current_app.config['CACHE_BACKEND'],
+            'size': len(self.backend),
+            **self.backend.stats.as_dict(),
+        }
+
+
+def user_key(id, private=False):
+    return f'user:{id}:{"private" if private else "public"}'
+
+
+def post_key(id):
+    return f'post:{id}'
+
+
+cache = Cache()
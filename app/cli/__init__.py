@@ -1,5 +1,17 @@
+from .counters import counters
+from .docs import docs
 from .seed import seed
+from .tags import tags
+from .timelines import timelines
+from .tokens import tokens
+from .worker import worker
 
 
 def register_cli(app):
+    app.cli.add_command(counters)
+    app.cli.add_command(docs)
     app.cli.add_command(seed)
+    app.cli.add_command(tags)
+    app.cli.add_command(timelines)
+    app.cli.add_command(tokens)
+    app.cli.add_command(worker)
@@ -0,0 +1,27 @@
+import click
+
+from app.counters import COUNTERS, recount_all
+
+
+@click.group()
+def counters():
+    """Denormalized user counter commands"""
+    pass
+
+
+@counters.command('backfill')
+@click.option('--batch-size', default=1000, show_default=True)
+def backfill_counters(batch_size):
+    """Recompute every user's counters, e.g. after adding one"""
+    users = sum(len(changed) for changed in recount_all(batch_size, only_drifted=False))
+    click.echo(f'Recounted {", ".join(COUNTERS)} for {users} users')
+
+
+@counters.command('reconcile')
+@click.option('--batch-size', default=1000, show_default=True)
+def reconcile_counters(batch_size):
+    """Fix counters that drifted from the rows they count. Safe to run
+    periodically, users whose counters are right are not written.
+    """
+    users = sum(len(changed) for changed in recount_all(batch_size))
+    click.echo(f'Fixed drifted counters for {users} users')
@@ -0,0 +1,22 @@
+import click
+
+from flask import current_app
+
+from app.docs import api_docs
+
+
+@click.group()
+def docs():
+    """API docs commands"""
+    pass
+
+
+@docs.command('build')
+def build_docs():
+    """Compile docs/**/*.yml into the spec artifact served by /apispec_1.json"""
+    if not current_app.config['API_DOCS']:
+        raise click.UsageError('API_DOCS is off, there is no spec to build')
+
+    path, specs = api_docs.build(current_app)
+    paths = sum(len(spec['paths']) for spec in specs.values())
+    click.echo(f'Wrote {paths} paths to {path}')
@@ -1,9 +1,46 @@
+import csv
+import io
+import itertools
+import random
+
+from datetime import datetime, timedelta
+from datetime import UTC
+
 import click
 
+from flask import current_app
+from sqlalchemy import func, insert, select, text, update
 from sqlalchemy.exc import IntegrityError
 
+from app.counters import actual_count
 from app.extensions import db
-from app.models import User
+from app.hashing import hasher
+from app.models import Follow, Post, TimelineEntry, User
+from app.tags import reindex
+
+FIRST_NAMES = [
+    'Alice', 'Bob', 'Carol', 'Dave', 'Erin', 'Frank', 'Grace', 'Heidi', 'Ivan',
+    'Judy', 'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent',
+    'Victor', 'Walter', 'Yasmin',
+]  # fmt: skip
+LAST_NAMES = [
+    'Smith', 'Jones', 'Garcia', 'Miller', 'Davis', 'Lopez', 'Wilson', 'Taylor',
+    'Moore', 'Clark', 'Lewis', 'Walker', 'Young', 'King', 'Wright', 'Scott',
+]  # fmt: skip
+LOCATIONS = [
+    'USA', 'Canada', 'Mexico', 'Brazil', 'Germany', 'France', 'Spain', 'Poland',
+    'Ukraine', 'India', 'Japan', 'Kenya', 'Australia', 'Norway',
+]  # fmt: skip
+WORDS = (
+    'the quick brown fox jumps over lazy dog today coffee morning code python '
+    'flask database index query cache latency deploy weekend music travel '
+    'photo sunset mountain river city friends family dinner book movie game '
+    'team launch idea build ship learn write read think dream run walk'
+).split()
+TAGS = [
+    'python', 'flask', 'travel', 'music', 'food', 'coding', 'photography',
+    'sports', 'news', 'art', 'books', 'gaming', 'fitness', 'nature', 'tech',
+]  # fmt: skip
 
 
 @click.group()
@@ -25,3 +62,234 @@ def seed_users():
         click.echo('u already seeded users!')
         return db.session.rollback()
     click.echo('Seeded users!')
+
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def generate_users(rng, first_id, count, password_hash, start):
+    for id in range(first_id, first_id + count):
+        created_at = start + timedelta(seconds=rng.randrange(86400 * 30))
+        yield {
+            'id': id,
+            'username': f'user{id}',
+            'email': f'user{id}@example.com',
+            'password_hash': password_hash,
+            'display_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'bio': _sentence(rng, 3, 20).capitalize(),
+            'location': rng.choice(LOCATIONS),
+            'follower_count': 0,
+            'post_count': 0,
+            'created_at': created_at,
+            'updated_at': created_at,
+        }
+
+
+def generate_posts(rng, first_user_id, users, posts_per_user, first_id, start):
+    id = first_id
+    for user_id in range(first_user_id, first_user_id + users):
+        for _ in range(posts_per_user):
+            created_at = start + timedelta(seconds=rng.randrange(86400 * 365))
+            content = _sentence(rng, 5, 60).capitalize()
+            if rng.random() < 0.3:
+                content += ' ' + ' '.join(
+                    f'#{tag}' for tag in rng.sample(TAGS, rng.randint(1, 3))
+                )
+            if rng.random() < 0.1:
+                mention = rng.randrange(first_user_id, first_user_id + users)
+                content += f' @user{mention}'
+            yield {
+                'id': id,
+                'title': _sentence(rng, 1, 6)[:50],
+                'content': content,
+                'user_id': user_id,
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+            id += 1
+
+
+def generate_follows(rng, first_user_id, users, follows_per_user, start):
+    follows_per_user = min(follows_per_user, users - 1)
+    for offset in range(users):
+        # Sample among everyone else by skipping over our own offset
+        for other in sorted(rng.sample(range(users - 1), follows_per_user)):
+            other += other >= offset
+            yield {
+                'follower_id': first_user_id + offset,
+                'followee_id': first_user_id + other,
+                'created_at': start + timedelta(seconds=rng.randrange(86400 * 365)),
+            }
+
+
+def _csv_value(value):
+    if value is None:
+        return ''  # NULL in COPY's csv format
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _copy_chunk(conn, table, columns, chunk):
+    """Load one chunk with PostgreSQL COPY, much faster than INSERT"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chunk:
+        writer.writerow([_csv_value(row[c]) for c in columns])
+    buffer.seek(0)
+
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(
+        f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+        buffer,
+    )
+
+
+def load_rows(conn, model, rows, total, chunk_size, use_copy):
+    """Stream rows into a table in chunks, committing after each one"""
+    table = model.__table__
+    with click.progressbar(length=total, label=f'{table.name:<10}') as bar:
+        for chunk in itertools.batched(rows, chunk_size):
+            if use_copy:
+                _copy_chunk(conn, table, list(chunk[0]), chunk)
+            else:
+                conn.execute(insert(table), chunk)
+            conn.commit()
+            bar.update(len(chunk))
+
+
+def load_timelines(conn, first_user_id, last_user_id, chunk_size):
+    """Push the followees' posts into the home timelines of users with ids
+    in `[first_user_id, last_user_id]`, each cut to its newest
+    `TIMELINE_MAX_LENGTH` entries as the app keeps them. Commits per range
+    of followers small enough for at most `chunk_size` entries.
+    """
+    max_length = current_app.config['TIMELINE_MAX_LENGTH']
+    followers = max(chunk_size // max_length, 1)
+    firsts = range(first_user_id, last_user_id + 1, followers)
+    with click.progressbar(firsts, label=f'{"timelines":<10}') as bar:
+        for first in bar:
+            last = min(first + followers - 1, last_user_id)
+            ranked = (
+                select(
+                    Follow.follower_id,
+                    Post.id,
+                    Post.user_id,
+                    Post.created_at,
+                    func.row_number()
+                    .over(
+                        partition_by=Follow.follower_id,
+                        order_by=(Post.created_at.desc(), Post.id.desc()),
+                    )
+                    .label('position'),
+                )
+                .join(Post, Post.user_id == Follow.followee_id)
+                .where(Follow.follower_id.between(first, last))
+                .subquery()
+            )
+            conn.execute(
+                insert(TimelineEntry).from_select(
+                    ['user_id', 'post_id', 'author_id', 'created_at'],
+                    select(
+                        ranked.c.follower_id,
+                        ranked.c.id,
+                        ranked.c.user_id,
+                        ranked.c.created_at,
+                    ).where(ranked.c.position <= max_length),
+                )
+            )
+            conn.commit()
+
+
+@seed.command('bulk')
+@click.option('--users', default=1000, show_default=True, help='Users to create')
+@click.option('--posts-per-user', default=20, show_default=True)
+@click.option('--follows', default=50, show_default=True, help='Follows per user')
+@click.option('--chunk-size', default=5000, show_default=True)
+@click.option('--seed', 'rng_seed', default=42, show_default=True, help='RNG seed')
+@click.option('--password', default='password123', show_default=True)
+@click.option(
+    '--timelines/--no-timelines',
+    default=False,
+    help='Precompute home timelines for the seeded follows, up to '
+    'TIMELINE_MAX_LENGTH entries each',
+)
+@click.option(
+    '--copy/--no-copy',
+    'use_copy',
+    default=True,
+    help='Use COPY on PostgreSQL instead of batched INSERTs',
+)
+def seed_bulk(
+    users, posts_per_user, follows, chunk_size, rng_seed, password, timelines, use_copy
+):
+    """Generate deterministic synthetic data for load testing"""
+    rng = random.Random(rng_seed)
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+
+    # Every user shares one hash, hashing per user would dominate the run
+    password_hash = hasher.hash(password)
+
+    with db.engine.connect() as conn:
+        first_user_id = (conn.scalar(select(func.max(User.id))) or 0) + 1
+        first_post_id = (conn.scalar(select(func.max(Post.id))) or 0) + 1
+        use_copy = use_copy and conn.dialect.name == 'postgresql'
+
+        load_rows(
+            conn,
+            User,
+            generate_users(rng, first_user_id, users, password_hash, start),
+            users,
+            chunk_size,
+            use_copy,
+        )
+        load_rows(
+            conn,
+            Post,
+            generate_posts(
+                rng, first_user_id, users, posts_per_user, first_post_id, start
+            ),
+            users * posts_per_user,
+            chunk_size,
+            use_copy,
+        )
+        load_rows(
+            conn,
+            Follow,
+            generate_follows(rng, first_user_id, users, follows, start),
+            users * min(follows, max(users - 1, 0)),
+            chunk_size,
+            use_copy,
+        )
+
+        last_user_id = first_user_id + users - 1
+        conn.execute(
+            update(User)
+            .where(User.id.between(first_user_id, last_user_id))
+            .values(
+                follower_count=actual_count('follower_count'),
+                post_count=actual_count('post_count'),
+            )
+        )
+        last_post_id = first_post_id + users * posts_per_user - 1
+        for first in range(first_post_id, last_post_id + 1, chunk_size):
+            reindex(first, min(first + chunk_size - 1, last_post_id), conn)
+        if timelines:
+            load_timelines(conn, first_user_id, last_user_id, chunk_size)
+
+        # Explicit ids do not advance PostgreSQL sequences
+        if conn.dialect.name == 'postgresql':
+            for table in ('users', 'posts'):
+                conn.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f'(SELECT max(id) FROM {table}))'
+                    )
+                )
+        conn.commit()
+
+    click.echo(
+        f'Seeded {users} users, {users * posts_per_user} posts and '
+        f'{users * min(follows, max(users - 1, 0))} follows!'
+    )
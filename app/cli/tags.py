@@ -0,0 +1,17 @@
+import click
+
+from app.tags import reindex_all
+
+
+@click.group()
+def tags():
+    """Hashtag index commands"""
+    pass
+
+
+@tags.command('reindex')
+@click.option('--batch-size', default=1000, show_default=True)
+def reindex_tags(batch_size):
+    """Rebuild post_tags from the text of every post, e.g. after adding it"""
+    count = sum(reindex_all(batch_size))
+    click.echo(f'Indexed {count} post tags')
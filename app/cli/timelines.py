@@ -0,0 +1,19 @@
+import click
+
+from app.timeline import timeline
+
+
+@click.group()
+def timelines():
+    """Home timeline commands"""
+    pass
+
+
+@timelines.command('trim')
+@click.option('--batch-size', default=1000, show_default=True)
+def trim_timelines(batch_size):
+    """Delete entries beyond TIMELINE_MAX_LENGTH from every timeline. Safe
+    to run periodically, timelines within the limit are not written.
+    """
+    count = sum(timeline.trim_all(batch_size))
+    click.echo(f'Trimmed {count} timeline entries')
@@ -0,0 +1,18 @@
+import click
+
+from app.extensions import db
+from app.revocation import denylist
+
+
+@click.group()
+def tokens():
+    """JWT denylist commands"""
+    pass
+
+
+@tokens.command('purge')
+def purge_tokens():
+    """Delete revoked tokens that have expired anyway"""
+    count = denylist.purge()
+    db.session.commit()
+    click.echo(f'Purged {count} expired revoked tokens')
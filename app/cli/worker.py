@@ -0,0 +1,19 @@
+import click
+
+from flask import current_app
+
+from app.jobs import jobs
+
+
+@click.command()
+@click.option('--concurrency', type=int, help='Threads, defaults to JOBS_CONCURRENCY')
+@click.option('--burst', is_flag=True, help='Exit once no job is due')
+def worker(concurrency, burst):
+    """Run queued jobs, see `app.jobs`"""
+    app = current_app._get_current_object()
+    stats = jobs.work(app, concurrency or app.config['JOBS_CONCURRENCY'], burst)
+    stats = stats.as_dict()
+    click.echo(
+        f'Processed {stats["processed"]} jobs, retried {stats["retried"]}, '
+        f'{stats["failed"]} failed'
+    )
@@ -0,0 +1,81 @@
+import hashlib
+
+from flask import abort, g, request
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+
+from app.cache import cache
+from app.dates import utc
+from app.extensions import db
+
+
+class NotModified(HTTPException):
+    code = 304
+    description = 'Not Modified'
+
+
+def has_conditional_headers():
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+
+def validate(rows, last_modified=True):
+    """Derive a weak ETag (and optionally Last-Modified) from `(id, updated_at)`
+    pairs and raise NotModified if the client's copy is still current.
+
+    The validators are attached to the response by `set_validators`. Lists
+    should pass `last_modified=False`: removing an item does not move the
+    newest `updated_at`, so only the ETag can tell.
+    """
+    digest = hashlib.sha1(usedforsecurity=False)
+    newest = None
+    for id, updated_at in rows:
+        updated_at = utc(updated_at)
+        digest.update(f'{id}:{updated_at.timestamp()};'.encode())
+        if newest is None or updated_at > newest:
+            newest = updated_at
+
+    etag = digest.hexdigest()
+    g.validators = (etag, newest if last_modified else None)
+
+    if request.if_none_match:
+        if request.if_none_match.contains_weak(etag):
+            raise NotModified()
+    elif g.validators[1] and request.if_modified_since:
+        if g.validators[1].replace(microsecond=0) <= request.if_modified_since:
+            raise NotModified()
+
+
+def cached_resource(key, model, id, dump):
+    """Serve a single model's payload through the cache, answering
+    conditional requests before anything is loaded or serialized.
+
+    On a cache hit the validators come from the cached payload. On a miss,
+    a client that sent validators is checked against an `updated_at`-only
+    query first.
+    """
+    payload = cache.get(key)
+    if payload is None:
+        if has_conditional_headers():
+            updated_at = db.session.scalar(
+                select(model.updated_at).where(model.id == id)
+            )
+            if updated_at is None:
+                abort(404)
+            validate([(id, updated_at)])
+
+        payload = dump(db.get_or_abort(model, id))
+        cache.set(key, payload)
+
+    validate([(payload['id'], payload['updated_at'])])
+    return payload
+
+
+def set_validators(response):
+    """after_request hook adding ETag/Last-Modified computed by `validate`"""
+    validators = g.pop('validators', None)
+    if validators is not None and response.status_code in (200, 304):
+        etag, last_modified = validators
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+    return response
@@ -0,0 +1,65 @@
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import func, select, update
+
+from app.cache import cache, user_key
+from app.extensions import db
+from app.models import Follow, Post, User
+
+# Denormalized counters on `users`, each kept up to date by the views that
+# write the rows it counts (`UPDATE ... SET n = n + 1`, moving `updated_at`
+# as the counters are part of the user payload and its ETag), and the column
+# of the counted table that points at the user
+COUNTERS = {
+    'post_count': Post.user_id,
+    'follower_count': Follow.followee_id,
+}
+
+
+def actual_count(name):
+    """Correlated `COUNT(*)` for counter `name`, served by the index on the
+    counted table's user column
+    """
+    column = COUNTERS[name]
+    return select(func.count()).where(column == User.id).scalar_subquery()
+
+
+def recount(first_id, last_id, only_drifted=True, session=None):
+    """Set the counters of users with ids in `[first_id, last_id]` from the
+    counted tables, one UPDATE per counter. With `only_drifted` rows that
+    are already right are not written. Returns the ids that changed.
+    """
+    session = session or db.session
+    changed = set()
+    for name in COUNTERS:
+        counter, actual = getattr(User, name), actual_count(name)
+        stmt = (
+            update(User)
+            .where(User.id.between(first_id, last_id))
+            .values({name: actual, 'updated_at': datetime.now(UTC)})
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        if only_drifted:
+            stmt = stmt.where(counter != actual)
+        changed.update(session.scalars(stmt))
+    return changed
+
+
+def recount_all(batch_size=1000, only_drifted=True, session=None):
+    """Walk `users` by id range, committing each batch so no transaction
+    holds row locks on more than `batch_size` users. Yields the ids that
+    changed per batch.
+    """
+    session = session or db.session
+    first, last = session.execute(select(func.min(User.id), func.max(User.id))).one()
+    if first is None:
+        return
+
+    for start in range(first, last + 1, batch_size):
+        changed = recount(start, start + batch_size - 1, only_drifted, session)
+        session.commit()
+        cache.delete(
+            *(user_key(id, private) for id in changed for private in (False, True))
+        )
+        yield changed
@@ -0,0 +1,18 @@
+from datetime import datetime
+from datetime import UTC
+
+
+def utc(value):
+    """Coerce a datetime or ISO string to an aware UTC datetime. SQLite
+    hands datetimes back naive; they were stored as UTC.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def timestamp(value):
+    """POSIX timestamp of a datetime read from the database"""
+    return utc(value).timestamp()
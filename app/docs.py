@@ -0,0 +1,101 @@
+import glob
+import json
+import os
+
+from functools import cache
+
+
+def swag_from(path):
+    """Attach a YAML spec to a view, as flasgger's `swag_from` does for a
+    file path, without wrapping the view or importing flasgger. The file is
+    only read when the spec is built.
+    """
+
+    def decorator(view):
+        view.swag_path = path
+        view.swag_type = 'yml'
+        return view
+
+    return decorator
+
+
+@cache
+def _swagger_class():
+    # flasgger pulls in jsonschema, mistune and yaml, ~0.15s of import
+    from flasgger import Swagger
+
+    class PrebuiltSwagger(Swagger):
+        """Serves the spec written by `flask docs build` while it is newer
+        than every file under docs/, else builds it from the YAML files
+        """
+
+        def get_apispecs(self, endpoint='apispec_1'):
+            if not self.app.debug and endpoint not in self.apispecs:
+                prebuilt = load_prebuilt(self.app)
+                if prebuilt is not None and endpoint in prebuilt:
+                    self.apispecs[endpoint] = prebuilt[endpoint]
+            return super().get_apispecs(endpoint)
+
+        def build_apispecs(self, endpoint):
+            self.apispecs.pop(endpoint, None)
+            return super().get_apispecs(endpoint)
+
+    return PrebuiltSwagger
+
+
+def load_prebuilt(app):
+    path = app.config['API_DOCS_SPEC']
+    try:
+        built_at = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    from app import DOCS_DIR
+
+    sources = glob.glob(os.path.join(DOCS_DIR, '**', '*.yml'), recursive=True)
+    if any(os.path.getmtime(source) > built_at for source in sources):
+        app.logger.warning('%s is older than docs/, run `flask docs build`', path)
+        return None
+
+    with open(path) as f:
+        return json.load(f)
+
+
+class ApiDocs:
+    """Swagger UI at /apidocs and the spec at /apispec_1.json.
+
+    Off with `API_DOCS = False`, in which case flasgger is never imported.
+    When on, the spec is still only built on the first request for it,
+    from the artifact `flask docs build` writes to `API_DOCS_SPEC` if that
+    is up to date.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('API_DOCS', True)
+        app.config.setdefault(
+            'API_DOCS_SPEC', os.path.join(app.instance_path, 'apispec.json')
+        )
+        app.extensions['api_docs'] = self
+        if app.config['API_DOCS']:
+            app.extensions['swagger'] = _swagger_class()(app)
+
+    def build(self, app):
+        """Build every spec and write them to `API_DOCS_SPEC`"""
+        swagger = app.extensions['swagger']
+        with app.app_context():
+            specs = {
+                endpoint: swagger.build_apispecs(endpoint)
+                for endpoint in swagger.endpoints
+            }
+        path = app.config['API_DOCS_SPEC']
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(specs, f, sort_keys=True)
+        return path, specs
+
+
+api_docs = ApiDocs()
@@ -0,0 +1,243 @@
+import threading
+import time
+
+from sqlalchemy import event, exc, make_url, text
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.extensions import db
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            with self._stats_lock:
+                self.waits += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for asyncio engines"""
+
+
+def _check(app, key, valid, requirement):
+    value = app.config[key]
+    if not valid(value):
+        raise RuntimeError(f'{key} must be {requirement}, got {value!r}.')
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+
+def async_url(url):
+    """The asyncio driver equivalent of a sync database URL"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f'No asyncio driver known for {backend!r} databases.')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def configure_engines(app):
+    """Validate the pool settings and merge them into every entry of
+    `SQLALCHEMY_ENGINES` and `SQLALCHEMY_ASYNC_ENGINES`. Must run before
+    `db.init_app`.
+
+    Options set on an engine's own dict entry take precedence. In-memory
+    SQLite keeps its single static connection. With `ASYNC_VIEWS` on, the
+    async engines (default and replicas) are derived from the sync ones
+    unless configured.
+    """
+    app.config.setdefault('SQLALCHEMY_POOL_SIZE', 5)
+    app.config.setdefault('SQLALCHEMY_MAX_OVERFLOW', 10)
+    app.config.setdefault('SQLALCHEMY_POOL_TIMEOUT', 30)
+    app.config.setdefault('SQLALCHEMY_POOL_RECYCLE', -1)
+    app.config.setdefault('SQLALCHEMY_POOL_PRE_PING', True)
+    app.config.setdefault('SQLALCHEMY_STATEMENT_TIMEOUT', 0)
+    app.config.setdefault('SQLALCHEMY_PGBOUNCER', False)
+    app.config.setdefault('ASYNC_VIEWS', False)
+
+    _check(app, 'SQLALCHEMY_POOL_SIZE', lambda v: _is_int(v) and v > 0, 'positive')
+    _check(
+        app,
+        'SQLALCHEMY_MAX_OVERFLOW',
+        lambda v: _is_int(v) and v >= -1,
+        '-1 (unlimited) or more',
+    )
+    _check(
+        app,
+        'SQLALCHEMY_POOL_TIMEOUT',
+        lambda v: isinstance(v, (int, float)) and v > 0,
+        'a positive number of seconds',
+    )
+    _check(
+        app,
+        'SQLALCHEMY_POOL_RECYCLE',
+        lambda v: _is_int(v) and v >= -1,
+        '-1 (never) or a number of seconds',
+    )
+    _check(app, 'SQLALCHEMY_POOL_PRE_PING', lambda v: isinstance(v, bool), 'a bool')
+    _check(
+        app,
+        'SQLALCHEMY_STATEMENT_TIMEOUT',
+        lambda v: _is_int(v) and v >= 0,
+        '0 (off) or milliseconds',
+    )
+    _check(app, 'SQLALCHEMY_PGBOUNCER', lambda v: isinstance(v, bool), 'a bool')
+
+    engines = app.config.get('SQLALCHEMY_ENGINES', {})
+    _configure(app, 'SQLALCHEMY_ENGINES', engines, TimedQueuePool)
+
+    if app.config['ASYNC_VIEWS'] and 'default' in engines:
+        app.config.setdefault(
+            'SQLALCHEMY_ASYNC_ENGINES',
+            {name: async_url(config['url']) for name, config in engines.items()},
+        )
+    _configure(
+        app,
+        'SQLALCHEMY_ASYNC_ENGINES',
+        app.config.get('SQLALCHEMY_ASYNC_ENGINES', {}),
+        TimedAsyncQueuePool,
+    )
+
+
+def _configure(app, key, engines, poolclass):
+    for name, config in engines.items():
+        if isinstance(config, (str, URL)):
+            options = {'url': config}
+        elif isinstance(config, dict) and 'url' in config:
+            options = dict(config)
+        else:
+            raise RuntimeError(f'\'{key}["{name}"]["url"]\' must be set.')
+
+        try:
+            url = make_url(options['url'])
+        except exc.ArgumentError as e:
+            raise RuntimeError(f'\'{key}["{name}"]\': {e}') from e
+
+        options.setdefault('pool_pre_ping', app.config['SQLALCHEMY_POOL_PRE_PING'])
+
+        backend = url.get_backend_name()
+        if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+            engines[name] = options
+            continue
+
+        options.setdefault('poolclass', poolclass)
+        options.setdefault('pool_size', app.config['SQLALCHEMY_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['SQLALCHEMY_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', app.config['SQLALCHEMY_POOL_TIMEOUT'])
+        options.setdefault('pool_recycle', app.config['SQLALCHEMY_POOL_RECYCLE'])
+
+        if backend == 'postgresql':
+            _configure_postgresql(app, url, options)
+
+        engines[name] = options
+
+
+def _configure_postgresql(app, url, options):
+    connect_args = options.setdefault('connect_args', {})
+    timeout = app.config['SQLALCHEMY_STATEMENT_TIMEOUT']
+
+    if app.config['SQLALCHEMY_PGBOUNCER']:
+        # Transaction pooling hands each transaction to any server
+        # connection, so neither prepared statements nor startup options
+        # survive. The timeout is set per transaction by `init_engines`.
+        driver = url.get_driver_name()
+        if driver == 'asyncpg':
+            connect_args.setdefault('statement_cache_size', 0)
+            connect_args.setdefault('prepared_statement_cache_size', 0)
+        elif driver in ('psycopg', 'psycopg_async'):
+            connect_args.setdefault('prepare_threshold', None)
+    elif timeout and url.get_driver_name() == 'asyncpg':
+        connect_args.setdefault('server_settings', {})['statement_timeout'] = str(
+            timeout
+        )
+    elif timeout:
+        connect_args['options'] = (
+            connect_args.get('options', '') + f' -c statement_timeout={timeout}'
+        ).strip()
+
+
+def init_engines(app):
+    """Attach per-transaction settings to the created engines. Must run
+    after `db.init_app`.
+    """
+    timeout = app.config['SQLALCHEMY_STATEMENT_TIMEOUT']
+    if not (app.config['SQLALCHEMY_PGBOUNCER'] and timeout):
+        return
+
+    def set_timeout(conn):
+        conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'postgresql':
+                event.listen(engine, 'begin', set_timeout)
+        for engine in db.async_engines.values():
+            if engine.dialect.name == 'postgresql':
+                event.listen(engine.sync_engine, 'begin', set_timeout)
+
+
+def pool_stats():
+    """Connection pool gauges for each engine of the current app"""
+    engines = dict(db.engines)
+    engines.update(
+        (f'{name} (async)', engine.sync_engine)
+        for name, engine in db.async_engines.items()
+    )
+
+    stats = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        entry = {'class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        if isinstance(pool, TimedQueuePool):
+            entry.update(
+                waits=pool.waits,
+                wait_avg_ms=round(1000 * pool.wait_total / pool.waits, 3)
+                if pool.waits
+                else 0.0,
+                wait_max_ms=round(1000 * pool.wait_max, 3),
+                timeouts=pool.timeouts,
+            )
+        stats[name] = entry
+    return stats
+
+
+def ping(engine):
+    """Whether the engine can run a trivial statement"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        return True
+    except exc.SQLAlchemyError:
+        return False
@@ -0,0 +1,252 @@
+import threading
+
+from collections import deque
+from flask import current_app
+
+HEARTBEAT = b': keepalive\n\n'
+EVICTED = b'event: evicted\ndata: {}\n\n'
+
+
+class StreamsFull(Exception):
+    """Raised when a worker already holds `STREAM_MAX_CONNECTIONS` streams"""
+
+
+def frame(event, data):
+    """A Server-Sent Events message, `data` being JSON text"""
+    return f'event: {event}\ndata: {data}\n\n'.encode()
+
+
+class Subscriber:
+    """One `/stream` connection: the channels it listens to and a buffer of
+    at most `buffer_size` frames it has not been sent yet.
+    """
+
+    def __init__(self, channels, buffer_size):
+        self.channels = frozenset(channels)
+        self.buffer_size = buffer_size
+        self.buffer = deque()
+        self.evicted = False
+        self.ready = threading.Condition()
+
+    def push(self, data):
+        """Buffer a frame. Returns False, and marks the subscriber evicted,
+        if its buffer is full because the client is not reading.
+        """
+        with self.ready:
+            if self.evicted:
+                return False
+            if len(self.buffer) >= self.buffer_size:
+                self.evicted = True
+                self.buffer.clear()
+                self.ready.notify()
+                return False
+            self.buffer.append(data)
+            self.ready.notify()
+            return True
+
+    def pull(self, timeout):
+        """Wait up to `timeout` seconds for frames. Returns them, an empty
+        list on timeout, or None once evicted.
+        """
+        with self.ready:
+            self.ready.wait_for(lambda: self.buffer or self.evicted, timeout)
+            if self.evicted:
+                return None
+            frames = list(self.buffer)
+            self.buffer.clear()
+            return frames
+
+
+class HubStats:
+    def __init__(self):
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+
+    def as_dict(self):
+        return {
+            'published': self.published,
+            'delivered': self.delivered,
+            'evicted': self.evicted,
+        }
+
+
+class Hub:
+    """This worker's subscribers by channel. `dispatch` hands a frame,
+    encoded once, to each of a channel's subscribers and evicts those
+    whose buffer is full, so a slow client never blocks a publisher.
+    """
+
+    def __init__(self, buffer_size=64, max_subscribers=1000):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.stats = HubStats()
+        self._channels = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscriber = Subscriber(channels, self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise StreamsFull
+            self._subscribers.add(subscriber)
+            for channel in subscriber.channels:
+                self._channels.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._remove(subscriber)
+
+    def _remove(self, subscriber):
+        if subscriber not in self._subscribers:
+            return  # evicted before the connection closed
+        self._subscribers.discard(subscriber)
+        for channel in subscriber.channels:
+            subscribers = self._channels[channel]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._channels[channel]
+
+    def dispatch(self, channel, data):
+        with self._lock:
+            self.stats.published += 1
+            for subscriber in list(self._channels.get(channel, ())):
+                if subscriber.push(data):
+                    self.stats.delivered += 1
+                else:
+                    self.stats.evicted += 1
+                    self._remove(subscriber)
+
+    def stream(self, subscriber, heartbeat):
+        """The response body of a `/stream` connection. Sends a comment
+        every `heartbeat` idle seconds so proxies keep the connection open
+        and a closed one is noticed. Ends after an eviction, with an
+        `evicted` event telling the client to refetch and reconnect.
+
+        It blocks between frames, so the server holds a thread per open
+        connection for as long as it stays open. The caller unsubscribes
+        once the response is closed.
+        """
+        yield b': connected\n\n'
+        while True:
+            frames = subscriber.pull(heartbeat)
+            if frames is None:
+                yield EVICTED
+                return
+            yield b''.join(frames) if frames else HEARTBEAT
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+class LocalBroker:
+    """Delivers events to this worker's subscribers only. Enough for a
+    single process; with several, clients only hear about writes handled
+    by the worker they are connected to.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, channel, data):
+        self.hub.dispatch(channel, data)
+
+
+class RedisBroker:
+    """Delivers events to the subscribers of every worker through Redis
+    pub/sub. Requires the optional `redis` package.
+    """
+
+    def __init__(self, hub, url, prefix='events:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "STREAM_BROKER = 'redis' requires the 'redis' package"
+            ) from e
+
+        self.hub = hub
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{f'{prefix}*': self._receive})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _receive(self, message):
+        channel = message['channel'].decode()[len(self.prefix) :]
+        self.hub.dispatch(channel, message['data'])
+
+    def publish(self, channel, data):
+        self._client.publish(self.prefix + channel, data)
+
+
+class Events:
+    """Post and notification events for `/stream`.
+
+    `publish` is called after a write commits. The broker picked by
+    `STREAM_BROKER`, `local` (default) or `redis`, carries the event to the
+    `Hub` of every worker, which pushes it to the connections listening on
+    its channel.
+
+    `/stream` is only served in the sync serving mode, by a threaded
+    server with a thread to spare for each connection. Events are
+    published from either mode.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STREAM_BROKER', 'local')
+        app.config.setdefault('STREAM_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('STREAM_BUFFER_SIZE', 64)
+        app.config.setdefault('STREAM_MAX_CONNECTIONS', 1000)
+        app.config.setdefault('STREAM_MAX_FOLLOWEES', 1000)
+        app.config.setdefault('STREAM_HEARTBEAT_SECONDS', 15)
+
+        hub = Hub(
+            app.config['STREAM_BUFFER_SIZE'], app.config['STREAM_MAX_CONNECTIONS']
+        )
+        broker = app.config['STREAM_BROKER']
+        if broker == 'local':
+            app.extensions['events'] = LocalBroker(hub)
+        elif broker == 'redis':
+            app.extensions['events'] = RedisBroker(hub, app.config['STREAM_REDIS_URL'])
+        else:
+            raise RuntimeError(f'Unknown STREAM_BROKER {broker!r}')
+
+    @property
+    def broker(self):
+        return current_app.extensions['events']
+
+    @property
+    def hub(self):
+        return self.broker.hub
+
+    def publish(self, channel, event, data):
+        """Best effort: the write has committed, so a broker error is only
+        logged
+        """
+        try:
+            self.broker.publish(channel, frame(event, current_app.json.dumps(data)))
+        except Exception:
+            current_app.logger.exception('Publishing %s to %s failed', event, channel)
+
+    def stats(self):
+        return {'connections': len(self.hub), **self.hub.stats.as_dict()}
+
+
+def posts_channel(user_id):
+    """Posts created, edited or deleted by a user"""
+    return f'posts:{user_id}'
+
+
+def inbox_channel(user_id):
+    """Notifications for a user"""
+    return f'inbox:{user_id}'
+
+
+events = Events()
@@ -0,0 +1,58 @@
+import zlib
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import select
+
+from app.models import Post
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def export_select(user_id):
+    """A user's posts, oldest first, fetched `EXPORT_BATCH_SIZE` rows at a
+    time from a server-side cursor where the driver has one
+    """
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    return (
+        select(Post)
+        .where(Post.user_id == user_id)
+        .order_by(Post.created_at, Post.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def ndjson(profile, batches):
+    """The profile line, then one line per post, a chunk per batch of
+    dumped posts. Nothing is held beyond the batch being encoded.
+    """
+    dumps = current_app.json.dumps
+    yield (dumps({'profile': profile}) + '\n').encode()
+    for posts in batches:
+        yield ''.join(dumps({'post': post}) + '\n' for post in posts).encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_response(profile, batches):
+    """Stream an NDJSON export, gzipped on the fly if the client accepts it.
+    `batches` is consumed while the response is sent, with the request
+    context (and its database session) still open.
+    """
+    chunks = ndjson(profile, batches)
+    headers = {
+        'Content-Disposition': 'attachment; filename="export.ndjson"',
+        'Vary': 'Accept-Encoding',
+    }
+    if request.accept_encodings['gzip']:
+        chunks = gzipped(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(
+        stream_with_context(chunks), mimetype='application/x-ndjson', headers=headers
+    )
@@ -1,17 +1,43 @@
-from flask_sqlalchemy_lite import SQLAlchemy
+import flask_sqlalchemy_lite
+
+from flask import g, has_app_context
 from flask_alembic import Alembic
-from flasgger import Swagger
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.util.concurrency import in_greenlet
 
 
 class Base(DeclarativeBase):
     pass
 
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """Session that reads from the replica a view picked into `g.read_engine`
+    (see `app.replicas`). Flushes and DML always go to the default engine,
+    and once a request has written, its remaining reads follow.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if has_app_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_wrote = True
+            elif not g.get('db_wrote') and g.get('read_engine') is not None:
+                return g.read_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+class SQLAlchemy(flask_sqlalchemy_lite.SQLAlchemy):
+    def get_session(self, name='default'):
+        # A view run by `app.aio` through `AsyncSession.run_sync` gets the
+        # sync facade of its async session
+        if name == 'default' and in_greenlet() and 'async_session' in g:
+            return g.async_session.sync_session
+        return super().get_session(name)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 alembic = Alembic(metadatas=Base.metadata)
 jwt = JWTManager()
 ma = Marshmallow()
-swagger = Swagger()
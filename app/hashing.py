@@ -0,0 +1,166 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from flask import current_app
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool has too much work queued"""
+
+
+def normalize_method(method):
+    """Expand a werkzeug hash method to the full form stored in hashes,
+    e.g. `scrypt` -> `scrypt:32768:8:1`.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args or (2**15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f'Invalid hash method {method!r}')
+
+
+class _State:
+    """Per-app pool and back-pressure bookkeeping"""
+
+    def __init__(self, method, workers, max_pending, timeout):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0  # HasherBusy raised, for /metrics
+        self.lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def executor(self):
+        # A pool inherited through fork belongs to the parent, start a new one
+        if self._executor is None or self._pid != os.getpid():
+            with self.lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+
+
+class PasswordHasher:
+    """Password hashing on a bounded process pool.
+
+    Hashing is CPU and memory heavy, so it runs in `PASSWORD_HASH_WORKERS`
+    worker processes instead of holding the GIL on the request thread. At
+    most `PASSWORD_HASH_MAX_PENDING` jobs may be in flight; beyond that
+    `HasherBusy` is raised so the client gets a 503 instead of queueing.
+    A job counts against that until it finishes, even if the request gave
+    up on it after `PASSWORD_HASH_TIMEOUT`. With zero workers hashing runs
+    inline. Views served by `app.aio` await the job on the views loop.
+
+    The pool belongs to one app worker process: under a preforking server
+    each worker starts `PASSWORD_HASH_WORKERS` processes of its own.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        workers = app.config.setdefault(
+            'PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)
+        )
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 4 * max(workers, 1))
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+
+        app.extensions['password_hasher'] = _State(
+            app.config['PASSWORD_HASH_METHOD'],
+            workers,
+            app.config['PASSWORD_HASH_MAX_PENDING'],
+            app.config['PASSWORD_HASH_TIMEOUT'],
+        )
+
+    @property
+    def state(self):
+        return current_app.extensions['password_hasher']
+
+    def _submit(self, state, fn, *args):
+        """Submit a job to the pool, holding its slot until the job is done"""
+        with state.lock:
+            if state.pending >= state.max_pending:
+                state.rejected += 1
+                raise HasherBusy()
+            state.pending += 1
+        try:
+            future = state.executor().submit(fn, *args)
+        except BaseException:
+            state.release()
+            raise
+        future.add_done_callback(state.release)
+        return future
+
+    def _timed_out(self, state):
+        # The job keeps its slot until it finishes in the pool
+        with state.lock:
+            state.rejected += 1
+        return HasherBusy()
+
+    def _run(self, fn, *args):
+        if in_greenlet():
+            # A view served by `app.aio`: wait on the views loop, not block it
+            return await_only(self._run_async(fn, *args))
+
+        state = self.state
+        if not state.workers:
+            return fn(*args)
+
+        future = self._submit(state, fn, *args)
+        try:
+            return future.result(timeout=state.timeout)
+        except TimeoutError as e:
+            raise self._timed_out(state) from e
+
+    async def _run_async(self, fn, *args):
+        state = self.state
+        if not state.workers:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+        future = asyncio.wrap_future(self._submit(state, fn, *args))
+        try:
+            return await asyncio.wait_for(future, state.timeout)
+        except TimeoutError as e:
+            raise self._timed_out(state) from e
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.state.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether a stored hash was made with other than the current method"""
+        method = pwhash.split('$', 1)[0]
+        try:
+            return normalize_method(method) != self.state.method
+        except ValueError:
+            return True
+
+
+hasher = PasswordHasher()
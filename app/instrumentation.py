@@ -0,0 +1,164 @@
+import json
+import logging
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+from app.extensions import db
+
+logger = logging.getLogger('app.sql')
+
+
+class QueryStats:
+    """Statements executed during one request or `capture()` block"""
+
+    def __init__(self, track_statements=False):
+        self.count = 0
+        self.duration = 0.0
+        self.slow = []
+        self.statements = Counter() if track_statements else None
+
+    def record(self, statement, duration, slow_threshold):
+        self.count += 1
+        self.duration += duration
+        if duration >= slow_threshold:
+            self.slow.append((statement, duration))
+        if self.statements is not None:
+            self.statements[statement] += 1
+
+    def repeated(self, threshold):
+        """Statements run at least `threshold` times, the N+1 signature"""
+        if self.statements is None:
+            return {}
+        return {s: n for s, n in self.statements.items() if n >= threshold}
+
+
+_captures = ContextVar('sql_captures', default=())
+
+
+@contextmanager
+def capture():
+    """Collect stats for every statement the current thread runs inside the
+    block, across requests, including from async views it waits on. Used by
+    the `query_budget` test fixture.
+    """
+    stats = QueryStats(track_statements=True)
+    token = _captures.set((*_captures.get(), stats))
+    try:
+        yield stats
+    finally:
+        _captures.reset(token)
+
+
+class Instrumentation:
+    """Per-request SQL statement counts and timings.
+
+    Listens to cursor events on every sync and async engine. Each
+    response gets a `Server-Timing` header with the database time and
+    statement count, and a JSON log line is written to the `app.sql`
+    logger. Statements slower than `SQL_SLOW_QUERY_MS` are logged. With
+    `SQL_DETECT_N_PLUS_ONE` on, identical statements repeated at least
+    `SQL_N_PLUS_ONE_THRESHOLD` times in one request are logged as likely
+    N+1 queries.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_INSTRUMENTATION', True)
+        app.config.setdefault('SQL_SLOW_QUERY_MS', 100)
+        app.config.setdefault('SQL_DETECT_N_PLUS_ONE', False)
+        app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+
+        if not app.config['SQL_INSTRUMENTATION']:
+            return
+
+        slow_threshold = app.config['SQL_SLOW_QUERY_MS'] / 1000
+        track_statements = app.config['SQL_DETECT_N_PLUS_ONE']
+
+        def before_cursor_execute(conn, cursor, statement, params, context, many):
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, params, context, many):
+            duration = time.perf_counter() - conn.info['query_start'].pop()
+            for stats in _captures.get():
+                stats.record(statement, duration, slow_threshold)
+            if has_app_context() and 'query_stats' in g:
+                g.query_stats.record(statement, duration, slow_threshold)
+
+        with app.app_context():
+            engines = [*db.engines.values()]
+            engines += [engine.sync_engine for engine in db.async_engines.values()]
+            for engine in engines:
+                event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+        @app.before_request
+        def start_request():
+            g.request_start = time.perf_counter()
+            g.query_stats = QueryStats(track_statements)
+
+        app.after_request(self._report)
+
+    def _report(self, response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - g.pop('request_start')
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"',
+        )
+        response.headers.add('Server-Timing', f'app;dur={total * 1000:.2f}')
+
+        for statement, duration in stats.slow:
+            logger.warning(
+                json.dumps(
+                    {
+                        'event': 'slow_query',
+                        'endpoint': request.endpoint,
+                        'duration_ms': round(duration * 1000, 2),
+                        'statement': statement,
+                    }
+                )
+            )
+
+        threshold = current_app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        for statement, times in stats.repeated(threshold).items():
+            logger.warning(
+                json.dumps(
+                    {
+                        'event': 'n_plus_one',
+                        'endpoint': request.endpoint,
+                        'times': times,
+                        'statement': statement,
+                    }
+                )
+            )
+
+        logger.info(
+            json.dumps(
+                {
+                    'event': 'request',
+                    'method': request.method,
+                    'path': request.path,
+                    'endpoint': request.endpoint,
+                    'status': response.status_code,
+                    'queries': stats.count,
+                    'db_ms': round(stats.duration * 1000, 2),
+                    'total_ms': round(total * 1000, 2),
+                    'slow_queries': len(stats.slow),
+                }
+            )
+        )
+        return response
+
+
+instrumentation = Instrumentation()
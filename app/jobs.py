@@ -0,0 +1,300 @@
+import functools
+import json
+import threading
+import time
+
+from datetime import datetime, timedelta
+from datetime import UTC
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.dates import utc
+from app.extensions import db
+from app.models import Job
+
+
+class JobFunction:
+    """A function registered with `@job`. Calling it runs it inline;
+    `delay` queues it for `flask worker`.
+
+    It is called as `fn(session, **args)`, or with `batch_size` above 1 as
+    `fn(session, [args, ...])` with up to that many queued calls at once.
+    """
+
+    def __init__(self, fn, name, batch_size, max_attempts):
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.name = name
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def delay(self, session=None, **args):
+        """Queue a call in the caller's transaction, so it only runs if that
+        commits. `args` must be JSON-serializable.
+        """
+        return jobs.enqueue(self, args, session)
+
+    def run(self, session, items):
+        if self.batch_size > 1:
+            self.fn(session, items)
+        else:
+            for args in items:
+                self.fn(session, **args)
+
+
+class WorkerStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def record(self, rows, elapsed, outcome):
+        now = datetime.now(UTC)
+        waits = [(now - utc(row.created_at)).total_seconds() for row in rows]
+        with self.lock:
+            if outcome == 'processed':
+                self.processed += len(rows)
+            elif outcome == 'retried':
+                self.retried += len(rows)
+            else:
+                self.failed += len(rows)
+            self.wait_seconds += sum(waits)
+            self.max_wait_seconds = max(self.max_wait_seconds, *waits)
+            self.run_seconds += elapsed
+
+    def as_dict(self):
+        with self.lock:
+            done = self.processed + self.retried + self.failed
+            return {
+                'processed': self.processed,
+                'retried': self.retried,
+                'failed': self.failed,
+                'mean_wait_seconds': round(self.wait_seconds / done, 3) if done else 0,
+                'max_wait_seconds': round(self.max_wait_seconds, 3),
+                'run_seconds': round(self.run_seconds, 3),
+            }
+
+
+class Jobs:
+    """Work deferred off the request path, queued in the `jobs` table.
+
+    `@job` registers a function, `fn.delay(...)` adds a row in the caller's
+    transaction and `flask worker` runs them. Workers claim the oldest due
+    job, plus more of the same name for batch jobs, with
+    `SELECT ... FOR UPDATE SKIP LOCKED` inside one UPDATE, so concurrent
+    workers never wait on each other's rows. SQLite has no row locks and
+    ignores the clause; it runs one write at a time, which makes the
+    UPDATE atomic on its own.
+
+    A failed job is retried after `JOBS_BACKOFF_SECONDS`, doubling per
+    attempt, and kept as `failed` after its last attempt. A job whose
+    worker died is claimed again after `JOBS_TIMEOUT_SECONDS`.
+
+    With `JOBS_EAGER` calls run inline when queued, e.g. in tests.
+    """
+
+    def __init__(self, app=None):
+        self.registry = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_EAGER', False)
+        app.config.setdefault('JOBS_CONCURRENCY', 4)
+        app.config.setdefault('JOBS_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOBS_BACKOFF_SECONDS', 2)
+        app.config.setdefault('JOBS_TIMEOUT_SECONDS', 300)
+        app.config.setdefault('JOBS_POLL_SECONDS', 1)
+        app.config.setdefault('JOBS_STATS_SECONDS', 60)
+        app.extensions['jobs'] = self
+
+    def job(self, name=None, batch_size=1, max_attempts=None):
+        """Register a job function. `name` defaults to its dotted path."""
+
+        def decorator(fn):
+            job = JobFunction(
+                fn, name or f'{fn.__module__}.{fn.__name__}', batch_size, max_attempts
+            )
+            self.registry[job.name] = job
+            return job
+
+        return decorator
+
+    def enqueue(self, job, args, session=None):
+        session = session or db.session
+        if current_app.config['JOBS_EAGER']:
+            # Through JSON as the queue would, so tests catch what it cannot hold
+            job.run(session, [json.loads(json.dumps(args))])
+            return None
+
+        row = Job(name=job.name, args=args)
+        session.add(row)
+        return row
+
+    def _due(self, now):
+        return or_(
+            and_(Job.state == 'queued', Job.run_at <= now),
+            and_(Job.state == 'running', Job.locked_until <= now),
+        )
+
+    def claim(self, session=None):
+        """Claim the oldest due job and, for a batch job, more due jobs of
+        the same name. Commits and returns the claimed rows, or an empty
+        list if no job is due.
+        """
+        session = session or db.session
+        timeout = timedelta(seconds=current_app.config['JOBS_TIMEOUT_SECONDS'])
+        while True:
+            now = datetime.now(UTC)
+            due = self._due(now)
+            name = session.scalar(
+                select(Job.name).where(due).order_by(Job.run_at).limit(1)
+            )
+            if name is None:
+                return []
+            job = self.registry.get(name)
+
+            ids = (
+                select(Job.id)
+                .where(due, Job.name == name)
+                .order_by(Job.run_at)
+                .limit(job.batch_size if job else 1)
+                .with_for_update(skip_locked=True)
+            )
+            rows = session.execute(
+                update(Job)
+                .where(Job.id.in_(ids))
+                .values(
+                    state='running',
+                    attempts=Job.attempts + 1,
+                    locked_until=now + timeout,
+                )
+                .returning(Job.id, Job.name, Job.args, Job.attempts, Job.created_at)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if rows:
+                break
+            # Another worker claimed them since the name was read
+            session.rollback()
+        session.commit()
+        return rows
+
+    def run(self, rows, stats=None, session=None):
+        """Run claimed rows, which all have the same name, in one
+        transaction. Deletes them if it commits, else schedules a retry.
+        """
+        session = session or db.session
+        job = self.registry.get(rows[0].name)
+        ids = [row.id for row in rows]
+        start = time.perf_counter()
+        try:
+            if job is None:
+                raise LookupError(f'No job named {rows[0].name!r} is registered')
+            job.run(session, [row.args for row in rows])
+            session.execute(delete(Job).where(Job.id.in_(ids)))
+            session.commit()
+            outcome = 'processed'
+        except Exception as e:
+            session.rollback()
+            current_app.logger.exception('Job %s failed', rows[0].name)
+            outcome = self._retry(rows, job, e, session)
+
+        if stats is not None:
+            stats.record(rows, time.perf_counter() - start, outcome)
+        return outcome
+
+    def _retry(self, rows, job, error, session):
+        config = current_app.config
+        max_attempts = (job and job.max_attempts) or config['JOBS_MAX_ATTEMPTS']
+        now = datetime.now(UTC)
+        outcome = 'retried'
+        for row in rows:
+            if row.attempts >= max_attempts:
+                values = {'state': 'failed'}
+                outcome = 'failed'
+            else:
+                delay = config['JOBS_BACKOFF_SECONDS'] * 2 ** (row.attempts - 1)
+                values = {'state': 'queued', 'run_at': now + timedelta(seconds=delay)}
+            session.execute(
+                update(Job)
+                .where(Job.id == row.id)
+                .values(locked_until=None, last_error=repr(error)[:1000], **values)
+            )
+        session.commit()
+        return outcome
+
+    def work(self, app, concurrency, burst=False, stop=None):
+        """Run jobs on `concurrency` threads until `stop` is set, or with
+        `burst` until none is due. Logs `WorkerStats` and the queue depth
+        every `JOBS_STATS_SECONDS`. Returns the stats.
+        """
+        stop = stop or threading.Event()
+        stats = WorkerStats()
+        poll = app.config['JOBS_POLL_SECONDS']
+
+        def loop():
+            with app.app_context():
+                while not stop.is_set():
+                    try:
+                        rows = self.claim()
+                    except SQLAlchemyError:
+                        db.session.rollback()
+                        app.logger.exception('Claiming jobs failed')
+                        stop.wait(poll)
+                        continue
+                    if rows:
+                        self.run(rows, stats)
+                    elif burst:
+                        return
+                    else:
+                        stop.wait(poll)
+
+        threads = [
+            threading.Thread(target=loop, name=f'worker-{i}', daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(app.config['JOBS_STATS_SECONDS'])
+                    if thread.is_alive():
+                        with app.app_context():
+                            app.logger.info(
+                                'Jobs: %s, queue: %s', stats.as_dict(), self.depth()
+                            )
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        return stats
+
+    def depth(self, session=None):
+        """Jobs per state, and how long the oldest due job has waited"""
+        session = session or db.session
+        now = datetime.now(UTC)
+        counts = dict(
+            session.execute(select(Job.state, func.count()).group_by(Job.state)).all()
+        )
+        oldest = session.scalar(select(func.min(Job.run_at)).where(self._due(now)))
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'failed': counts.get('failed', 0),
+            'lag_seconds': (
+                round((now - utc(oldest)).total_seconds(), 3) if oldest else 0
+            ),
+        }
+
+
+jobs = Jobs()
+job = jobs.job
@@ -0,0 +1,109 @@
+import time
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.cache import cache
+from app.extensions import db
+from app.models import Like, LikeCounter
+
+UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def likes_key(post_id):
+    return f'likes:{post_id}'
+
+
+class Likes:
+    """Post likes with a sharded counter.
+
+    `likes` holds one row per (user, post) and is the truth. The count is
+    spread over up to `LIKE_COUNTER_SHARDS` rows in `like_counters`, the
+    liker's id picking the shard, so concurrent likes on one popular post
+    mostly update different rows instead of queueing on one row lock.
+    Reading the count sums the shards and caches the sum for
+    `LIKE_COUNT_MAX_AGE` seconds, which bounds how stale it can be.
+
+    The methods take an optional `session` for use outside a request, by
+    default `db.session`.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LIKE_COUNTER_SHARDS', 16)
+        app.config.setdefault('LIKE_COUNT_MAX_AGE', 5)
+        app.extensions['likes'] = self
+
+    def shard(self, user_id):
+        return user_id % current_app.config['LIKE_COUNTER_SHARDS']
+
+    def _add(self, session, post_id, user_id, delta):
+        dialect = session.get_bind().dialect.name
+        if dialect not in UPSERTS:
+            raise RuntimeError(f'Like counters are not supported on {dialect!r}.')
+        stmt = UPSERTS[dialect](LikeCounter).values(
+            post_id=post_id, shard=self.shard(user_id), count=delta
+        )
+        session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=['post_id', 'shard'],
+                set_={'count': LikeCounter.count + delta},
+            )
+        )
+
+    def like(self, post_id, user_id, session=None):
+        """Like a post in the caller's transaction. Raises IntegrityError on
+        flush if the user already does.
+        """
+        session = session or db.session
+        session.add(Like(user_id=user_id, post_id=post_id))
+        session.flush()
+        self._add(session, post_id, user_id, 1)
+
+    def unlike(self, post_id, user_id, session=None):
+        """Returns False if the user did not like the post"""
+        session = session or db.session
+        result = session.execute(
+            delete(Like).where(Like.user_id == user_id, Like.post_id == post_id)
+        )
+        if not result.rowcount:
+            return False
+        # A shard can go below zero if LIKE_COUNTER_SHARDS changed since the
+        # like, the sum is still right
+        self._add(session, post_id, user_id, -1)
+        return True
+
+    def liked(self, post_id, user_id, session=None):
+        stmt = select(Like.post_id).where(
+            Like.user_id == user_id, Like.post_id == post_id
+        )
+        return (session or db.session).scalar(stmt) is not None
+
+    def count_query(self, post_id):
+        """Sum of the shards, read on a cache miss"""
+        return select(func.coalesce(func.sum(LikeCounter.count), 0)).where(
+            LikeCounter.post_id == post_id
+        )
+
+    def count(self, post_id, session=None):
+        key = likes_key(post_id)
+        entry = cache.get(key)
+        max_age = current_app.config['LIKE_COUNT_MAX_AGE']
+        if entry is not None and time.time() - entry['at'] <= max_age:
+            return entry['count']
+
+        count = (session or db.session).scalar(self.count_query(post_id))
+        cache.set(key, {'count': count, 'at': time.time()})
+        return count
+
+    def remove_post(self, post, session=None):
+        session = session or db.session
+        session.execute(delete(Like).where(Like.post_id == post.id))
+        session.execute(delete(LikeCounter).where(LikeCounter.post_id == post.id))
+
+
+likes = Likes()
@@ -0,0 +1,423 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import current_app, g, request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.engines import pool_stats
+from app.events import events
+from app.hashing import hasher
+from app.jobs import jobs
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# name -> (type, help), in the order they are exposed
+SERIES = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status'),
+    'http_request_duration_seconds': (
+        'histogram',
+        'Time from before_request to after_request by endpoint',
+    ),
+    'http_response_size_bytes': (
+        'histogram',
+        'Response body size by endpoint, streamed responses excluded',
+    ),
+    'http_requests_in_flight': ('gauge', 'Requests being handled'),
+    'jwt_failures_total': ('counter', 'Requests rejected by a JWT check, by error'),
+    'password_hash_pending': ('gauge', 'Password hashes queued or running'),
+    'password_hash_max_pending': ('gauge', 'PASSWORD_HASH_MAX_PENDING'),
+    'password_hash_rejected_total': ('counter', 'Hashes refused with a 503, busy'),
+    'db_pool_size': ('gauge', 'Connections the pool keeps open'),
+    'db_pool_checked_out': ('gauge', 'Connections in use'),
+    'db_pool_overflow': ('gauge', 'Connections open beyond the pool size'),
+    'db_pool_waits_total': ('counter', 'Checkouts that waited for a connection'),
+    'db_pool_timeouts_total': ('counter', 'Checkouts that gave up waiting'),
+    'stream_connections': ('gauge', 'Open /stream connections'),
+    'jobs': ('gauge', 'Background jobs by state'),
+    'jobs_lag_seconds': ('gauge', 'How long the oldest due job has waited'),
+}
+
+
+class _Shard:
+    """Request metrics of one thread. Only that thread writes to it, so
+    recording takes no lock; readers copy the dicts, which the GIL makes
+    atomic.
+    """
+
+    def __init__(self, thread, latency_buckets, size_buckets):
+        self.thread = thread
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.requests = {}  # (endpoint, method, status) -> count
+        self.latency = {}  # endpoint -> [count per bucket, +Inf, sum]
+        self.size = {}
+        self.jwt_failures = {}  # error -> count
+        self.in_flight = 0
+
+    def observe(self, endpoint, method, status, duration, size):
+        key = (endpoint, method, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        _observe(self.latency, endpoint, duration, self.latency_buckets)
+        if size is not None:
+            _observe(self.size, endpoint, size, self.size_buckets)
+
+    def merge(self, other):
+        for key, count in other.requests.copy().items():
+            self.requests[key] = self.requests.get(key, 0) + count
+        for mine, theirs in ((self.latency, other.latency), (self.size, other.size)):
+            for key, counts in theirs.copy().items():
+                _add_counts(mine, key, counts)
+        for key, count in other.jwt_failures.copy().items():
+            self.jwt_failures[key] = self.jwt_failures.get(key, 0) + count
+
+
+def _observe(histogram, key, value, buckets):
+    counts = histogram.get(key)
+    if counts is None:
+        counts = histogram[key] = [0] * (len(buckets) + 2)
+    counts[bisect.bisect_left(buckets, value)] += 1
+    counts[-1] += value
+
+
+def _add_counts(histogram, key, counts):
+    mine = histogram.get(key)
+    if mine is None:
+        histogram[key] = list(counts)
+    else:
+        for i, count in enumerate(counts):
+            mine[i] += count
+
+
+class _State:
+    def __init__(self, latency_buckets, size_buckets, directory):
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.directory = directory
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()  # taken once per thread, and by readers
+        self.next_flush = 0.0
+
+    def shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = _Shard(
+                threading.current_thread(), self.latency_buckets, self.size_buckets
+            )
+            with self.lock:
+                self._retire()
+                self.shards.append(shard)
+            self.local.shard = shard
+        return shard
+
+    def _retire(self):
+        # Servers that start a thread per request would pile up shards, fold
+        # those of finished threads into one
+        if len(self.shards) < 64:
+            return
+        retired = _Shard(None, self.latency_buckets, self.size_buckets)
+        live = [retired]
+        for shard in self.shards:
+            if shard.thread is None or not shard.thread.is_alive():
+                retired.merge(shard)
+            else:
+                live.append(shard)
+        self.shards = live
+
+    def series(self):
+        """The request series, as `{kind: {(name, labels): value}}`"""
+        total = self.merged()
+        counters, gauges, histograms = {}, {}, {}
+        for (endpoint, method, status), count in total.requests.items():
+            labels = _labels(endpoint=endpoint, method=method, status=status)
+            counters['http_requests_total', labels] = count
+        for endpoint, counts in total.latency.items():
+            labels = _labels(endpoint=endpoint)
+            histograms['http_request_duration_seconds', labels] = counts
+        for endpoint, counts in total.size.items():
+            histograms['http_response_size_bytes', _labels(endpoint=endpoint)] = counts
+        for error, count in total.jwt_failures.items():
+            counters['jwt_failures_total', _labels(error=error)] = count
+        gauges['http_requests_in_flight', ''] = total.in_flight
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def merged(self):
+        """One shard summing every thread's, and requests in flight"""
+        total = _Shard(None, self.latency_buckets, self.size_buckets)
+        with self.lock:
+            self._retire()
+            shards = list(self.shards)
+        for shard in shards:
+            total.merge(shard)
+            total.in_flight += shard.in_flight
+        return total
+
+
+class Metrics:
+    """Prometheus metrics at /metrics.
+
+    Requests are timed by `before_request`/`after_request` hooks into a
+    shard per thread, so recording takes no lock and costs a few dict
+    updates. Hasher, connection pool and stream gauges are read when
+    scraped, and job queue depth is queried then.
+
+    Preforked workers each count their own requests. With
+    `METRICS_MULTIPROC_DIR` set, every worker writes its series to a file
+    there every `METRICS_FLUSH_SECONDS` and at exit, and a scrape of any
+    worker sums the files. Counters of workers that exited are kept;
+    gauges are only summed over the ones still running. The directory
+    should be emptied when the server starts.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS', True)
+        app.config.setdefault('METRICS_MULTIPROC_DIR', None)
+        app.config.setdefault('METRICS_FLUSH_SECONDS', 5)
+        app.config.setdefault('METRICS_LATENCY_BUCKETS', LATENCY_BUCKETS)
+        app.config.setdefault('METRICS_SIZE_BUCKETS', SIZE_BUCKETS)
+
+        if not app.config['METRICS']:
+            return
+
+        directory = app.config['METRICS_MULTIPROC_DIR']
+        app.extensions['metrics'] = state = _State(
+            tuple(sorted(app.config['METRICS_LATENCY_BUCKETS'])),
+            tuple(sorted(app.config['METRICS_SIZE_BUCKETS'])),
+            directory,
+        )
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+            def flush_at_exit():
+                # Without the app, which is being torn down: only the request
+                # series, an exited worker's gauges are dropped anyway
+                try:
+                    _write(state, state.series())
+                except OSError:
+                    pass  # the directory was cleared
+
+            atexit.register(flush_at_exit)
+
+        app.before_request(self._start)
+        app.after_request(self._observe)
+        app.teardown_request(self._finish)
+        self._count_jwt_failures(app)
+
+    @property
+    def state(self):
+        return current_app.extensions['metrics']
+
+    def _start(self):
+        shard = self.state.shard()
+        shard.in_flight += 1
+        g.metrics_start = time.perf_counter()
+
+    def _observe(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        state = self.state
+        state.shard().observe(
+            request.endpoint or 'none',
+            request.method,
+            response.status_code,
+            time.perf_counter() - start,
+            None if response.is_streamed else response.content_length,
+        )
+        if state.directory and time.monotonic() >= state.next_flush:
+            self.flush()
+        return response
+
+    def _finish(self, error):
+        if g.pop('metrics_start', None) is not None:
+            self.state.shard().in_flight -= 1
+
+    def _count_jwt_failures(self, app):
+        # flask_jwt_extended answers failed checks from error handlers it
+        # registers per exception, count in front of each
+        handlers = app.error_handler_spec[None][None]
+        for error, handler in list(handlers.items()):
+            if issubclass(error, (JWTExtendedException, PyJWTError)):
+                app.register_error_handler(error, self._counting(handler))
+
+    def _counting(self, handler):
+        def counting_handler(e):
+            failures = self.state.shard().jwt_failures
+            name = type(e).__name__
+            failures[name] = failures.get(name, 0) + 1
+            return handler(e)
+
+        return counting_handler
+
+    def collect(self):
+        """This process's series, as `{kind: {(name, labels): value}}`"""
+        series = self.state.series()
+        counters, gauges = series['counters'], series['gauges']
+
+        hashing = hasher.state
+        gauges['password_hash_pending', ''] = hashing.pending
+        gauges['password_hash_max_pending', ''] = hashing.max_pending
+        counters['password_hash_rejected_total', ''] = hashing.rejected
+
+        for engine, pool in pool_stats().items():
+            labels = _labels(engine=engine)
+            for name, key in (
+                ('db_pool_size', 'size'),
+                ('db_pool_checked_out', 'checked_out'),
+                ('db_pool_overflow', 'overflow'),
+            ):
+                if key in pool:
+                    gauges[name, labels] = pool[key]
+            for name, key in (
+                ('db_pool_waits_total', 'waits'),
+                ('db_pool_timeouts_total', 'timeouts'),
+            ):
+                if key in pool:
+                    counters[name, labels] = pool[key]
+
+        gauges['stream_connections', ''] = len(events.hub)
+
+        return series
+
+    def flush(self):
+        """Write this process's series to `METRICS_MULTIPROC_DIR`"""
+        state = self.state
+        state.next_flush = (
+            time.monotonic() + current_app.config['METRICS_FLUSH_SECONDS']
+        )
+        _write(state, self.collect())
+
+    def gather(self):
+        """Series of every worker, or of this process alone"""
+        state = self.state
+        if not state.directory:
+            return self.collect()
+
+        self.flush()
+        merged = {'counters': {}, 'gauges': {}, 'histograms': {}}
+        for path in glob.glob(os.path.join(state.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    series = json.load(f)
+            except (OSError, ValueError):
+                continue  # replaced while being read, or removed
+            pid = int(os.path.basename(path).split('.')[0])
+            for kind, values in series.items():
+                if kind == 'gauges' and not _running(pid):
+                    continue
+                for name, labels, value in values:
+                    key = (name, labels)
+                    if kind == 'histograms':
+                        _add_counts(merged[kind], key, value)
+                    else:
+                        merged[kind][key] = merged[kind].get(key, 0) + value
+        return merged
+
+    def render(self):
+        """The Prometheus text exposition of every series"""
+        series = self.gather()
+        state = self.state
+
+        # Global, not per process: query it once here
+        try:
+            depth = jobs.depth()
+        except SQLAlchemyError:
+            depth = None
+        if depth is not None:
+            for job_state in ('queued', 'running', 'failed'):
+                series['gauges']['jobs', _labels(state=job_state)] = depth[job_state]
+            series['gauges']['jobs_lag_seconds', ''] = depth['lag_seconds']
+
+        buckets = {
+            'http_request_duration_seconds': state.latency_buckets,
+            'http_response_size_bytes': state.size_buckets,
+        }
+        by_name = {}
+        for kind in ('counters', 'gauges', 'histograms'):
+            for (name, labels), value in series[kind].items():
+                by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help) in SERIES.items():
+            if name not in by_name:
+                continue
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(by_name[name]):
+                if kind == 'histogram':
+                    lines.extend(_histogram(name, labels, value, buckets[name]))
+                else:
+                    lines.append(f'{name}{_braces(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _write(state, series):
+    path = os.path.join(state.directory, f'{os.getpid()}.json')
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(
+            {
+                kind: [
+                    [name, labels, value] for (name, labels), value in values.items()
+                ]
+                for kind, values in series.items()
+            },
+            f,
+        )
+    os.replace(temporary, path)
+
+
+def _histogram(name, labels, counts, buckets):
+    cumulative = 0
+    prefix = f'{labels},' if labels else ''
+    for bound, count in zip((*buckets, '+Inf'), counts[:-1]):
+        cumulative += count
+        le = bound if bound == '+Inf' else _number(bound)
+        yield f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}'
+    yield f'{name}_sum{_braces(labels)} {_number(counts[-1])}'
+    yield f'{name}_count{_braces(labels)} {cumulative}'
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _braces(labels):
+    return f'{{{labels}}}' if labels else ''
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _running(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+metrics = Metrics()
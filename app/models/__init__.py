@@ -1,2 +1,8 @@
 from .user import User
 from .post import Post
+from .follow import Follow
+from .timeline import TimelineEntry
+from .revoked_token import RevokedToken
+from .like import Like, LikeCounter
+from .post_tag import PostTag
+from .job import Job
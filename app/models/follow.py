@@ -0,0 +1,27 @@
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import ForeignKey, Index, false
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import Base
+
+
+class Follow(Base):
+    __tablename__ = 'follows'
+
+    follower_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    followee_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+
+    # The followee's posts are merged into the follower's feed at read time
+    # instead of pushed, as decided when the follow was made
+    pulled: Mapped[bool] = mapped_column(default=False, server_default=false())
+
+    __table_args__ = (
+        # Fan-out walks followers of an author
+        Index('ix_follows_followee_id_follower_id', 'followee_id', 'follower_id'),
+    )
+
+    def __repr__(self):
+        return f'<Follow {self.follower_id} -> {self.followee_id}>'
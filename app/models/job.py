@@ -0,0 +1,36 @@
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import JSON, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import Base
+
+
+class Job(Base):
+    """Deferred work for `flask worker`, see `app.jobs`. Rows are deleted
+    once their job succeeds.
+    """
+
+    __tablename__ = 'jobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100))
+    args: Mapped[dict] = mapped_column(JSON)
+
+    # queued, running or failed (out of attempts)
+    state: Mapped[str] = mapped_column(String(10), default='queued')
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+
+    run_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+    # A running job whose worker died is claimed again after this
+    locked_until: Mapped[datetime] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        # Workers claim the oldest due jobs
+        Index('ix_jobs_state_run_at', 'state', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name}>'
@@ -0,0 +1,40 @@
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import Base
+
+
+class Like(Base):
+    __tablename__ = 'likes'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        # Recounts and deletes go by post
+        Index('ix_likes_post_id_user_id', 'post_id', 'user_id'),
+    )
+
+    def __repr__(self):
+        return f'<Like {self.user_id} -> {self.post_id}>'
+
+
+class LikeCounter(Base):
+    """One of a post's like count shards, the count is their sum"""
+
+    __tablename__ = 'like_counters'
+
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    count: Mapped[int] = mapped_column(default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<LikeCounter post={self.post_id} shard={self.shard}>'
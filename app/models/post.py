@@ -1,6 +1,6 @@
 from datetime import datetime
 from datetime import UTC
-from sqlalchemy import String, Text, ForeignKey
+from sqlalchemy import DDL, String, Text, ForeignKey, Index, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.extensions import Base
@@ -20,3 +20,52 @@ class Post(Base):
 
     def __repr__(self):
         return f'<Post {self.id}; title={self.title}>'
+
+
+# Backs keyset pagination of a user's posts, newest first
+Index(
+    'ix_posts_user_id_created_at_id',
+    Post.user_id,
+    Post.created_at.desc(),
+    Post.id.desc(),
+)
+
+
+# Full-text search, queried by app/search.py. Neither structure is mapped:
+# PostgreSQL gets a generated, weighted tsvector column with a GIN index and
+# SQLite an external content FTS5 table kept in sync by triggers, so every
+# write path (ORM, bulk seed, COPY) keeps the index current.
+SEARCH_DDL = {
+    'postgresql': [
+        'ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ('
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED",
+        'CREATE INDEX ix_posts_search_vector ON posts USING gin (search_vector)',
+    ],
+    'sqlite': [
+        'CREATE VIRTUAL TABLE posts_fts USING fts5(title, content, '
+        "content='posts', content_rowid='id', tokenize='porter unicode61')",
+        'CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN '
+        'INSERT INTO posts_fts(rowid, title, content) '
+        'VALUES (new.id, new.title, new.content); END',
+        'CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN '
+        'INSERT INTO posts_fts(posts_fts, rowid, title, content) '
+        "VALUES ('delete', old.id, old.title, old.content); END",
+        'CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, content ON posts '
+        'BEGIN INSERT INTO posts_fts(posts_fts, rowid, title, content) '
+        "VALUES ('delete', old.id, old.title, old.content); "
+        'INSERT INTO posts_fts(rowid, title, content) '
+        'VALUES (new.id, new.title, new.content); END',
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Post.__table__, 'after_create', DDL(statement).execute_if(dialect=dialect)
+        )
+event.listen(
+    Post.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS posts_fts').execute_if(dialect='sqlite'),
+)
@@ -0,0 +1,36 @@
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import Base
+
+
+class PostTag(Base):
+    """A hashtag in a post, the inverted index behind /tags/<tag>/posts"""
+
+    __tablename__ = 'post_tags'
+
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True
+    )
+    tag: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    # Copy of posts.created_at so a page is ordered from this table alone
+    created_at: Mapped[datetime]
+    # When the tag was added to the post, later than created_at for a tag
+    # added by an edit. Trending counts tags by it
+    tagged_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+
+    def __repr__(self):
+        return f'<PostTag #{self.tag} post={self.post_id}>'
+
+
+Index(
+    'ix_post_tags_tag_created_at_post_id',
+    PostTag.tag,
+    PostTag.created_at.desc(),
+    PostTag.post_id.desc(),
+)
+# Trending is rebuilt from the tags added in the last window
+Index('ix_post_tags_tagged_at', PostTag.tagged_at)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import Base
+
+
+class RevokedToken(Base):
+    """A JWT revoked before its expiry, by logout or refresh rotation"""
+
+    __tablename__ = 'revoked_tokens'
+
+    jti: Mapped[str] = mapped_column(String(36), primary_key=True)
+    type: Mapped[str] = mapped_column(String(10))
+    user_id: Mapped[int]
+
+    # Rows are dead once the token would have expired anyway
+    expires_at: Mapped[datetime] = mapped_column(index=True)
+    revoked_at: Mapped[datetime] = mapped_column(
+        default=lambda: datetime.now(UTC), index=True
+    )
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.extensions import Base
+
+
+class TimelineEntry(Base):
+    """A post pushed into a follower's precomputed home timeline"""
+
+    __tablename__ = 'timeline_entries'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True
+    )
+    author_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+
+    # Copy of posts.created_at so a page is read from this table alone
+    created_at: Mapped[datetime]
+
+    def __repr__(self):
+        return f'<TimelineEntry user={self.user_id} post={self.post_id}>'
+
+
+Index(
+    'ix_timeline_entries_user_id_created_at_post_id',
+    TimelineEntry.user_id,
+    TimelineEntry.created_at.desc(),
+    TimelineEntry.post_id.desc(),
+)
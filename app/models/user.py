@@ -1,6 +1,6 @@
 from datetime import datetime
 from datetime import UTC
-from sqlalchemy import String
+from sqlalchemy import Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.extensions import Base
@@ -25,6 +25,10 @@ class User(Base):
 
     # Posts
     posts: Mapped[list['Post']] = relationship(back_populates='user')
+    post_count: Mapped[int] = mapped_column(default=0, server_default='0')
+
+    # Social graph
+    follower_count: Mapped[int] = mapped_column(default=0, server_default='0')
 
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
@@ -32,3 +36,9 @@ class User(Base):
 
     def __repr__(self):
         return f'<User {self.username}>'
+
+
+# Case-insensitive identity: login and availability look users up by
+# lower(), and sign-up conflicts are caught by these instead of a SELECT
+Index('ix_users_username_lower', func.lower(User.username), unique=True)
+Index('ix_users_email_lower', func.lower(User.email), unique=True)
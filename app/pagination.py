@@ -0,0 +1,74 @@
+import base64
+import json
+
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    payload = json.dumps(raw, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    """Decode a `(created_at, id)` cursor, or `(key, id)` with `key` read by
+    `parse`. Raises ValueError if malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key, id = json.loads(base64.urlsafe_b64decode(padded))
+        return parse(key), int(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def page_args(parse=datetime.fromisoformat):
+    """Read `limit` and `cursor` from the query string.
+
+    Returns `(limit, cursor)` where cursor is a decoded `(created_at, id)`
+    tuple (see `decode_cursor`) or None. Raises ValueError on bad input.
+    """
+    default = current_app.config.get('POSTS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = current_app.config.get('POSTS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+
+    limit = request.args.get('limit', default, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('Invalid limit')
+    limit = min(limit, maximum)
+
+    cursor = request.args.get('cursor')
+    return limit, decode_cursor(cursor, parse) if cursor else None
+
+
+def keyset_select(stmt, created_col, id_col, limit, cursor=None):
+    """Restrict `stmt` to one page past `cursor`, ordered by
+    `(created_col, id_col)` DESC. One extra row is fetched so the caller
+    can tell whether another page exists without a COUNT query.
+    """
+    if cursor is not None:
+        stmt = stmt.where(tuple_(created_col, id_col) < tuple_(*cursor))
+    return stmt.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def split_page(rows, limit, created_attr='created_at', id_attr='id'):
+    """Trim the lookahead row off a page. Returns `(rows, next_cursor)`."""
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_attr), getattr(last, id_attr))
+
+
+def keyset_page(session, stmt, created_col, id_col, limit, cursor=None):
+    """Run a keyset-paginated select. Returns `(rows, next_cursor)`."""
+    rows = session.scalars(
+        keyset_select(stmt, created_col, id_col, limit, cursor)
+    ).all()
+    return split_page(rows, limit, created_col.key, id_col.key)
@@ -0,0 +1,158 @@
+import threading
+import time
+
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy.pool import QueuePool
+
+from app.aio import async_views
+from app.extensions import db
+
+STICKY_COOKIE = 'primary_until'
+SELECTIONS = ('round-robin', 'least-connections')
+
+
+class _State:
+    def __init__(self, names, selection):
+        self.names = names
+        self.selection = selection
+        self.lock = threading.Lock()
+        self.next = 0
+
+
+def _checked_out(engine):
+    pool = engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+class ReplicaRouter:
+    """Route the reads of `@read_only` views to replica engines.
+
+    Replicas are ordinary entries of `SQLALCHEMY_ENGINES` listed in
+    `SQLALCHEMY_REPLICAS` (by default every engine whose name starts with
+    `replica`). `SQLALCHEMY_REPLICA_SELECTION` picks one per request,
+    `round-robin` or `least-connections` by checked out pool connections.
+
+    A response to a request that wrote to the primary sets a cookie that
+    keeps that client's reads on the primary for `READ_YOUR_WRITES_SECONDS`,
+    long enough for the replicas to catch up.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        engines = app.config.get('SQLALCHEMY_ENGINES', {})
+        app.config.setdefault(
+            'SQLALCHEMY_REPLICAS',
+            [name for name in engines if name.startswith('replica')],
+        )
+        app.config.setdefault('SQLALCHEMY_REPLICA_SELECTION', 'round-robin')
+        app.config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+
+        names = list(app.config['SQLALCHEMY_REPLICAS'])
+        for name in names:
+            if name not in engines:
+                raise RuntimeError(
+                    f'SQLALCHEMY_REPLICAS lists {name!r}, which is not defined '
+                    'in SQLALCHEMY_ENGINES.'
+                )
+            if name == 'default':
+                raise RuntimeError('The default engine cannot be a replica.')
+
+        selection = app.config['SQLALCHEMY_REPLICA_SELECTION']
+        if selection not in SELECTIONS:
+            raise RuntimeError(
+                f'SQLALCHEMY_REPLICA_SELECTION must be one of {SELECTIONS}, '
+                f'got {selection!r}.'
+            )
+
+        app.extensions['replicas'] = _State(names, selection)
+        if names:
+            app.after_request(self._stick)
+
+    @property
+    def state(self):
+        return current_app.extensions['replicas']
+
+    def sticky(self):
+        """Whether the current client wrote recently enough to need the
+        primary
+        """
+        try:
+            return float(request.cookies[STICKY_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+    def engine(self, name):
+        if current_app.config['ASYNC_VIEWS']:
+            # What the sync facade of an async session binds to, see app.aio
+            return db.get_async_engine(name).sync_engine
+        return db.get_engine(name)
+
+    def choose(self):
+        """The replica engine for this request, or None for the primary"""
+        state = self.state
+        if not state.names or self.sticky():
+            return None
+
+        if state.selection == 'least-connections':
+            return min((self.engine(name) for name in state.names), key=_checked_out)
+
+        with state.lock:
+            name = state.names[state.next % len(state.names)]
+            state.next += 1
+        return self.engine(name)
+
+    def _stick(self, response):
+        wrote = g.pop('db_wrote', False)
+        seconds = current_app.config['READ_YOUR_WRITES_SECONDS']
+        if wrote and seconds and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE,
+                f'{time.time() + seconds:.3f}',
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def read_only(view):
+    """Let the view's reads go to a replica. Any write it makes still goes
+    to the primary, after which its reads do too.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_engine = router.choose()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.pop('read_engine', None)
+
+    return wrapper
+
+
+def streamed(chunks):
+    """Keep the reads of a streamed response body on the engine its
+    `@read_only` view picked. The body is consumed after the view has
+    returned, by which time `g.read_engine` is gone. In the async serving
+    mode each chunk is read through the view's async session.
+    """
+    engine = g.get('read_engine')
+
+    def generate():
+        g.read_engine = engine
+        try:
+            yield from chunks
+        finally:
+            g.pop('read_engine', None)
+
+    if current_app.config['ASYNC_VIEWS']:
+        return async_views.iterate(generate())
+    return generate()
+
+
+router = ReplicaRouter()
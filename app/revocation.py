@@ -0,0 +1,138 @@
+import heapq
+import threading
+import time
+
+from datetime import datetime, timedelta
+from datetime import UTC
+from flask import current_app
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.dates import timestamp
+from app.extensions import db, jwt
+from app.models import RevokedToken
+
+
+class _State:
+    def __init__(self):
+        self.revoked = {}  # jti -> exp, as epoch seconds
+        self.expiry = []  # heap of (exp, jti)
+        self.lock = threading.Lock()
+        self.syncing = threading.Lock()
+        self.synced_at = None
+        self.next_sync = 0.0
+
+
+class Denylist:
+    """Revoked JWTs, checked from memory on every `@jwt_required()` request.
+
+    Revocations are written to `revoked_tokens` and added to the worker's
+    own set at once. Every `JWT_DENYLIST_SYNC_SECONDS` the next check pulls
+    the rows other workers wrote since the last pull, so a token revoked
+    elsewhere is honoured within that interval. Entries leave the set when
+    the token would have expired anyway.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JWT_DENYLIST_SYNC_SECONDS', 5)
+        app.extensions['denylist'] = _State()
+        jwt.token_in_blocklist_loader(self._check)
+
+        with app.app_context():
+            try:
+                self.sync()
+            except SQLAlchemyError:
+                # No table yet, so nothing has been revoked
+                app.logger.info('Token denylist not loaded at startup')
+                self._synced(self.state, None)
+
+    @property
+    def state(self):
+        return current_app.extensions['denylist']
+
+    def _check(self, jwt_header, jwt_payload):
+        return self.is_revoked(jwt_payload['jti'])
+
+    def is_revoked(self, jti):
+        state = self.state
+        if time.monotonic() >= state.next_sync:
+            self.sync()
+        return jti in state.revoked
+
+    def _remember(self, state, jti, exp):
+        with state.lock:
+            if jti not in state.revoked:
+                state.revoked[jti] = exp
+                heapq.heappush(state.expiry, (exp, jti))
+
+    def _expire(self, state, now):
+        with state.lock:
+            while state.expiry and state.expiry[0][0] <= now:
+                _, jti = heapq.heappop(state.expiry)
+                state.revoked.pop(jti, None)
+
+    def _synced(self, state, started):
+        state.synced_at = started
+        state.next_sync = (
+            time.monotonic() + current_app.config['JWT_DENYLIST_SYNC_SECONDS']
+        )
+
+    def sync(self, session=None):
+        """Pull revocations from the table. A concurrent caller returns at
+        once and checks against the current set.
+        """
+        state = self.state
+        if not state.syncing.acquire(blocking=False):
+            return
+        try:
+            started = datetime.now(UTC)
+            stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.expires_at > started
+            )
+            if state.synced_at is not None:
+                # Overlap one interval, for revocations that committed late
+                interval = current_app.config['JWT_DENYLIST_SYNC_SECONDS']
+                stmt = stmt.where(
+                    RevokedToken.revoked_at
+                    >= state.synced_at - timedelta(seconds=interval)
+                )
+
+            for jti, expires_at in (session or db.session).execute(stmt):
+                self._remember(state, jti, timestamp(expires_at))
+            self._expire(state, started.timestamp())
+            self._synced(state, started)
+        finally:
+            state.syncing.release()
+
+    def revoke(self, *tokens, session=None):
+        """Revoke the tokens with the given decoded claims, in the caller's
+        transaction. Raises IntegrityError on flush if one already was.
+        """
+        session = session or db.session
+        session.add_all(
+            RevokedToken(
+                jti=claims['jti'],
+                type=claims['type'],
+                user_id=claims['sub'],
+                expires_at=datetime.fromtimestamp(claims['exp'], UTC),
+            )
+            for claims in tokens
+        )
+        session.flush()
+        for claims in tokens:
+            self._remember(self.state, claims['jti'], claims['exp'])
+
+    def purge(self, session=None):
+        """Delete rows for tokens that have expired. Returns the count."""
+        session = session or db.session
+        result = session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(UTC))
+        )
+        return result.rowcount
+
+
+denylist = Denylist()
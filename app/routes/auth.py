@@ -4,72 +4,156 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
+    decode_token,
+    get_jwt,
     jwt_required,
     get_jwt_identity,
 )
-from flasgger import swag_from
 from marshmallow import ValidationError
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
 
 from app import DOCS_DIR
+from app.docs import swag_from
+from app.availability import availability, duplicate_field
 from app.models import User
+from app.replicas import read_only
+from app.revocation import denylist
 from app.extensions import db
-from app.schemas import user_schema
+from app.hashing import hasher
+from app.schemas import user_validator
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 
+def string_errors(data, required=(), optional=()):
+    """Errors, worded like marshmallow's, for the fields of a JSON body that
+    are missing (`required` only) or not strings, checked before they are
+    normalized or hashed
+    """
+    errors = {}
+    for field in (*required, *optional):
+        value = data.get(field)
+        if value is None and field in required:
+            errors[field] = ['Missing data for required field.']
+        elif value is not None and not isinstance(value, str):
+            errors[field] = ['Not a valid string.']
+    return errors
+
+
 @auth_bp.route('/register', methods=['POST'])
 @swag_from(os.path.join(DOCS_DIR, 'auth/register.yml'))
 def register():
     data = request.json
-    username = data.get('username')
-    email = data.get('email')
-    password = data.get('password')
-
-    if db.session.scalar(select(User).where(User.email == email)):
-        return jsonify(message='That email already exists'), 409
-    elif db.session.scalar(select(User).where(User.username == username)):
-        return jsonify(message='That username already exists'), 409
+    if not isinstance(data, dict):
+        return jsonify(message='Expected a JSON object.'), 400
+    errors = string_errors(data, required=('password',))
+    password = data.pop('password', None)
 
-    password_hash = generate_password_hash(password)
-    data.pop('password')
+    try:
+        fields = user_validator.load(data)
+    except ValidationError as e:
+        errors = {**e.messages_dict, **errors}
+    if errors:
+        return jsonify(message='Validation failed.', errors=errors), 400
+    username = fields['username']
+    email = fields['email']
+
+    # A name the filter has not seen is free, so most sign-ups go straight
+    # to the INSERT. Others are looked up first so that retrying a taken
+    # name costs no password hash; the unique indexes still settle races.
+    if availability.might_exist('email', email) or availability.might_exist(
+        'username', username
+    ):
+        stmt = select(func.lower(User.email)).where(
+            or_(
+                func.lower(User.email) == email.lower(),
+                func.lower(User.username) == username.lower(),
+            )
+        )
+        taken = db.session.scalars(stmt).all()
+        if email.lower() in taken:
+            return jsonify(message='That email already exists'), 409
+        elif taken:
+            return jsonify(message='That username already exists'), 409
+
+    password_hash = hasher.hash(password)
 
     try:
-        user_schema.load(data, session=db.session)  # Validation
-        user = User(username=username, email=email, password_hash=password_hash)
-        db.session.add(user)
+        db.session.add(
+            User(username=username, email=email, password_hash=password_hash)
+        )
         db.session.commit()
-        return jsonify(message='User created succesfully'), 201
-    except ValidationError as e:
-        return jsonify(message='Validation failed.', errors=e.messages_dict), 400
+    except IntegrityError as e:
+        db.session.rollback()
+        field = duplicate_field(e)
+        if field is None:
+            return jsonify(message='Create failed', error=str(e)), 500
+        return jsonify(message=f'That {field} already exists'), 409
     except Exception as e:
         db.session.rollback()
         return jsonify(message='Create failed', error=str(e)), 500
 
+    availability.add(username, email)
+    return jsonify(message='User created succesfully'), 201
+
+
+@auth_bp.route('/availability', methods=['GET'])
+@swag_from(os.path.join(DOCS_DIR, 'auth/availability.yml'))
+@read_only
+def check_availability():
+    values = {
+        field: request.args[field]
+        for field in ('username', 'email')
+        if request.args.get(field)
+    }
+    if not values:
+        return jsonify(message='Pass a username, an email or both'), 400
+
+    if availability.stale:
+        availability.warm()
+
+    available = {
+        field: not availability.taken(field, value) for field, value in values.items()
+    }
+    return jsonify(message='Success', available=available)
+
 
 @auth_bp.route('/login', methods=['POST'])
 @swag_from(os.path.join(DOCS_DIR, 'auth/login.yml'))
 def login():
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify(message='Expected a JSON object.'), 400
+    errors = string_errors(data, required=('password',), optional=('username', 'email'))
+    if errors:
+        return jsonify(message='Validation failed.', errors=errors), 400
     username = data.get('username')
     email = data.get('email')
     password = data.get('password')
 
     if username:
-        user = db.session.scalar(select(User).where(User.username == username))
+        user = db.session.scalar(
+            select(User).where(func.lower(User.username) == username.lower())
+        )
     elif email:
-        user = db.session.scalar(select(User).where(User.email == email))
+        user = db.session.scalar(
+            select(User).where(func.lower(User.email) == email.lower())
+        )
     else:
         return jsonify(message='Enter username or email'), 401
 
     if not user:
         return jsonify(message='Bad email or username. User doesnt exist.'), 401
 
-    if not check_password_hash(user.password_hash, password):
+    if not hasher.verify(user.password_hash, password):
         return jsonify(message='Bad password.'), 401
 
+    # Upgrade hashes made with outdated parameters while we have the password
+    if hasher.needs_rehash(user.password_hash):
+        user.password_hash = hasher.hash(password)
+        db.session.commit()
+
     access_token = create_access_token(identity=user.id)
     refresh_token = create_refresh_token(identity=user.id)
     return jsonify(
@@ -83,6 +167,46 @@ def login():
 @jwt_required(refresh=True)
 @swag_from(os.path.join(DOCS_DIR, 'auth/refresh.yml'))
 def refresh():
+    claims = get_jwt()
+
+    # Rotation: the refresh token is spent. Of two concurrent refreshes
+    # with the same token, the primary key lets only one through.
+    try:
+        denylist.revoke(claims)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(message='Token has been revoked'), 401
+
     identity = get_jwt_identity()
     access_token = create_access_token(identity=identity)
-    return jsonify(access_token=access_token)
+    refresh_token = create_refresh_token(identity=identity)
+    return jsonify(access_token=access_token, refresh_token=refresh_token)
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+@swag_from(os.path.join(DOCS_DIR, 'auth/logout.yml'))
+def logout():
+    tokens = [get_jwt()]
+
+    # Revoke the session's refresh token along with its access token
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            claims = decode_token(refresh_token)
+        except Exception:
+            return jsonify(message='Invalid refresh token'), 400
+        if claims['type'] != 'refresh' or claims['sub'] != get_jwt_identity():
+            return jsonify(message='Invalid refresh token'), 400
+        if not denylist.is_revoked(claims['jti']):
+            tokens.append(claims)
+
+    try:
+        denylist.revoke(*tokens)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(message='Token has been revoked'), 401
+
+    return jsonify(message='Logged out')
@@ -0,0 +1,17 @@
+import os
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+
+from app import DOCS_DIR
+from app.docs import swag_from
+from app.cache import cache
+
+cache_bp = Blueprint('cache', __name__, url_prefix='/cache')
+
+
+@cache_bp.route('/stats', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'cache/stats.yml'))
+def get_cache_stats():
+    return jsonify(message='Success', stats=cache.stats())
@@ -0,0 +1,32 @@
+import os
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app import DOCS_DIR
+from app.docs import swag_from
+from app.conditional import validate
+from app.pagination import page_args
+from app.schemas import post_serializer
+from app.timeline import timeline
+
+feed_bp = Blueprint('feed', __name__, url_prefix='/feed')
+
+
+@feed_bp.route('', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'feed/get_feed.yml'))
+def get_feed():
+    current_user_id = get_jwt_identity()
+    try:
+        limit, cursor = page_args()
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    posts, next_cursor = timeline.page(current_user_id, limit, cursor)
+    validate(((post.id, post.updated_at) for post in posts), last_modified=False)
+    return jsonify(
+        message='Success',
+        posts=post_serializer.dump(posts, many=True),
+        next_cursor=next_cursor,
+    )
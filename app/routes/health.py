@@ -0,0 +1,22 @@
+import os
+
+from flask import Blueprint, jsonify
+
+from app import DOCS_DIR
+from app.docs import swag_from
+from app.engines import ping, pool_stats
+from app.extensions import db
+
+health_bp = Blueprint('health', __name__, url_prefix='/health')
+
+
+@health_bp.route('', methods=['GET'])
+@swag_from(os.path.join(DOCS_DIR, 'health/get_health.yml'))
+def get_health():
+    databases = {name: ping(engine) for name, engine in db.engines.items()}
+    healthy = all(databases.values())
+    return jsonify(
+        status='ok' if healthy else 'unavailable',
+        databases=databases,
+        pools=pool_stats(),
+    ), 200 if healthy else 503
@@ -0,0 +1,15 @@
+import os
+
+from flask import Blueprint, Response
+
+from app import DOCS_DIR
+from app.docs import swag_from
+from app.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+
+@metrics_bp.route('', methods=['GET'])
+@swag_from(os.path.join(DOCS_DIR, 'metrics/get_metrics.yml'))
+def get_metrics():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4')
@@ -4,13 +4,26 @@ from datetime import datetime
 from datetime import UTC
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flasgger import swag_from
 from marshmallow import ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 
 from app import DOCS_DIR
+from app.docs import swag_from
+from app.cache import cache, post_key, user_key
+from app.batch import batch_ids, batch_resources
+from app.conditional import cached_resource, validate
+from app.replicas import read_only
 from app.models import Post, User
+from app.events import events, posts_channel
 from app.extensions import db
-from app.schemas import post_schema
+from app.likes import likes
+from app.pagination import page_args, keyset_page
+from app.schemas import post_schema, post_serializer, post_validator
+from app.search import has_terms, search_page
+from app.tags import post_tags, untag_post, update_tags
+from app.timeline import fan_out_post, timeline
+from app.trending import trending
 
 posts_bp = Blueprint('posts', __name__, url_prefix='/posts')
 
@@ -23,14 +36,24 @@ def create_post():
     data['user_id'] = get_jwt_identity()
 
     try:
-        post_schema.load(data, session=db.session)  # Validation
-        post = Post(**data)
+        post = Post(**post_validator.load(data))
         db.session.add(post)
+        db.session.flush()
+
+        db.session.execute(
+            update(User)
+            .where(User.id == post.user_id)
+            .values(post_count=User.post_count + 1, updated_at=datetime.now(UTC))
+        )
+        fan_out_post.delay(post_id=post.id)
+        tags = update_tags(post)
         db.session.commit()
+        trending.add(tags)
 
-        return jsonify(
-            message='Post created successfully!', post=post_schema.dump(post)
-        ), 201
+        cache.delete(user_key(data['user_id']), user_key(data['user_id'], private=True))
+        payload = post_schema.dump(post)
+        events.publish(posts_channel(post.user_id), 'post_created', payload)
+        return jsonify(message='Post created successfully!', post=payload), 201
     except ValidationError as e:
         return jsonify(message='Validation failed.', errors=e.messages_dict), 400
     except Exception as e:
@@ -43,21 +66,102 @@ def create_post():
 @swag_from(os.path.join(DOCS_DIR, 'posts/delete_post.yml'))
 def delete_post(id):
     post = db.get_or_abort(Post, id)
+    user_id = post.user_id
     try:
+        timeline.remove_post(post)
+        likes.remove_post(post)
+        untag_post(post)
         db.session.delete(post)
+        db.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(post_count=User.post_count - 1, updated_at=datetime.now(UTC))
+        )
         db.session.commit()
+        cache.delete(post_key(id), user_key(user_id), user_key(user_id, private=True))
+        events.publish(
+            posts_channel(user_id), 'post_deleted', {'id': id, 'user_id': user_id}
+        )
         return jsonify(message='Post deleted successfully!')
     except Exception as e:
         db.session.rollback()
         return jsonify(message='Failed to create post', error=str(e)), 500
 
 
+@posts_bp.route('/<int:id>/like', methods=['POST'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'posts/like_post.yml'))
+def like_post(id):
+    db.one_or_abort(select(Post.id).where(Post.id == id))
+
+    try:
+        likes.like(id, get_jwt_identity())
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(message='You already like this post'), 409
+
+    try:
+        db.session.commit()
+        return jsonify(message='Post liked successfully'), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(message='Like failed', error=str(e)), 500
+
+
+@posts_bp.route('/<int:id>/unlike', methods=['DELETE'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'posts/unlike_post.yml'))
+def unlike_post(id):
+    try:
+        if not likes.unlike(id, get_jwt_identity()):
+            db.session.rollback()
+            return jsonify(message='You do not like this post'), 404
+
+        db.session.commit()
+        return jsonify(message='Post unliked successfully')
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(message='Unlike failed', error=str(e)), 500
+
+
+@posts_bp.route('/<int:id>/likes', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'posts/get_post_likes.yml'))
+@read_only
+def get_post_likes(id):
+    count = likes.count(id)
+    liked = likes.liked(id, get_jwt_identity())
+    # Only a post nobody likes needs checking for existence
+    if not count and not liked:
+        db.one_or_abort(select(Post.id).where(Post.id == id))
+    return jsonify(message='Success', likes=count, liked=liked)
+
+
 @posts_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 @swag_from(os.path.join(DOCS_DIR, 'posts/get_post.yml'))
+@read_only
 def get_post(id):
-    post = db.get_or_abort(Post, id)
-    return jsonify(message='Success', post=post_schema.dump(post))
+    post = cached_resource(post_key(id), Post, id, post_serializer.dump)
+    return jsonify(message='Success', post=post)
+
+
+@posts_bp.route('/batch', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'posts/get_posts_batch.yml'))
+@read_only
+def get_posts_batch():
+    try:
+        ids = batch_ids()
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    posts, missing = batch_resources(ids, post_key, Post, post_serializer)
+    validate(
+        ((post['id'], post['updated_at']) for post in posts),
+        last_modified=False,
+    )
+    return jsonify(message='Success', posts=posts, missing=missing)
 
 
 @posts_bp.route('/<int:id>/edit', methods=['PUT'])
@@ -67,35 +171,30 @@ def edit_post(id):
     post = db.get_or_abort(Post, id)
     data = request.get_json()
 
-    data['user_id'] = get_jwt_identity()
-
     allowed_fields = ['title', 'content']
+    changes = {field: data[field] for field in allowed_fields if field in data}
 
-    updated_fields = []
-
-    for field in allowed_fields:
-        if field in data:
-            value = data[field]
-            if value is not None and value != '':
-                setattr(post, field, data[field])
-                updated_fields.append(field)
-            elif value is None:
-                setattr(post, field, None)
-                updated_fields.append(field)
-
-    if not updated_fields:
+    if not changes:
         return jsonify(message='No valid fields to update'), 400
 
+    try:
+        changes = post_validator.load(changes, partial=True)
+    except ValidationError as e:
+        return jsonify(message='Validation failed.', errors=e.messages_dict), 400
+
+    before = post_tags(post)
+    for field, value in changes.items():
+        setattr(post, field, value)
     post.updated_at = datetime.now(UTC)
 
     try:
-        post_schema.load(data, session=db.session)  # Validation
+        tags = update_tags(post, before)
         db.session.commit()
-        return jsonify(
-            message='Post updated successfully', post=post_schema.dump(post)
-        ), 200
-    except ValidationError as e:
-        return jsonify(message='Validation failed.', errors=e.messages_dict), 400
+        trending.add(tags)
+        cache.delete(post_key(id))
+        payload = post_schema.dump(post)
+        events.publish(posts_channel(post.user_id), 'post_edited', payload)
+        return jsonify(message='Post updated successfully', post=payload), 200
     except Exception as e:
         db.session.rollback()
         return jsonify(message='Update failed', error=str(e)), 500
@@ -104,6 +203,50 @@ def edit_post(id):
 @posts_bp.route('/user/<int:id>', methods=['GET'])
 @jwt_required()
 @swag_from(os.path.join(DOCS_DIR, 'posts/get_user_posts.yml'))
+@read_only
 def get_user_posts(id):
-    user = db.get_or_abort(User, id)
-    return jsonify(message='Success', posts=post_schema.dump(user.posts, many=True))
+    try:
+        limit, cursor = page_args()
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    posts, next_cursor = keyset_page(
+        db.session,
+        select(Post).where(Post.user_id == id),
+        Post.created_at,
+        Post.id,
+        limit,
+        cursor,
+    )
+
+    # Only an empty page needs to tell "no posts" apart from "no such user"
+    if not posts and cursor is None:
+        db.one_or_abort(select(User.id).where(User.id == id))
+
+    validate(((post.id, post.updated_at) for post in posts), last_modified=False)
+    return jsonify(
+        message='Success',
+        posts=post_serializer.dump(posts, many=True),
+        next_cursor=next_cursor,
+    )
+
+
+@posts_bp.route('/search', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'posts/search_posts.yml'))
+@read_only
+def search_posts():
+    q = request.args.get('q')
+    if not has_terms(q):
+        return jsonify(message='q must contain at least one word'), 400
+    try:
+        limit, cursor = page_args(parse=float)
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    posts, next_cursor = search_page(db.session, q, limit, cursor)
+    return jsonify(
+        message='Success',
+        posts=post_serializer.dump(posts, many=True),
+        next_cursor=next_cursor,
+    )
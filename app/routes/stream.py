@@ -0,0 +1,74 @@
+import os
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+
+from app import DOCS_DIR
+from app.batch import batch_ids
+from app.docs import swag_from
+from app.events import StreamsFull, events, inbox_channel, posts_channel
+from app.extensions import db
+from app.models import Follow
+from app.replicas import read_only
+
+stream_bp = Blueprint('stream', __name__)
+
+
+@stream_bp.before_request
+def sync_serving_only():
+    # A stream's body is a blocking generator that holds a thread while the
+    # connection is open. Under asgi.py that would be one of the
+    # ASYNC_VIEWS_THREADS every other request of the worker runs on
+    if current_app.config['ASYNC_VIEWS']:
+        return (
+            jsonify(message='Event streams are not served in the async serving mode'),
+            501,
+        )
+
+
+@stream_bp.route('/stream', methods=['GET'])
+# EventSource cannot set headers, so browsers pass the token as ?jwt=
+@jwt_required(locations=['headers', 'query_string'])
+@swag_from(os.path.join(DOCS_DIR, 'stream/get_stream.yml'))
+@read_only
+def stream():
+    current_user_id = get_jwt_identity()
+    if 'users' in request.args:
+        try:
+            user_ids = batch_ids('users')
+        except ValueError as e:
+            return jsonify(message=str(e)), 400
+    else:
+        user_ids = [current_user_id]
+        user_ids += db.session.scalars(
+            select(Follow.followee_id)
+            .where(Follow.follower_id == current_user_id)
+            .order_by(Follow.created_at.desc())
+            .limit(current_app.config['STREAM_MAX_FOLLOWEES'])
+        )
+
+    channels = [posts_channel(id) for id in user_ids]
+    channels.append(inbox_channel(current_user_id))
+    hub = events.hub
+    try:
+        subscriber = hub.subscribe(channels)
+    except StreamsFull:
+        return (
+            jsonify(message='Too many open streams, try again shortly'),
+            503,
+            {'Retry-After': '5'},
+        )
+
+    # Not wrapped in stream_with_context: the request context, and with it
+    # the database session, is released while the connection stays open
+    heartbeat = current_app.config['STREAM_HEARTBEAT_SECONDS']
+    response = Response(
+        hub.stream(subscriber, heartbeat),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # The server closes the body even if it never started sending it, when
+    # a generator's `finally` would not run
+    response.call_on_close(lambda: hub.unsubscribe(subscriber))
+    return response
@@ -0,0 +1,59 @@
+import os
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import DOCS_DIR
+from app.docs import swag_from
+from app.conditional import validate
+from app.extensions import db
+from app.pagination import keyset_select, page_args, split_page
+from app.models import PostTag
+from app.replicas import read_only
+from app.schemas import post_serializer
+from app.tags import tag_page_select
+from app.trending import trending
+
+tags_bp = Blueprint('tags', __name__)
+
+
+@tags_bp.route('/tags/<tag>/posts', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'tags/get_tag_posts.yml'))
+@read_only
+def get_tag_posts(tag):
+    try:
+        limit, cursor = page_args()
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    stmt = keyset_select(
+        tag_page_select(tag.lower()),
+        PostTag.created_at,
+        PostTag.post_id,
+        limit,
+        cursor,
+    )
+    posts, next_cursor = split_page(db.session.scalars(stmt).all(), limit)
+
+    validate(((post.id, post.updated_at) for post in posts), last_modified=False)
+    return jsonify(
+        message='Success',
+        posts=post_serializer.dump(posts, many=True),
+        next_cursor=next_cursor,
+    )
+
+
+@tags_bp.route('/trending', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'tags/get_trending.yml'))
+@read_only
+def get_trending():
+    limit = request.args.get('limit', current_app.config['TRENDING_TOP_K'], type=int)
+    if limit is None or limit < 1:
+        return jsonify(message='Invalid limit'), 400
+
+    if trending.stale:
+        trending.warm()
+    tags = [{'tag': tag, 'count': count} for tag, count in trending.top(limit)]
+    return jsonify(message='Success', tags=tags)
@@ -4,13 +4,28 @@ from datetime import datetime
 from datetime import UTC
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flasgger import swag_from
 from marshmallow import ValidationError
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
 
 from app import DOCS_DIR
-from app.models import User
+from app.docs import swag_from
+from app.cache import cache, user_key
+from app.batch import batch_ids, batch_resources
+from app.conditional import cached_resource, validate
+from app.replicas import read_only, streamed
+from app.models import Follow, User
+from app.export import export_response, export_select
+from app.events import events, inbox_channel
 from app.extensions import db
-from app.schemas import user_schema, public_user_schema
+from app.schemas import (
+    post_serializer,
+    user_schema,
+    user_serializer,
+    user_validator,
+    public_user_serializer,
+)
+from app.timeline import timeline
 
 users_bp = Blueprint('users', __name__, url_prefix='/users')
 
@@ -18,18 +33,58 @@ users_bp = Blueprint('users', __name__, url_prefix='/users')
 @users_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 @swag_from(os.path.join(DOCS_DIR, 'users/get_user.yml'))
+@read_only
 def get_user(id):
-    user = db.get_or_abort(User, id)
-    return jsonify(message='Success', user=public_user_schema.dump(user))
+    user = cached_resource(user_key(id), User, id, public_user_serializer.dump)
+    return jsonify(message='Success', user=user)
+
+
+@users_bp.route('/batch', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'users/get_users_batch.yml'))
+@read_only
+def get_users_batch():
+    try:
+        ids = batch_ids()
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    users, missing = batch_resources(ids, user_key, User, public_user_serializer)
+    validate(
+        ((user['id'], user['updated_at']) for user in users),
+        last_modified=False,
+    )
+    return jsonify(message='Success', users=users, missing=missing)
 
 
 @users_bp.route('/me', methods=['GET'])
 @jwt_required()
 @swag_from(os.path.join(DOCS_DIR, 'users/get_current_user.yml'))
 def get_current_user():
+    current_user_id = get_jwt_identity()
+    user = cached_resource(
+        user_key(current_user_id, private=True),
+        User,
+        current_user_id,
+        user_serializer.dump,
+    )
+    return jsonify(user)
+
+
+@users_bp.route('/me/export', methods=['GET'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'users/export_current_user.yml'))
+@read_only
+def export_current_user():
     current_user_id = get_jwt_identity()
     user = db.get_or_abort(User, current_user_id)
-    return jsonify(user_schema.dump(user))
+
+    def batches():
+        result = db.session.scalars(export_select(current_user_id))
+        for posts in result.partitions():
+            yield post_serializer.dump(posts, many=True)
+
+    return export_response(user_serializer.dump(user), streamed(batches()))
 
 
 @users_bp.route('/me/edit', methods=['PUT'])
@@ -49,32 +104,104 @@ def edit_current_user():
         'cover_photo_url',
     ]
 
-    updated_fields = []
+    # An empty string leaves a field as it is, None clears it
+    changes = {
+        field: data[field]
+        for field in allowed_fields
+        if field in data and data[field] != ''
+    }
 
-    for field in allowed_fields:
-        if field in data:
-            value = data[field]
-            if value is not None and value != '':
-                setattr(user, field, data[field])
-                updated_fields.append(field)
-            elif value is None:
-                setattr(user, field, None)
-                updated_fields.append(field)
-
-    if not updated_fields:
+    if not changes:
         return jsonify(message='No valid fields to update'), 400
 
+    try:
+        changes = user_validator.load(changes, partial=True)
+    except ValidationError as e:
+        return jsonify(message='Validation failed.', error=e.messages_dict), 400
+
+    for field, value in changes.items():
+        setattr(user, field, value)
     user.updated_at = datetime.now(UTC)
 
     try:
-        data = user_schema.dump(user)
-        user_schema.load(data, session=db.session)  # Validation
         db.session.commit()
+        cache.delete(user_key(current_user_id), user_key(current_user_id, private=True))
         return jsonify(
             message='User updated successfully', user=user_schema.dump(user)
         ), 200
-    except ValidationError as e:
-        return jsonify(message='Validation failed.', error=e.messages_dict), 400
     except Exception as e:
         db.session.rollback()
         return jsonify(message='Update failed', error=str(e)), 500
+
+
+@users_bp.route('/<int:id>/follow', methods=['POST'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'users/follow_user.yml'))
+def follow_user(id):
+    current_user_id = get_jwt_identity()
+    if id == current_user_id:
+        return jsonify(message='You cannot follow yourself'), 400
+
+    followee = db.get_or_abort(User, id)
+    pulled = timeline.pulls(followee.follower_count)
+
+    try:
+        db.session.add(
+            Follow(follower_id=current_user_id, followee_id=id, pulled=pulled)
+        )
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(message='You already follow this user'), 409
+
+    try:
+        db.session.execute(
+            update(User)
+            .where(User.id == id)
+            .values(
+                follower_count=User.follower_count + 1,
+                updated_at=datetime.now(UTC),
+            )
+        )
+        if not pulled:
+            timeline.backfill(current_user_id, id)
+        db.session.commit()
+        cache.delete(user_key(id), user_key(id, private=True))
+        events.publish(inbox_channel(id), 'followed', {'follower_id': current_user_id})
+        return jsonify(message='User followed successfully'), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(message='Follow failed', error=str(e)), 500
+
+
+@users_bp.route('/<int:id>/unfollow', methods=['DELETE'])
+@jwt_required()
+@swag_from(os.path.join(DOCS_DIR, 'users/unfollow_user.yml'))
+def unfollow_user(id):
+    current_user_id = get_jwt_identity()
+
+    try:
+        result = db.session.execute(
+            delete(Follow).where(
+                Follow.follower_id == current_user_id, Follow.followee_id == id
+            )
+        )
+        if not result.rowcount:
+            db.session.rollback()
+            return jsonify(message='You do not follow this user'), 404
+
+        db.session.execute(
+            update(User)
+            .where(User.id == id)
+            .values(
+                follower_count=User.follower_count - 1,
+                updated_at=datetime.now(UTC),
+            )
+        )
+        timeline.evict(current_user_id, id)
+        db.session.commit()
+        cache.delete(user_key(id), user_key(id, private=True))
+        return jsonify(message='User unfollowed successfully')
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(message='Unfollow failed', error=str(e)), 500
@@ -4,6 +4,10 @@ from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 
 
 from app.models import User, Post
+from app.serializers import compile_schema
+
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+URL_RE = re.compile(r'^https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(/.*)?$')
 
 
 class PostSchema(SQLAlchemyAutoSchema):
@@ -32,29 +36,40 @@ class UserSchema(SQLAlchemyAutoSchema):
     @validates('display_name')
     @validates('location')
     def validate_user(self, value, data_key):
-        if not value or len(value.rstrip()) < 3:
+        # None clears a nullable field, username is rejected as null earlier
+        if value is None:
+            return
+        if len(value.rstrip()) < 3:
             raise ValidationError(f'{data_key} must be at least 3 characters long')
 
     @validates('email')
     def validate_email(self, value, data_key):
-        email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_regex, value):
+        if not EMAIL_RE.match(value):
             raise ValidationError('Invalid email format')
 
     @validates('profile_picture_url')
     @validates('cover_photo_url')
     @validates('website')
     def validate_url(self, value, data_key):
-        url_regex = r'^https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(/.*)?$'
-        if not re.match(url_regex, value):
+        if value is not None and not URL_RE.match(value):
             raise ValidationError('Invalid URL format')
 
 
 class PublicUserSchema(SQLAlchemyAutoSchema):
     class Meta(UserSchema.Meta):
-        exclude = ('email',)
+        exclude = UserSchema.Meta.exclude + ('email',)
 
 
 user_schema = UserSchema()
 public_user_schema = PublicUserSchema()
 post_schema = PostSchema()
+
+# Validation only: field and @validates rules, loading plain dicts without
+# building or looking up model instances
+user_validator = UserSchema(load_instance=False)
+post_validator = PostSchema(load_instance=False)
+
+# Dump-only fast paths for read endpoints, see app/serializers.py
+user_serializer = compile_schema(user_schema)
+public_user_serializer = compile_schema(public_user_schema)
+post_serializer = compile_schema(post_schema)
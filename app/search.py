@@ -0,0 +1,60 @@
+import re
+
+from sqlalchemy import column, func, literal_column, select, table
+
+from app.models import Post
+from app.pagination import keyset_select, split_page
+
+WORD = re.compile(r'\w+')
+
+posts_fts = table('posts_fts', column('rowid'))
+
+
+def has_terms(q):
+    return q is not None and WORD.search(q) is not None
+
+
+def fts5_query(q):
+    """Quote every word so FTS5 reads free text as an AND of terms, never as
+    query syntax
+    """
+    return ' '.join(f'"{word}"' for word in WORD.findall(q))
+
+
+def ranked_matches(dialect, q):
+    """Select `(id, rank)` of the posts matching `q`, best match highest.
+
+    See `SEARCH_DDL` in `app.models.post` for the index each dialect uses.
+    """
+    if dialect == 'postgresql':
+        vector = literal_column('posts.search_vector')
+        query = func.websearch_to_tsquery('english', q)
+        return select(
+            Post.id.label('id'), func.ts_rank_cd(vector, query).label('rank')
+        ).where(vector.op('@@')(query))
+
+    if dialect == 'sqlite':
+        fts = literal_column('posts_fts')
+        return select(
+            posts_fts.c.rowid.label('id'),
+            # bm25 is lower for better matches, title weighs twice the content
+            (-func.bm25(fts, 2.0, 1.0)).label('rank'),
+        ).where(fts.op('MATCH')(fts5_query(q)))
+
+    raise RuntimeError(f'Full-text search is not supported on {dialect!r}.')
+
+
+def search_page(session, q, limit, cursor=None):
+    """One page of posts matching `q`, keyset-paginated by `(rank, id)`.
+    Returns `(posts, next_cursor)`.
+    """
+    ranked = ranked_matches(session.get_bind().dialect.name, q).subquery()
+    stmt = keyset_select(
+        select(Post, ranked.c.rank, ranked.c.id).join(ranked, ranked.c.id == Post.id),
+        ranked.c.rank,
+        ranked.c.id,
+        limit,
+        cursor,
+    )
+    rows, next_cursor = split_page(session.execute(stmt).all(), limit, 'rank', 'id')
+    return [row.Post for row in rows], next_cursor
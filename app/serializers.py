@@ -0,0 +1,171 @@
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import fields
+from marshmallow.schema import POST_DUMP, PRE_DUMP
+
+# Field types whose dump is reproduced inline. Strings and integers pass
+# through as loaded, SQLAlchemy already hands them back as str and int.
+PASSTHROUGH = (fields.String, fields.Integer)
+TEMPORAL = (fields.DateTime, fields.Date, fields.Time)
+
+
+class CompiledSchema:
+    """Dump-only stand-in for a marshmallow schema.
+
+    `compile_schema` generates one function per schema that builds the
+    output dict in a single expression, with the same keys, key order,
+    excludes and datetime formats as `schema.dump`. Loaded column values
+    are read straight from the instance `__dict__`; if one is expired or
+    deferred the object goes through attribute access instead, which loads
+    it. Fields with no inline form are dumped by the marshmallow field.
+    """
+
+    def __init__(self, schema, dump, source):
+        self.schema = schema
+        self.source = source
+        self._dump = dump
+
+    def dump(self, obj, *, many=False):
+        if many:
+            dump = self._dump
+            return [dump(item) for item in obj]
+        return self._dump(obj)
+
+
+def _value(field, attr, name, namespace, value):
+    """Source for the dumped value of `attr`, read by the `value` expression,
+    with `field`'s formatting
+    """
+    if isinstance(field, TEMPORAL):
+        fmt = field.format or field.DEFAULT_FORMAT
+        func = field.SERIALIZATION_FUNCS.get(fmt)
+        if func is None:
+            namespace[f'{name}_format'] = fmt
+            call = f'v.strftime({name}_format)'
+        elif func is type(field).SERIALIZATION_FUNCS['iso']:
+            call = 'v.isoformat()'
+        else:
+            namespace[f'{name}_func'] = func
+            call = f'{name}_func(v)'
+        return f'(None if (v := {value}) is None else {call})'
+
+    if isinstance(field, PASSTHROUGH) and not getattr(field, 'as_string', False):
+        return value
+
+    namespace[name] = field
+    return f'{name}.serialize({attr!r}, obj)'
+
+
+def compile_schema(schema):
+    """Generate a `CompiledSchema` for a marshmallow schema instance.
+
+    Schemas with dump hooks or dotted attributes are not compiled, their
+    `CompiledSchema` calls `schema.dump` as is.
+    """
+    if schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP]:
+        return CompiledSchema(schema, schema.dump, None)
+
+    namespace = {}
+    fast, slow = [], []
+    for i, (field_name, field) in enumerate(schema.dump_fields.items()):
+        attr = field.attribute or field_name
+        if '.' in attr or not attr.isidentifier():
+            return CompiledSchema(schema, schema.dump, None)
+        key = field.data_key if field.data_key is not None else field_name
+        name = f'_f{i}'
+        loaded = _value(field, attr, name, namespace, f'd[{attr!r}]')
+        fast.append(f'{key!r}: {loaded},')
+        accessed = _value(field, attr, name, namespace, f'obj.{attr}')
+        slow.append(f'{key!r}: {accessed},')
+
+    name = f'dump_{type(schema).__name__}'
+    source = '\n'.join(
+        [
+            f'def {name}_attrs(obj):',
+            '    return {',
+            *(f'        {item}' for item in slow),
+            '    }',
+            '',
+            f'def {name}(obj):',
+            '    try:',
+            '        d = obj.__dict__',
+            '        return {',
+            *(f'            {item}' for item in fast),
+            '        }',
+            '    except (KeyError, AttributeError):',
+            f'        return {name}_attrs(obj)',
+        ]
+    )
+    exec(compile(source, f'<compiled {type(schema).__name__}>', 'exec'), namespace)
+    return CompiledSchema(schema, namespace[name], source)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """`app.json` provider that encodes responses with orjson.
+
+    Output matches the default provider (sorted keys, compact, Flask's
+    handling of dates, decimals and dataclasses) except that non-ASCII text
+    is written as UTF-8 instead of `\\u` escapes. Pretty-printed debug
+    output and anything orjson cannot encode go through the default.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+
+        self._orjson = orjson
+        self._options = (
+            orjson.OPT_NON_STR_KEYS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def _encode(self, obj, option=0):
+        if self.sort_keys:
+            option |= self._orjson.OPT_SORT_KEYS
+        return self._orjson.dumps(
+            obj, default=self.default, option=self._options | option
+        )
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return self._encode(obj).decode()
+        except TypeError:
+            return super().dumps(obj)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = self._encode(obj, self._orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Pick the response encoder from `JSON_ENCODER`: `auto` (orjson when
+    installed, default), `orjson` or `stdlib`. orjson is a dependency, so
+    `auto` only falls back to the stdlib, with a warning, when it was left
+    out of the environment.
+    """
+    app.config.setdefault('JSON_ENCODER', 'auto')
+    encoder = app.config['JSON_ENCODER']
+    if encoder not in ('auto', 'orjson', 'stdlib'):
+        raise RuntimeError(f'Unknown JSON_ENCODER {encoder!r}')
+
+    if encoder == 'stdlib':
+        return
+    try:
+        app.json = OrjsonProvider(app)
+    except ImportError as e:
+        if encoder == 'orjson':
+            raise RuntimeError(
+                "JSON_ENCODER = 'orjson' requires the 'orjson' package"
+            ) from e
+        app.logger.warning('orjson is not installed, encoding JSON with the stdlib')
+    else:
+        app.logger.info('Encoding JSON with orjson')
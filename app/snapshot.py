@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class Snapshot:
+    """An in-memory structure rebuilt from the database now and then, such
+    as the availability Bloom filter or the trending tag counts.
+
+    `rebuild` builds a replacement while requests keep using `value`.
+    Items `record`ed meanwhile are applied to both, so the replacement
+    misses none of the writes that committed while its rows were read.
+    """
+
+    def __init__(self, value=None):
+        self.value = value
+        self.warmed_at = None
+        self.lock = threading.Lock()
+        self._building = threading.Lock()
+        self._pending = None
+
+    def stale(self, max_age):
+        if self.warmed_at is None:
+            return True
+        return time.monotonic() - self.warmed_at > max_age
+
+    def rebuild(self, build, apply):
+        """Replace `value` with `build()`, then `apply(value, item)` for each
+        item recorded since it started. Concurrent callers return at once
+        and keep using the current value.
+        """
+        if not self._building.acquire(blocking=False):
+            return
+        try:
+            with self.lock:
+                self._pending = []
+
+            value = build()
+
+            with self.lock:
+                for item in self._pending:
+                    apply(value, item)
+                self.value = value
+                self.warmed_at = time.monotonic()
+        finally:
+            with self.lock:
+                self._pending = None
+            self._building.release()
+
+    def record(self, items, apply):
+        """`apply(value, item)` for each item now, and again after a rebuild
+        in progress
+        """
+        with self.lock:
+            for item in items:
+                if self.value is not None:
+                    apply(self.value, item)
+                if self._pending is not None:
+                    self._pending.append(item)
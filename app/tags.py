@@ -0,0 +1,109 @@
+import re
+
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import delete, func, insert, select
+
+from app.extensions import db
+from app.models import Post, PostTag
+
+# `#word` not inside a word or after another `#`
+TAG = re.compile(r'(?<![\w#])#(\w+)')
+MAX_TAG_LENGTH = 64
+
+
+def extract_tags(*texts):
+    """Lower-cased hashtags in `texts`, in order of first appearance.
+    Tags longer than `MAX_TAG_LENGTH` are ignored.
+    """
+    tags = {}
+    for text in texts:
+        for tag in TAG.findall(text or ''):
+            if len(tag) <= MAX_TAG_LENGTH:
+                tags.setdefault(tag.lower(), None)
+    return list(tags)
+
+
+def post_tags(post):
+    return extract_tags(post.title, post.content)
+
+
+def update_tags(post, before=(), session=None):
+    """Bring a flushed post's `post_tags` rows in line with its text.
+    `before` are its tags before the change, empty for a new post. Returns
+    the tags that were added.
+    """
+    session = session or db.session
+    after = post_tags(post)
+    added = [tag for tag in after if tag not in before]
+    removed = [tag for tag in before if tag not in after]
+
+    if removed:
+        session.execute(
+            delete(PostTag).where(PostTag.post_id == post.id, PostTag.tag.in_(removed))
+        )
+    if added:
+        now = datetime.now(UTC)
+        session.execute(
+            insert(PostTag),
+            [
+                {
+                    'post_id': post.id,
+                    'tag': tag,
+                    'created_at': post.created_at,
+                    'tagged_at': now,
+                }
+                for tag in added
+            ],
+        )
+    return added
+
+
+def untag_post(post, session=None):
+    (session or db.session).execute(delete(PostTag).where(PostTag.post_id == post.id))
+
+
+def tag_page_select(tag):
+    """Posts tagged `tag`, for `keyset_select` on `(PostTag.created_at,
+    PostTag.post_id)`, which the tag's index serves
+    """
+    return (
+        select(Post).join(PostTag, PostTag.post_id == Post.id).where(PostTag.tag == tag)
+    )
+
+
+def reindex(first_id, last_id, session=None):
+    """Rebuild `post_tags` for posts with ids in `[first_id, last_id]`.
+    When a tag was added is not known here, it is taken to be when the
+    post was created. `session` can also be a Connection. Returns the
+    number of tags written.
+    """
+    session = session or db.session
+    session.execute(delete(PostTag).where(PostTag.post_id.between(first_id, last_id)))
+    rows = [
+        {'post_id': id, 'tag': tag, 'created_at': created_at, 'tagged_at': created_at}
+        for id, title, content, created_at in session.execute(
+            select(Post.id, Post.title, Post.content, Post.created_at).where(
+                Post.id.between(first_id, last_id)
+            )
+        )
+        for tag in extract_tags(title, content)
+    ]
+    if rows:
+        session.execute(insert(PostTag), rows)
+    return len(rows)
+
+
+def reindex_all(batch_size=1000, session=None):
+    """Walk `posts` by id range, committing each batch. Yields the number
+    of tags written per batch.
+    """
+    session = session or db.session
+    first, last = session.execute(select(func.min(Post.id), func.max(Post.id))).one()
+    if first is None:
+        return
+
+    for start in range(first, last + 1, batch_size):
+        count = reindex(start, start + batch_size - 1, session)
+        session.commit()
+        yield count
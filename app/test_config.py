@@ -2,6 +2,7 @@
 TESTING = True
 SQLALCHEMY_ENGINES = {'default': 'sqlite:///:memory'}
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+SQL_DETECT_N_PLUS_ONE = True
 
 # ALEMBIC
 ALEMBIC = {'script_location': '../migrations'}
@@ -9,3 +10,11 @@ ALEMBIC = {'script_location': '../migrations'}
 # jwt
 JWT_SECRET_KEY = 'test-secret-keyKlM2254'
 JWT_VERIFY_SUB = False
+JWT_DENYLIST_SYNC_SECONDS = 3600  # tests sync explicitly
+
+# password hashing
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+PASSWORD_HASH_WORKERS = 0
+
+# background jobs
+JOBS_EAGER = True
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+
+from flask import current_app
+from sqlalchemy import func, select, insert, delete, literal, tuple_, DateTime, Integer
+
+from app.extensions import db
+from app.jobs import job
+from app.models import Follow, Post, TimelineEntry
+from app.pagination import keyset_select, split_page
+
+
+class Timeline:
+    """Home timeline engine.
+
+    Posts are pushed into each follower's precomputed timeline
+    (`timeline_entries`) by the `fan_out_post` job, queued in the
+    transaction that creates the post. A follow of an account that already
+    has more than `TIMELINE_FANOUT_THRESHOLD` followers is made `pulled`
+    instead: its posts are not pushed but read from the posts index and
+    merged in. A follow keeps its mode, so no post is lost or doubled when
+    the author's follower count crosses the threshold later.
+    `flask timelines trim`, run periodically, cuts timelines back to their
+    newest `TIMELINE_MAX_LENGTH` entries, off the request path.
+
+    The write methods take an optional `session` for use outside a request,
+    by jobs and CLI commands, by default `db.session`.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TIMELINE_MAX_LENGTH', 800)
+        app.config.setdefault('TIMELINE_FANOUT_THRESHOLD', 10000)
+        app.extensions['timeline'] = self
+
+    @property
+    def threshold(self):
+        return current_app.config['TIMELINE_FANOUT_THRESHOLD']
+
+    @property
+    def max_length(self):
+        return current_app.config['TIMELINE_MAX_LENGTH']
+
+    def pulls(self, follower_count):
+        """Whether a new follow of an account with `follower_count`
+        followers is `pulled`
+        """
+        return follower_count > self.threshold
+
+    def fan_out(self, post, session=None):
+        """Push a flushed post to its author and to every follower whose
+        follow is not `pulled`, with a single INSERT ... SELECT.
+
+        Skips timelines that already have the post, from a follow's
+        backfill or an earlier run of the job, so it can be retried.
+        """
+        values = (
+            literal(post.id, Integer),
+            literal(post.user_id, Integer),
+            literal(post.created_at, DateTime),
+        )
+        rows = (
+            select(literal(post.user_id, Integer).label('user_id'), *values)
+            .union_all(
+                select(Follow.follower_id, *values).where(
+                    Follow.followee_id == post.user_id, ~Follow.pulled
+                )
+            )
+            .subquery()
+        )
+        pushed = select(TimelineEntry.user_id).where(
+            TimelineEntry.user_id == rows.c.user_id,
+            TimelineEntry.post_id == post.id,
+        )
+
+        (session or db.session).execute(
+            insert(TimelineEntry).from_select(
+                ['user_id', 'post_id', 'author_id', 'created_at'],
+                select(rows).where(~pushed.exists()),
+            )
+        )
+
+    def remove_post(self, post, session=None):
+        (session or db.session).execute(
+            delete(TimelineEntry).where(TimelineEntry.post_id == post.id)
+        )
+
+    def backfill(self, user_id, author_id, session=None):
+        """Copy the author's recent posts into the timeline of a new follower
+        whose follow is not `pulled`
+        """
+        recent = (
+            select(
+                literal(user_id, Integer),
+                Post.id,
+                Post.user_id,
+                Post.created_at,
+            )
+            .where(Post.user_id == author_id)
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .limit(self.max_length)
+        )
+        (session or db.session).execute(
+            insert(TimelineEntry).from_select(
+                ['user_id', 'post_id', 'author_id', 'created_at'], recent
+            )
+        )
+
+    def evict(self, user_id, author_id, session=None):
+        (session or db.session).execute(
+            delete(TimelineEntry).where(
+                TimelineEntry.user_id == user_id,
+                TimelineEntry.author_id == author_id,
+            )
+        )
+
+    def trim(self, user_id, session=None):
+        """Drop entries beyond the newest `TIMELINE_MAX_LENGTH`. Returns the
+        count.
+        """
+        session = session or db.session
+        boundary = session.execute(
+            select(TimelineEntry.created_at, TimelineEntry.post_id)
+            .where(TimelineEntry.user_id == user_id)
+            .order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+            .offset(self.max_length - 1)
+            .limit(1)
+        ).first()
+        if boundary is None:
+            return 0
+
+        result = session.execute(
+            delete(TimelineEntry).where(
+                TimelineEntry.user_id == user_id,
+                tuple_(TimelineEntry.created_at, TimelineEntry.post_id)
+                < tuple_(*boundary),
+            )
+        )
+        return result.rowcount
+
+    def trim_all(self, batch_size=1000, session=None):
+        """Trim every timeline longer than `TIMELINE_MAX_LENGTH`, committing
+        per batch of users. Yields the number of entries deleted per batch.
+        """
+        session = session or db.session
+        user_ids = session.scalars(
+            select(TimelineEntry.user_id)
+            .group_by(TimelineEntry.user_id)
+            .having(func.count() > self.max_length)
+        ).all()
+        for batch in itertools.batched(user_ids, batch_size):
+            count = sum(self.trim(user_id, session) for user_id in batch)
+            session.commit()
+            yield count
+
+    def page(self, user_id, limit, cursor=None):
+        """Return `(posts, next_cursor)` for a user's home timeline.
+
+        Reads `limit + 1` rows from the pushed timeline and from each
+        high-fanout followee, then k-way merges them, so the cost depends on
+        the page size and not on how many accounts are followed.
+        """
+        pushed = keyset_select(
+            select(Post)
+            .join(TimelineEntry, TimelineEntry.post_id == Post.id)
+            .where(TimelineEntry.user_id == user_id),
+            TimelineEntry.created_at,
+            TimelineEntry.post_id,
+            limit,
+            cursor,
+        )
+        sources = [db.session.scalars(pushed).all()]
+
+        pulled_authors = db.session.scalars(
+            select(Follow.followee_id).where(
+                Follow.follower_id == user_id, Follow.pulled
+            )
+        ).all()
+        for author_id in pulled_authors:
+            stmt = keyset_select(
+                select(Post).where(Post.user_id == author_id),
+                Post.created_at,
+                Post.id,
+                limit,
+                cursor,
+            )
+            sources.append(db.session.scalars(stmt).all())
+
+        merged = heapq.merge(
+            *sources, key=lambda post: (post.created_at, post.id), reverse=True
+        )
+
+        posts = []
+        seen = set()
+        for post in merged:
+            if post.id in seen:
+                continue
+            seen.add(post.id)
+            posts.append(post)
+            if len(posts) > limit:
+                break
+
+        return split_page(posts, limit)
+
+
+timeline = Timeline()
+
+
+@job()
+def fan_out_post(session, post_id):
+    """`Timeline.fan_out` a new post, off the request that created it"""
+    post = session.execute(
+        select(Post.id, Post.user_id, Post.created_at).where(Post.id == post_id)
+    ).first()
+    if post is None:
+        return  # deleted before the job ran
+    timeline.fan_out(post, session)
@@ -0,0 +1,227 @@
+import hashlib
+import heapq
+import time
+
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+from datetime import UTC
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.dates import timestamp
+from app.extensions import db
+from app.models import PostTag
+from app.snapshot import Snapshot
+
+
+class CountMinSketch:
+    """Approximate counts of strings in `width * depth` counters. An
+    estimate is never below the true count and is above it by at most
+    about `2 / width` of the total added, in all but `1 / 2**depth` of
+    cases.
+    """
+
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.counters = array('q', bytes(8 * width * depth))
+
+    def positions(self, item):
+        # Double hashing, one counter per row, like `BloomFilter`
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, positions, count=1):
+        counters = self.counters
+        for position in positions:
+            counters[position] += count
+
+    def estimate(self, positions):
+        counters = self.counters
+        return min(counters[position] for position in positions)
+
+    def subtract(self, other):
+        counters = self.counters
+        for i, count in enumerate(other.counters):
+            if count:
+                counters[i] -= count
+
+
+class _Window:
+    """Tag counts over the last `window` seconds in `bucket`-second
+    buckets. `total` is the sum of the bucket sketches, kept up to date so
+    an estimate reads one sketch.
+
+    Each candidate keeps the estimate from its last add. Estimates only
+    drop when a bucket leaves the window, so candidates are re-estimated
+    then, and the ranking `top` reads is kept until the next change.
+    """
+
+    def __init__(self, window, bucket, width, depth, capacity):
+        self.window = window
+        self.bucket = bucket
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.total = CountMinSketch(width, depth)
+        self.buckets = deque()  # (start, sketch), oldest first
+        self.candidates = {}  # tag -> estimate when last seen
+        self.heap = []  # (estimate, tag), stale entries skipped lazily
+        self.ranked = []  # candidates by estimate, None once out of date
+
+    def rotate(self, now):
+        """Drop buckets that left the window, start the one `now` is in"""
+        dropped = False
+        while self.buckets and self.buckets[0][0] <= now - self.window:
+            _, sketch = self.buckets.popleft()
+            self.total.subtract(sketch)
+            dropped = True
+        if dropped:
+            self.rescore()
+
+        start = now - now % self.bucket
+        if not self.buckets or self.buckets[-1][0] < start:
+            self.buckets.append((start, CountMinSketch(self.width, self.depth)))
+
+    def add(self, tag, now):
+        self.rotate(now)
+        positions = self.total.positions(tag)
+        self.buckets[-1][1].add(positions)
+        self.total.add(positions)
+        self.offer(tag, self.total.estimate(positions))
+
+    def offer(self, tag, estimate):
+        """Keep `tag` among the `capacity` candidates with the highest
+        estimates, evicting the lowest if full
+        """
+        candidates, heap = self.candidates, self.heap
+        if tag not in candidates and len(candidates) >= self.capacity:
+            while heap[0][0] != candidates.get(heap[0][1]):
+                heapq.heappop(heap)
+            if estimate <= heap[0][0]:
+                return
+            del candidates[heapq.heappop(heap)[1]]
+
+        candidates[tag] = estimate
+        heapq.heappush(heap, (estimate, tag))
+        if len(heap) > 4 * self.capacity:
+            self.heap = [(count, tag) for tag, count in candidates.items()]
+            heapq.heapify(self.heap)
+        self.ranked = None
+
+    def rescore(self):
+        """Re-estimate the candidates, dropping those no longer counted"""
+        estimates = {}
+        for tag in self.candidates:
+            estimate = self.total.estimate(self.total.positions(tag))
+            if estimate > 0:
+                estimates[tag] = estimate
+        self.candidates = estimates
+        self.heap = [(count, tag) for tag, count in estimates.items()]
+        heapq.heapify(self.heap)
+        self.ranked = None
+
+    def top(self, k, now):
+        """The `k` candidates with the highest estimates in the window"""
+        self.rotate(now)
+        if self.ranked is None:
+            self.ranked = sorted(
+                self.candidates.items(), key=lambda item: item[1], reverse=True
+            )
+        return self.ranked[:k]
+
+
+class Trending:
+    """Most used hashtags over the last `TRENDING_WINDOW_SECONDS`.
+
+    Tags are counted into time buckets of `TRENDING_BUCKET_SECONDS`, each a
+    count-min sketch, so memory depends on the sketch size and the window
+    and not on how many distinct tags there are. The `TRENDING_CANDIDATES`
+    tags with the highest estimates are tracked in a min-heap and `top`
+    ranks only those. Each worker counts its own posts and rebuilds from
+    `post_tags` every `TRENDING_REFRESH_SECONDS` to pick up the others'.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('TRENDING_WINDOW_SECONDS', 3600)
+        app.config.setdefault('TRENDING_BUCKET_SECONDS', 300)
+        app.config.setdefault('TRENDING_TOP_K', 10)
+        app.config.setdefault('TRENDING_CANDIDATES', 100)
+        app.config.setdefault('TRENDING_SKETCH_WIDTH', 2048)
+        app.config.setdefault('TRENDING_SKETCH_DEPTH', 4)
+        app.config.setdefault('TRENDING_REFRESH_SECONDS', 300)
+        with app.app_context():
+            app.extensions['trending'] = Snapshot(self._new_window())
+            try:
+                self.warm()
+            except SQLAlchemyError:
+                # No post_tags table yet, e.g. before `flask db upgrade`
+                app.logger.info('Trending tags not warmed at startup')
+
+    @property
+    def state(self):
+        return current_app.extensions['trending']
+
+    @property
+    def stale(self):
+        return self.state.stale(current_app.config['TRENDING_REFRESH_SECONDS'])
+
+    def _new_window(self):
+        config = current_app.config
+        return _Window(
+            config['TRENDING_WINDOW_SECONDS'],
+            config['TRENDING_BUCKET_SECONDS'],
+            config['TRENDING_SKETCH_WIDTH'],
+            config['TRENDING_SKETCH_DEPTH'],
+            config['TRENDING_CANDIDATES'],
+        )
+
+    def warm(self, session=None):
+        """Rebuild the counts from the tags added in the window, by new
+        posts and by edits. Concurrent callers return at once and keep
+        using the current counts.
+        """
+
+        def build():
+            window = self._new_window()
+            since = datetime.now(UTC) - timedelta(seconds=window.window)
+            rows = (session or db.session).execute(
+                select(PostTag.tag, PostTag.tagged_at)
+                .where(PostTag.tagged_at >= since)
+                .order_by(PostTag.tagged_at)
+                .execution_options(yield_per=10000)
+            )
+            for tag, tagged_at in rows:
+                window.add(tag, timestamp(tagged_at))
+            return window
+
+        self.state.rebuild(build, _add)
+
+    def add(self, tags):
+        """Count tags used just now"""
+        now = time.time()
+        self.state.record([(tag, now) for tag in tags], _add)
+
+    def top(self, k=None):
+        """`[(tag, estimated count), ...]`, most used first"""
+        state = self.state
+        k = min(k or current_app.config['TRENDING_TOP_K'], state.value.capacity)
+        with state.lock:
+            return state.value.top(k, time.time())
+
+
+def _add(window, item):
+    tag, now = item
+    window.add(tag, now)
+
+
+trending = Trending()
@@ -0,0 +1,13 @@
+"""ASGI entry point for the async serving mode, e.g.
+
+    uvicorn asgi:app --workers 4
+
+The ASGI server reads request bodies and writes responses on its own event
+loop, so slow clients do not hold a thread while they trickle in. Requests
+then run concurrently on `ASYNC_VIEWS_THREADS` threads, see `AsgiApp`.
+"""
+
+from app import create_app
+from app.aio import AsgiApp
+
+app = AsgiApp(create_app(config={'ASYNC_VIEWS': True}))
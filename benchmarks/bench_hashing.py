@@ -0,0 +1,58 @@
+"""Password hashing throughput.
+
+Reports hashes/sec on a single core and on a process pool, per core, for
+each hash method so PASSWORD_HASH_METHOD and PASSWORD_HASH_WORKERS can be
+tuned for the hardware.
+
+    python -m benchmarks.bench_hashing --count 64 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
+
+METHODS = ['scrypt', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2']
+
+
+def bench_inline(method, count):
+    start = time.perf_counter()
+    for i in range(count):
+        generate_password_hash(f'password{i}', method)
+    return count / (time.perf_counter() - start)
+
+
+def bench_pool(method, count, workers):
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+    ) as pool:
+        # Warm the workers so process start-up is not measured
+        list(pool.map(generate_password_hash, ['warmup'] * workers))
+
+        start = time.perf_counter()
+        passwords = [f'password{i}' for i in range(count)]
+        list(pool.map(generate_password_hash, passwords, [method] * count))
+        return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--method', action='append', dest='methods')
+    args = parser.parse_args()
+
+    print(f'{"method":<24}{"1 core/s":>12}{"pool/s":>12}{"pool/s/core":>14}')
+    for method in args.methods or METHODS:
+        inline = bench_inline(method, args.count)
+        pooled = bench_pool(method, args.count, args.workers)
+        print(
+            f'{method:<24}{inline:>12.1f}{pooled:>12.1f}{pooled / args.workers:>14.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Per-request cost of the /metrics hooks.
+
+Sends `--requests` requests per round to an unrouted path through the
+Flask test client, which does no database work, with metrics `off`, `on`
+and `multiproc` (flushing to a temporary `METRICS_MULTIPROC_DIR`). The
+difference to `off` is what measuring adds to each request, within the
+noise of everything else a request does, so the hooks are also timed on
+their own in a loop. Also times one scrape of /metrics after each round.
+
+    python -m benchmarks.bench_metrics --requests 20000 --rounds 5
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from app import create_app
+from app.metrics import metrics
+
+from .common import save_results
+
+
+def run(app, requests):
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get('/nowhere')
+    elapsed = time.perf_counter() - start
+
+    scrape = None
+    if app.config['METRICS']:
+        start = time.perf_counter()
+        client.get('/metrics')
+        scrape = time.perf_counter() - start
+    return elapsed / requests, scrape
+
+
+def time_hooks(app, requests):
+    """The before, after and teardown hooks alone, per request"""
+    with app.test_request_context('/posts/1'):
+        response = app.response_class('{}', mimetype='application/json')
+        start = time.perf_counter()
+        for _ in range(requests):
+            metrics._start()
+            metrics._observe(response)
+            metrics._finish(None)
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='\n'.join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument('--config', default='test_config.py')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output', default='bench_metrics.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        apps = {
+            'off': create_app(args.config, {'METRICS': False}),
+            'on': create_app(args.config),
+            'multiproc': create_app(args.config, {'METRICS_MULTIPROC_DIR': tmp}),
+        }
+        runs = {mode: [] for mode in apps}
+        hooks = {mode: [] for mode in apps if mode != 'off'}
+        # Interleave the modes so drift in the machine hits them all alike
+        for _ in range(args.rounds):
+            for mode, app in apps.items():
+                runs[mode].append(run(app, args.requests))
+                if mode in hooks:
+                    hooks[mode].append(time_hooks(app, args.requests))
+
+    off = statistics.median(per_request for per_request, _ in runs['off'])
+    results = {}
+    for mode, timings in runs.items():
+        per_request = statistics.median(t for t, _ in timings)
+        results[mode] = {
+            'us_per_request': round(1e6 * per_request, 2),
+            'overhead_us': round(1e6 * (per_request - off), 2),
+        }
+        if mode != 'off':
+            scrape = statistics.median(s for _, s in timings)
+            results[mode]['scrape_ms'] = round(1000 * scrape, 2)
+            results[mode]['hooks_us'] = round(1e6 * statistics.median(hooks[mode]), 2)
+
+    print(f'median of {args.rounds} rounds of {args.requests} requests')
+    print(
+        f'{"mode":<11}{"us/request":>12}{"overhead us":>13}{"hooks us":>10}'
+        f'{"scrape ms":>11}'
+    )
+    for mode, r in results.items():
+        extra = (
+            f'{r["hooks_us"]:>10.2f}{r["scrape_ms"]:>11.2f}'
+            if 'hooks_us' in r
+            else f'{"-":>10}{"-":>11}'
+        )
+        print(f'{mode:<11}{r["us_per_request"]:>12.2f}{r["overhead_us"]:>13.2f}{extra}')
+
+    save_results(
+        args.output,
+        'metrics',
+        results,
+        requests=args.requests,
+        rounds=args.rounds,
+        config=args.config,
+    )
+    print(f'\nSaved results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
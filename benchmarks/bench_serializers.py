@@ -0,0 +1,150 @@
+"""Marshmallow dumps against the compiled serializers.
+
+Serializes pages of in-memory posts and users, no database involved, and
+times each stage separately: `schema.dump`, the compiled dump, and the
+JSON response body from the stdlib and the orjson provider. The last rows
+are the end-to-end cost of a list response before and after.
+
+    python -m benchmarks.bench_serializers --page-size 20 --rounds 2000
+"""
+
+import argparse
+import random
+import time
+
+from datetime import datetime, timedelta, UTC
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.cli.seed import WORDS
+from app.models import Post, User
+from app.schemas import (
+    post_schema,
+    post_serializer,
+    public_user_schema,
+    public_user_serializer,
+)
+from app.serializers import OrjsonProvider
+
+from .common import save_results, summarize
+
+
+# Every column is set, like a row loaded from the database
+def make_posts(rng, count):
+    now = datetime.now(UTC)
+    return [
+        Post(
+            id=i,
+            title=' '.join(rng.choices(WORDS, k=4)),
+            content=' '.join(rng.choices(WORDS, k=40)),
+            user_id=rng.randint(1, 1000),
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def make_users(rng, count):
+    now = datetime.now(UTC)
+    return [
+        User(
+            id=i,
+            username=f'user{i}',
+            email=f'user{i}@example.com',
+            display_name=f'User {i}',
+            bio=' '.join(rng.choices(WORDS, k=12)),
+            profile_picture_url=None,
+            cover_photo_url=None,
+            location=None,
+            website=f'https://example.com/user{i}',
+            follower_count=rng.randint(0, 5000),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(fn, rounds):
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, sum(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='\n'.join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_serializers.json')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    try:
+        fast = OrjsonProvider(app)
+    except ImportError:
+        fast = None
+        print('orjson is not installed, encoding with the stdlib only\n')
+
+    resources = {
+        'posts': (post_schema, post_serializer, make_posts(rng, args.page_size)),
+        'users': (
+            public_user_schema,
+            public_user_serializer,
+            make_users(rng, args.page_size),
+        ),
+    }
+
+    results = {}
+    with app.app_context():
+        for name, (schema, serializer, rows) in resources.items():
+            payload = serializer.dump(rows, many=True)
+            stages = {
+                'marshmallow dump': lambda: schema.dump(rows, many=True),
+                'compiled dump': lambda: serializer.dump(rows, many=True),
+                'stdlib encode': lambda: stdlib.response(payload),
+                'marshmallow + stdlib': lambda: stdlib.response(
+                    schema.dump(rows, many=True)
+                ),
+            }
+            if fast is not None:
+                stages['orjson encode'] = lambda: fast.response(payload)
+                stages['compiled + orjson'] = lambda: fast.response(
+                    serializer.dump(rows, many=True)
+                )
+            results[name] = {
+                stage: measure(fn, args.rounds) for stage, fn in stages.items()
+            }
+
+    print(f'{args.page_size} objects per page')
+    print(f'{"page":<8}{"stage":<24}{"p50 us":>9}{"p95 us":>9}{"p99 us":>9}')
+    for name, stages in results.items():
+        for stage, r in stages.items():
+            print(
+                f'{name:<8}{stage:<24}{1000 * r["p50_ms"]:>9.1f}'
+                f'{1000 * r["p95_ms"]:>9.1f}{1000 * r["p99_ms"]:>9.1f}'
+            )
+
+    save_results(
+        args.output,
+        'serializers',
+        results,
+        page_size=args.page_size,
+        rounds=args.rounds,
+        orjson=fast is not None,
+    )
+    print(f'\nSaved results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Startup cost with the API docs on, prebuilt and off.
+
+Each round starts a fresh interpreter and times `import app`,
+`create_app()`, the first `/health` response and, when docs are on, the
+first `/apispec_1.json`. `docs` builds the spec from docs/**/*.yml on that
+first request, `prebuilt` serves the file `flask docs build` wrote and
+`off` is `API_DOCS = False`.
+
+    python -m benchmarks.bench_startup --rounds 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .common import save_results
+
+PROBE = """
+import json, sys, time
+
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app(sys.argv[1], json.loads(sys.argv[2]))
+created = time.perf_counter()
+client = flask_app.test_client()
+client.get('/health')
+first = time.perf_counter()
+timings = {
+    'import_ms': 1000 * (imported - start),
+    'create_app_ms': 1000 * (created - imported),
+    'first_response_ms': 1000 * (first - created),
+    'flasgger_imported': 'flasgger' in sys.modules,
+}
+if flask_app.config['API_DOCS']:
+    client.get('/apispec_1.json')
+    timings['first_apispec_ms'] = 1000 * (time.perf_counter() - first)
+print(json.dumps(timings))
+"""
+
+
+def probe(config, overrides):
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE, config, json.dumps(overrides)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+BUILD = """
+import json, sys
+import app
+from app.docs import api_docs
+
+flask_app = app.create_app(sys.argv[1], json.loads(sys.argv[2]))
+api_docs.build(flask_app)
+"""
+
+
+def build_spec(config, overrides):
+    # What `flask docs build` does, against the benchmark's config
+    subprocess.run(
+        [sys.executable, '-c', BUILD, config, json.dumps(overrides)],
+        capture_output=True,
+        check=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='\n'.join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument('--config', default='test_config.py')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--output', default='bench_startup.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spec = os.path.join(tmp, 'apispec.json')
+        modes = {
+            'docs': {'API_DOCS': True, 'API_DOCS_SPEC': os.path.join(tmp, 'none')},
+            'prebuilt': {'API_DOCS': True, 'API_DOCS_SPEC': spec},
+            'off': {'API_DOCS': False},
+        }
+        probe(args.config, modes['prebuilt'])  # warm the bytecode cache
+        build_spec(args.config, modes['prebuilt'])
+
+        runs = {mode: [] for mode in modes}
+        # Interleave the modes so drift in the machine hits them all alike
+        for _ in range(args.rounds):
+            for mode, overrides in modes.items():
+                runs[mode].append(probe(args.config, overrides))
+
+    results = {}
+    for mode, timings in runs.items():
+        results[mode] = {
+            key: round(statistics.median(t[key] for t in timings), 2)
+            for key in timings[0]
+            if key.endswith('_ms')
+        }
+        results[mode]['flasgger_imported'] = timings[0]['flasgger_imported']
+
+    print(f'median of {args.rounds} fresh processes, ms')
+    columns = ['import_ms', 'create_app_ms', 'first_response_ms', 'first_apispec_ms']
+    print(f'{"mode":<10}' + ''.join(f'{c[:-3]:>18}' for c in columns))
+    for mode, r in results.items():
+        cells = ''.join(f'{r[c]:>18.1f}' if c in r else f'{"-":>18}' for c in columns)
+        print(f'{mode:<10}{cells}')
+
+    save_results(
+        args.output, 'startup', results, rounds=args.rounds, config=args.config
+    )
+    print(f'\nSaved results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
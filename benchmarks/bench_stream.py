@@ -0,0 +1,188 @@
+"""Idle `/stream` connections held by one worker, and fan-out to them.
+
+Serves the app with the threaded Werkzeug server in this process and
+opens `--connections` idle streams listening to one author, as raw
+sockets. Reports how long opening them took, the worker's resident memory
+and threads per connection, then publishes `--events` posts by the author
+and times each event from publish until every connection has received it.
+
+    python -m benchmarks.bench_stream --connections 100 500 1000
+
+Every connection holds a thread of a threaded WSGI server, so memory per
+thread is what bounds connections per worker. The async serving mode does
+not serve streams. Each
+connection takes two file descriptors here, the open file limit is raised
+to its hard limit.
+"""
+
+import argparse
+import logging
+import os
+import resource
+import selectors
+import socket
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from app.events import events, posts_channel
+from app.extensions import db, Base
+from tests.utils import register_and_login
+
+from .common import save_results, summarize
+
+
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def setup(app):
+    with app.app_context():
+        Base.metadata.drop_all(db.engine)
+        Base.metadata.create_all(db.engine)
+    client = app.test_client()
+    register_and_login(client, 'author', 'author@example.com')
+    return register_and_login(client, 'listener', 'listener@example.com')
+
+
+def connect(port, token):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(
+        f'GET /stream?users=1 HTTP/1.1\r\nHost: localhost\r\n'
+        f'Authorization: Bearer {token}\r\n\r\n'.encode()
+    )
+    received = b''
+    while b': connected\n\n' not in received:
+        received += sock.recv(4096)
+    sock.setblocking(False)
+    return sock
+
+
+def fan_out(app, sockets, count):
+    """Latency from publish until each socket has the event, per event"""
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        selector.register(sock, selectors.EVENT_READ)
+
+    latencies, last = [], []
+    for i in range(count):
+        waiting = set(sockets)
+        start = time.perf_counter()
+        with app.app_context():
+            events.publish(posts_channel(1), 'post_created', {'id': i, 'user_id': 1})
+        while waiting:
+            for key, _ in selector.select(timeout=10):
+                data = key.fileobj.recv(65536)
+                if b'event: post_created' in data and key.fileobj in waiting:
+                    waiting.discard(key.fileobj)
+                    latencies.append(time.perf_counter() - start)
+        last.append(time.perf_counter() - start)
+    selector.close()
+    return latencies, last
+
+
+def run(app, port, token, connections, count):
+    threads, memory = threading.active_count(), rss_kb()
+    start = time.perf_counter()
+    sockets = [connect(port, token) for _ in range(connections)]
+    opened = time.perf_counter() - start
+
+    with app.app_context():
+        assert len(events.hub) == connections
+    result = {
+        'connections': connections,
+        'open_seconds': round(opened, 3),
+        'threads_per_connection': round(
+            (threading.active_count() - threads) / connections, 2
+        ),
+        'rss_kb_per_connection': round((rss_kb() - memory) / connections, 1),
+    }
+
+    latencies, last = fan_out(app, sockets, count)
+    result['delivery'] = summarize(latencies, sum(last))
+    result['all_delivered'] = summarize(last, sum(last))
+
+    for sock in sockets:
+        sock.close()
+    # Each stream notices its closed socket on its next write
+    with app.app_context():
+        events.publish(posts_channel(1), 'post_deleted', {'id': 0, 'user_id': 1})
+    deadline = time.monotonic() + 10
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='\n'.join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument('--config', default='test_config.py')
+    parser.add_argument(
+        '--database-uri',
+        default='sqlite:///bench.db',
+        help='Default engine URI, relative SQLite paths live in instance/',
+    )
+    parser.add_argument('--connections', type=int, nargs='+', default=[100, 400])
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--output', default='bench_stream.json')
+    args = parser.parse_args()
+
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError):
+        pass
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    app = create_app(
+        args.config,
+        {
+            'SQLALCHEMY_ENGINES': {'default': args.database_uri},
+            'STREAM_MAX_CONNECTIONS': max(args.connections),
+            'STREAM_HEARTBEAT_SECONDS': 3600,
+        },
+    )
+    listener = setup(app)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {}
+    for connections in args.connections:
+        results[str(connections)] = run(
+            app, server.server_port, listener, connections, args.events
+        )
+    server.shutdown()
+
+    print(f'{args.events} events fanned out to every idle connection')
+    print(
+        f'{"conns":>7}{"open s":>9}{"threads":>9}{"KB/conn":>9}'
+        f'{"p50 ms":>9}{"p99 ms":>9}{"all p50 ms":>12}'
+    )
+    for r in results.values():
+        print(
+            f'{r["connections"]:>7}{r["open_seconds"]:>9.2f}'
+            f'{r["threads_per_connection"]:>9.2f}{r["rss_kb_per_connection"]:>9.1f}'
+            f'{r["delivery"]["p50_ms"]:>9.2f}{r["delivery"]["p99_ms"]:>9.2f}'
+            f'{r["all_delivered"]["p50_ms"]:>12.2f}'
+        )
+
+    save_results(
+        args.output,
+        'stream',
+        results,
+        events=args.events,
+        config=args.config,
+        database=args.database_uri.split('@')[-1],
+    )
+    print(f'\nSaved results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
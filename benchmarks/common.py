@@ -0,0 +1,86 @@
+"""Helpers shared by the benchmark scripts"""
+
+import contextvars
+import json
+import math
+import subprocess
+import time
+
+from sqlalchemy import event
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed, queries=None):
+    """Latency percentiles in milliseconds plus throughput for one series"""
+    values = sorted(latencies)
+    summary = {
+        'count': len(values),
+        'rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(1000 * sum(values) / len(values), 3) if values else 0.0,
+        'p50_ms': round(1000 * percentile(values, 50), 3),
+        'p95_ms': round(1000 * percentile(values, 95), 3),
+        'p99_ms': round(1000 * percentile(values, 99), 3),
+    }
+    if queries is not None:
+        summary['queries_per_request'] = (
+            round(sum(queries) / len(queries), 2) if queries else 0.0
+        )
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path, name, results, **params):
+    """Write results as JSON with enough metadata to diff two runs"""
+    document = {
+        'benchmark': name,
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'params': params,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return document
+
+
+class QueryCounter:
+    """Counts statements executed on the given engines for the current
+    thread, including by async views the thread is waiting on
+    """
+
+    def __init__(self, engines):
+        self._counter = contextvars.ContextVar('query_counter')
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        counter = self._counter.get(None)
+        if counter is not None:
+            counter[0] += 1
+
+    def reset(self):
+        # Coroutines run in a copy of the context, so share a mutable cell
+        self._counter.set([0])
+
+    @property
+    def count(self):
+        counter = self._counter.get(None)
+        return counter[0] if counter is not None else 0
@@ -0,0 +1,38 @@
+"""users lower identity indexes
+
+Revision ID: 1792472539
+Revises: 1792386139
+Create Date: 2026-10-20 11:02:19.530117
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "1792472539"
+down_revision = "1792386139"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    # Fails if two users differ only in case; merge or rename those first
+    op.create_index(
+        "ix_users_username_lower",
+        "users",
+        [sa.literal_column("lower(username)")],
+        unique=True,
+    )
+    op.create_index(
+        "ix_users_email_lower",
+        "users",
+        [sa.literal_column("lower(email)")],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_users_email_lower", table_name="users")
+    op.drop_index("ix_users_username_lower", table_name="users")
@@ -1,13 +1,16 @@
 import pytest
 
+from contextlib import contextmanager
+
 from app import create_app
 from app.extensions import db, Base
+from app.instrumentation import capture
 
 
-@pytest.fixture()
-def app():
-    """Create application for testing"""
-    app = create_app('test_config.py')
+@pytest.fixture(params=[False, True], ids=['sync', 'async'])
+def app(request):
+    """Create application for testing, once per serving mode"""
+    app = create_app('test_config.py', {'ASYNC_VIEWS': request.param})
 
     with app.app_context():
         engine = db.engine
@@ -27,3 +30,19 @@ def client(app):
 def runner(app):
     """Create test CLI runner"""
     return app.test_cli_runner()
+
+
+@pytest.fixture()
+def query_budget(app):
+    """Assert the statements run inside a `with` block stay within budget"""
+
+    @contextmanager
+    def budget(max_queries):
+        with capture() as stats:
+            yield stats
+        assert stats.count <= max_queries, (
+            f'{stats.count} queries, budget was {max_queries}:\n'
+            + '\n'.join(stats.statements)
+        )
+
+    return budget
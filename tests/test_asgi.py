@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+from app import create_app
+from app.aio import AsgiApp
+
+from tests.utils import asgi_get
+
+
+def test_requests_run_concurrently():
+    app = create_app('test_config.py', {'ASYNC_VIEWS': True})
+
+    @app.get('/slow')
+    async def slow():
+        await asyncio.sleep(0.5)
+        return {}
+
+    asgi = AsgiApp(app)
+
+    async def four():
+        return await asyncio.gather(*(asgi_get(asgi, '/slow') for _ in range(4)))
+
+    start = time.perf_counter()
+    responses = asyncio.run(four())
+    elapsed = time.perf_counter() - start
+
+    assert [status for status, _ in responses] == [200] * 4
+    # One after the other they would take 2s
+    assert elapsed < 1.5
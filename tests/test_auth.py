@@ -1,3 +1,17 @@
+import pytest
+import time
+
+from datetime import datetime, UTC
+from flask_jwt_extended import decode_token
+from sqlalchemy import select
+
+from app.availability import BloomFilter
+from app.extensions import db
+from app.hashing import HasherBusy, hasher
+from app.models import RevokedToken, User
+from app.revocation import denylist
+
+
 def test_register_success(client):
     response = client.post(
         '/auth/register',
@@ -30,3 +44,232 @@ def test_login_success(client):
 
     assert response.status_code == 200
     assert 'access_token' in response.json
+
+
+def test_login_rehashes_outdated_hash(app, client):
+    client.post(
+        '/auth/register',
+        json={
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
+        },
+    )
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    hasher.init_app(app)
+
+    response = client.post(
+        '/auth/login', json={'username': 'testuser', 'password': 'password123'}
+    )
+
+    assert response.status_code == 200
+    user = db.session.scalar(select(User).where(User.username == 'testuser'))
+    assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+
+
+def test_hashing_back_pressure(app, client):
+    state = app.extensions['password_hasher']
+    state.workers = 1
+    state.max_pending = 0
+
+    response = client.post(
+        '/auth/register',
+        json={
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123',
+        },
+    )
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_hashing_on_process_pool(app):
+    state = app.extensions['password_hasher']
+    state.workers = 1
+
+    pwhash = hasher.hash('password123')
+
+    assert hasher.verify(pwhash, 'password123')
+    assert not hasher.verify(pwhash, 'wrong')
+    assert not hasher.needs_rehash(pwhash)
+    assert state.pending == 0
+
+
+def test_hashing_timeout_holds_slot_until_done(app):
+    state = app.extensions['password_hasher']
+    state.workers = 1
+    state.timeout = 0.001
+
+    with pytest.raises(HasherBusy):
+        hasher.hash('password123')
+    # The job still runs in the pool, so it keeps its slot
+    assert state.pending == 1
+    assert state.rejected == 1
+
+    deadline = time.monotonic() + 30
+    while state.pending and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert state.pending == 0
+
+
+def register(client, username='testuser', email='test@example.com'):
+    return client.post(
+        '/auth/register',
+        json={'username': username, 'email': email, 'password': 'password123'},
+    )
+
+
+@pytest.mark.parametrize(
+    'username, email, message',
+    [
+        ('TestUser', 'other@example.com', 'That username already exists'),
+        ('other', 'Test@Example.com', 'That email already exists'),
+    ],
+)
+def test_register_conflict(app, client, username, email, message):
+    register(client)
+
+    response = register(client, username, email)
+    assert response.status_code == 409
+    assert response.json['message'] == message
+
+    # A filter that has not seen the name leaves it to the unique indexes
+    app.extensions['availability'].value = BloomFilter(100, 0.01)
+    response = register(client, username, email)
+    assert response.status_code == 409
+    assert response.json['message'] == message
+
+
+def test_login_ignores_case(client):
+    register(client)
+
+    response = client.post(
+        '/auth/login', json={'email': 'TEST@example.com', 'password': 'password123'}
+    )
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    'url, body, field',
+    [
+        (
+            '/auth/register',
+            {'username': 'testuser', 'email': 'test@example.com'},
+            'password',
+        ),
+        (
+            '/auth/register',
+            {'username': 42, 'email': 'test@example.com', 'password': 'password123'},
+            'username',
+        ),
+        ('/auth/login', {'email': 'test@example.com'}, 'password'),
+        ('/auth/login', {'email': ['test@example.com'], 'password': 'x'}, 'email'),
+        ('/auth/login', {'username': 'testuser', 'password': 123}, 'password'),
+    ],
+)
+def test_auth_rejects_missing_and_non_string_fields(client, url, body, field):
+    response = client.post(url, json=body)
+
+    assert response.status_code == 400
+    assert response.json['message'] == 'Validation failed.'
+    assert field in response.json['errors']
+
+
+def test_auth_rejects_non_object_body(client):
+    for url in ('/auth/register', '/auth/login'):
+        response = client.post(url, json=['password123'])
+        assert response.status_code == 400
+
+
+def test_availability(client, query_budget):
+    register(client)
+
+    response = client.get('/auth/availability?username=TESTUSER&email=new@example.com')
+    assert response.status_code == 200
+    assert response.json['available'] == {'username': False, 'email': True}
+
+    # Names the filter has never seen are answered from memory
+    with query_budget(0):
+        response = client.get('/auth/availability?username=someone-else')
+    assert response.json['available'] == {'username': True}
+
+    assert client.get('/auth/availability').status_code == 400
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f'user{i}')
+
+    assert all(f'user{i}' in bloom for i in range(1000))
+    false_positives = sum(f'other{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def login(client):
+    register(client)
+    response = client.post(
+        '/auth/login', json={'username': 'testuser', 'password': 'password123'}
+    )
+    return response.json['access_token'], response.json['refresh_token']
+
+
+def test_logout_revokes_tokens(client, query_budget):
+    access_token, refresh_token = login(client)
+    headers = {'Authorization': f'Bearer {access_token}'}
+
+    response = client.post(
+        '/auth/logout', headers=headers, json={'refresh_token': refresh_token}
+    )
+    assert response.status_code == 200
+
+    # Checked from memory, without a query
+    with query_budget(0):
+        response = client.get('/users/me', headers=headers)
+    assert response.status_code == 401
+
+    response = client.post(
+        '/auth/refresh', headers={'Authorization': f'Bearer {refresh_token}'}
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_rotates_token(client):
+    _, refresh_token = login(client)
+    headers = {'Authorization': f'Bearer {refresh_token}'}
+
+    response = client.post('/auth/refresh', headers=headers)
+    assert response.status_code == 200
+    rotated = response.json['refresh_token']
+
+    # The old refresh token is spent, the new one works
+    assert client.post('/auth/refresh', headers=headers).status_code == 401
+    response = client.post(
+        '/auth/refresh', headers={'Authorization': f'Bearer {rotated}'}
+    )
+    assert response.status_code == 200
+
+
+def test_denylist_syncs_other_workers_revocations(app, client):
+    access_token, _ = login(client)
+    headers = {'Authorization': f'Bearer {access_token}'}
+    claims = decode_token(access_token)
+
+    # Revoked by another worker: only the table knows
+    db.session.add(
+        RevokedToken(
+            jti=claims['jti'],
+            type='access',
+            user_id=claims['sub'],
+            expires_at=datetime.fromtimestamp(claims['exp'], UTC),
+        )
+    )
+    db.session.commit()
+    assert client.get('/users/me', headers=headers).status_code == 200
+
+    denylist.sync()
+    assert client.get('/users/me', headers=headers).status_code == 401
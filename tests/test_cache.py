@@ -0,0 +1,83 @@
+from app.cache import MemoryCache
+
+from .utils import register_and_login
+
+
+def test_memory_cache_lru_eviction():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats.as_dict() == {'hits': 3, 'misses': 1, 'evictions': 1}
+
+
+def test_memory_cache_ttl():
+    cache = MemoryCache(max_entries=2, ttl=-1)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_memory_cache_many():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set_many({'a': 1, 'b': 2, 'c': 3})
+
+    assert cache.get_many(['a', 'b', 'c']) == [None, 2, 3]
+    assert cache.stats.as_dict() == {'hits': 2, 'misses': 1, 'evictions': 1}
+
+
+def test_get_post_is_cached_and_invalidated(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        'posts/create',
+        headers=headers,
+        json={'title': 'test title', 'content': 'test content'},
+    )
+
+    client.get('/posts/1', headers=headers)
+    client.get('/posts/1', headers=headers)
+    stats = client.get('/cache/stats', headers=headers).json['stats']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+    client.put(
+        '/posts/1/edit',
+        headers=headers,
+        json={'title': 'new title', 'content': 'new content'},
+    )
+    response = client.get('/posts/1', headers=headers)
+    assert response.json['post']['title'] == 'new title'
+
+    client.delete('/posts/1/delete', headers=headers)
+    assert client.get('/posts/1', headers=headers).status_code == 404
+
+
+def test_edit_current_user_invalidates_profile(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.get('/users/1', headers=headers)
+    client.get('/users/me', headers=headers)
+    client.put(
+        '/users/me/edit',
+        headers=headers,
+        json={
+            'display_name': 'Tester',
+            'location': 'USA',
+            'website': 'https://example.com',
+            'profile_picture_url': 'https://example.com/profile_picture',
+            'cover_photo_url': 'https://example.com/cover_photo',
+        },
+    )
+
+    assert client.get('/users/1', headers=headers).json['user']['display_name'] == (
+        'Tester'
+    )
+    assert client.get('/users/me', headers=headers).json['display_name'] == 'Tester'
@@ -0,0 +1,102 @@
+import random
+
+from datetime import datetime, timedelta
+from datetime import UTC
+from sqlalchemy import func, select, update
+
+from app.cli.seed import generate_posts
+
+from app.extensions import db
+from app.models import Follow, Post, RevokedToken, TimelineEntry, User
+
+
+def test_seed_bulk(app, runner):
+    app.config['TIMELINE_MAX_LENGTH'] = 12
+    result = runner.invoke(
+        args=[
+            'seed',
+            'bulk',
+            '--users',
+            '20',
+            '--posts-per-user',
+            '3',
+            '--follows',
+            '5',
+            '--chunk-size',
+            '7',
+            '--timelines',
+        ]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert db.session.scalar(select(func.count()).select_from(User)) == 20
+    assert db.session.scalar(select(func.count()).select_from(Post)) == 60
+    assert db.session.scalar(select(func.count()).select_from(Follow)) == 100
+    assert db.session.scalar(select(func.sum(User.follower_count))) == 100
+    assert db.session.scalar(select(func.sum(User.post_count))) == 60
+    # 5 followees with 3 posts each, cut to 12 per timeline
+    assert db.session.scalar(select(func.count()).select_from(TimelineEntry)) == 240
+    assert not db.session.scalar(
+        select(func.count()).where(Follow.follower_id == Follow.followee_id)
+    )
+
+
+def test_seed_bulk_is_deterministic():
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+
+    first = list(generate_posts(random.Random(7), 1, 10, 5, 1, start))
+    second = list(generate_posts(random.Random(7), 1, 10, 5, 1, start))
+
+    assert first == second
+
+
+def test_tokens_purge(runner):
+    now = datetime.now(UTC)
+    db.session.add_all(
+        [
+            RevokedToken(
+                jti='expired', type='access', user_id=1, expires_at=now - timedelta(1)
+            ),
+            RevokedToken(
+                jti='live', type='access', user_id=1, expires_at=now + timedelta(1)
+            ),
+        ]
+    )
+    db.session.commit()
+
+    result = runner.invoke(args=['tokens', 'purge'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Purged 1 ' in result.output
+    assert db.session.scalars(select(RevokedToken.jti)).all() == ['live']
+
+
+def test_counters_reconcile(runner):
+    runner.invoke(args=['seed', 'bulk', '--users', '10', '--posts-per-user', '2'])
+    expected = dict(db.session.execute(select(User.id, User.post_count)).all())
+    db.session.execute(update(User).where(User.id <= 3).values(post_count=99))
+    db.session.execute(update(User).where(User.id == 9).values(follower_count=-1))
+    db.session.commit()
+
+    result = runner.invoke(args=['counters', 'reconcile', '--batch-size', '4'])
+
+    assert result.exit_code == 0, result.output
+    assert 'for 4 users' in result.output
+    db.session.expire_all()
+    assert dict(db.session.execute(select(User.id, User.post_count)).all()) == expected
+    assert db.session.get(User, 9).follower_count >= 0
+
+    result = runner.invoke(args=['counters', 'reconcile'])
+    assert 'for 0 users' in result.output
+
+
+def test_counters_backfill(runner):
+    runner.invoke(args=['seed', 'bulk', '--users', '5', '--posts-per-user', '3'])
+    db.session.execute(update(User).values(post_count=0))
+    db.session.commit()
+
+    result = runner.invoke(args=['counters', 'backfill'])
+
+    assert result.exit_code == 0, result.output
+    assert 'for 5 users' in result.output
+    assert db.session.scalar(select(func.sum(User.post_count))) == 15
@@ -0,0 +1,113 @@
+from app.cache import NullCache
+
+from .utils import register_and_login
+
+
+def setup_post(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        'posts/create',
+        headers=headers,
+        json={'title': 'test title', 'content': 'test content'},
+    )
+    return headers
+
+
+def test_get_post_etag(client):
+    headers = setup_post(client)
+
+    response = client.get('/posts/1', headers=headers)
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert 'Last-Modified' in response.headers
+
+    response = client.get('/posts/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    client.put(
+        '/posts/1/edit',
+        headers=headers,
+        json={'title': 'new title', 'content': 'new content'},
+    )
+    response = client.get('/posts/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_get_user_etag_follows_post_count(client):
+    headers = setup_post(client)
+    etag = client.get('/users/1', headers=headers).headers['ETag']
+
+    client.post(
+        'posts/create',
+        headers=headers,
+        json={'title': 'second title', 'content': 'second content'},
+    )
+    response = client.get('/users/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json['user']['post_count'] == 2
+
+    etag = response.headers['ETag']
+    client.delete('/posts/2/delete', headers=headers)
+    response = client.get('/users/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['user']['post_count'] == 1
+
+
+def test_get_user_etag_follows_follower_count(client):
+    headers = setup_post(client)
+    bob = register_and_login(client, 'bob', 'bob@example.com')
+    bob_headers = {'Authorization': f'Bearer {bob}'}
+    etag = client.get('/users/1', headers=headers).headers['ETag']
+
+    client.post('/users/1/follow', headers=bob_headers)
+    response = client.get('/users/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['user']['follower_count'] == 1
+
+    etag = response.headers['ETag']
+    client.delete('/users/1/unfollow', headers=bob_headers)
+    response = client.get('/users/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json['user']['follower_count'] == 0
+
+
+def test_get_user_if_modified_since(client):
+    headers = setup_post(client)
+
+    response = client.get('/users/1', headers=headers)
+    last_modified = response.headers['Last-Modified']
+
+    response = client.get(
+        '/users/1', headers={**headers, 'If-Modified-Since': last_modified}
+    )
+    assert response.status_code == 304
+
+
+def test_conditional_get_without_cache(app, client):
+    headers = setup_post(client)
+    etag = client.get('/users/me', headers=headers).headers['ETag']
+    app.extensions['cache'] = NullCache()
+
+    response = client.get('/users/me', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    response = client.get('/users/9', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 404
+
+
+def test_get_user_posts_etag(client):
+    headers = setup_post(client)
+
+    etag = client.get('/posts/user/1', headers=headers).headers['ETag']
+    response = client.get('/posts/user/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    client.delete('/posts/1/delete', headers=headers)
+    response = client.get('/posts/user/1', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
@@ -0,0 +1,66 @@
+import inspect
+import json
+import os
+
+from app import create_app
+
+
+def test_apispec(client):
+    response = client.get('/apispec_1.json')
+
+    assert response.status_code == 200
+    assert '/auth/login' in response.json['paths']
+    assert 'post' in response.json['paths']['/posts/create']
+
+
+def test_docs_off():
+    app = create_app('test_config.py', {'API_DOCS': False})
+    client = app.test_client()
+
+    assert 'swagger' not in app.extensions
+    assert client.get('/apidocs/').status_code == 404
+    assert client.get('/apispec_1.json').status_code == 404
+
+
+def test_docs_build(app, client, runner, tmp_path):
+    app.config['API_DOCS_SPEC'] = str(tmp_path / 'apispec.json')
+
+    result = runner.invoke(args=['docs', 'build'])
+
+    assert result.exit_code == 0, result.output
+    with open(tmp_path / 'apispec.json') as f:
+        built = json.load(f)
+    assert built['apispec_1'] == client.get('/apispec_1.json').json
+
+
+def test_prebuilt_spec_served(app, client, tmp_path):
+    path = tmp_path / 'apispec.json'
+    path.write_text(json.dumps({'apispec_1': {'paths': {'/prebuilt': {}}}}))
+    app.config['API_DOCS_SPEC'] = str(path)
+
+    assert client.get('/apispec_1.json').json == {'paths': {'/prebuilt': {}}}
+
+
+def test_stale_prebuilt_spec_ignored(app, client, tmp_path):
+    path = tmp_path / 'apispec.json'
+    path.write_text(json.dumps({'apispec_1': {'paths': {'/prebuilt': {}}}}))
+    os.utime(path, (0, 0))
+    app.config['API_DOCS_SPEC'] = str(path)
+
+    assert '/prebuilt' not in client.get('/apispec_1.json').json['paths']
+
+
+def test_docs_build_off(runner, app):
+    app.config['API_DOCS'] = False
+
+    result = runner.invoke(args=['docs', 'build'])
+
+    assert result.exit_code != 0
+    assert 'API_DOCS is off' in result.output
+
+
+def test_views_keep_their_kind(app):
+    # Docs are attached as attributes, which survive the async wrapping
+    view = app.view_functions['posts.get_post']
+    assert view.swag_path.endswith('get_post.yml')
+    assert inspect.iscoroutinefunction(view) == app.config['ASYNC_VIEWS']
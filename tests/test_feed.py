@@ -0,0 +1,124 @@
+import pytest
+
+from .utils import register_and_login
+
+
+def create_post(client, token, title):
+    return client.post(
+        'posts/create',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': title, 'content': f'{title} content'},
+    )
+
+
+@pytest.fixture()
+def tokens(client):
+    alice = register_and_login(client, 'alice', 'alice@example.com')
+    bob = register_and_login(client, 'bob', 'bob@example.com')
+    return alice, bob
+
+
+def get_feed_titles(client, token, **query):
+    response = client.get(
+        '/feed', headers={'Authorization': f'Bearer {token}'}, query_string=query
+    )
+    assert response.status_code == 200
+    return [post['title'] for post in response.json['posts']], response.json
+
+
+def test_follow_and_unfollow(client, tokens):
+    alice, _ = tokens
+    headers = {'Authorization': f'Bearer {alice}'}
+
+    assert client.post('/users/2/follow', headers=headers).status_code == 201
+    assert client.post('/users/2/follow', headers=headers).status_code == 409
+    assert client.post('/users/1/follow', headers=headers).status_code == 400
+    assert client.post('/users/42/follow', headers=headers).status_code == 404
+
+    user = client.get('/users/2', headers=headers).json['user']
+    assert user['follower_count'] == 1
+
+    assert client.delete('/users/2/unfollow', headers=headers).status_code == 200
+    assert client.delete('/users/2/unfollow', headers=headers).status_code == 404
+
+    user = client.get('/users/2', headers=headers).json['user']
+    assert user['follower_count'] == 0
+
+
+def test_feed_fan_out_on_write(client, tokens):
+    alice, bob = tokens
+    create_post(client, bob, 'before follow')
+    client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+    create_post(client, bob, 'after follow')
+    create_post(client, alice, 'own post')
+
+    titles, _ = get_feed_titles(client, alice)
+    assert titles == ['own post', 'after follow', 'before follow']
+
+    client.delete('/posts/2/delete', headers={'Authorization': f'Bearer {bob}'})
+    titles, _ = get_feed_titles(client, alice)
+    assert titles == ['own post', 'before follow']
+
+    client.delete('/users/2/unfollow', headers={'Authorization': f'Bearer {alice}'})
+    titles, _ = get_feed_titles(client, alice)
+    assert titles == ['own post']
+
+
+def test_feed_fan_out_on_read(app, client, tokens):
+    alice, bob = tokens
+    app.config['TIMELINE_FANOUT_THRESHOLD'] = 0
+
+    client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+    for i in range(3):
+        create_post(client, bob, f'bob {i}')
+        create_post(client, alice, f'alice {i}')
+
+    titles, page = get_feed_titles(client, alice, limit=4)
+    assert titles == ['alice 2', 'bob 2', 'alice 1', 'bob 1']
+
+    titles, page = get_feed_titles(client, alice, limit=4, cursor=page['next_cursor'])
+    assert titles == ['alice 0', 'bob 0']
+    assert page['next_cursor'] is None
+
+
+def test_follows_keep_their_mode_across_the_threshold(app, client, tokens):
+    alice, bob = tokens
+    carol = register_and_login(client, 'carol', 'carol@example.com')
+    app.config['TIMELINE_FANOUT_THRESHOLD'] = -1  # bob is above it, pulled
+    client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+    app.config['TIMELINE_FANOUT_THRESHOLD'] = 10  # alice is below it, pushed
+    client.post('/users/1/follow', headers={'Authorization': f'Bearer {carol}'})
+    app.config['TIMELINE_FANOUT_THRESHOLD'] = -1  # as if both are now above it
+    create_post(client, bob, 'bob 0')
+    create_post(client, alice, 'alice 0')
+
+    for threshold in (-1, 10):
+        app.config['TIMELINE_FANOUT_THRESHOLD'] = threshold
+        titles, _ = get_feed_titles(client, alice)
+        assert titles == ['alice 0', 'bob 0']
+        titles, _ = get_feed_titles(client, carol)
+        assert titles == ['alice 0']
+
+    create_post(client, bob, 'bob 1')
+    create_post(client, alice, 'alice 1')
+    titles, _ = get_feed_titles(client, alice)
+    assert titles == ['alice 1', 'bob 1', 'alice 0', 'bob 0']
+    titles, _ = get_feed_titles(client, carol)
+    assert titles == ['alice 1', 'alice 0']
+
+
+def test_timelines_are_trimmed_off_the_read_path(app, client, runner, tokens):
+    alice, _ = tokens
+    app.config['TIMELINE_MAX_LENGTH'] = 2
+
+    for i in range(4):
+        create_post(client, alice, f'alice {i}')
+
+    titles, _ = get_feed_titles(client, alice)
+    assert titles == ['alice 3', 'alice 2', 'alice 1', 'alice 0']
+
+    result = runner.invoke(args=['timelines', 'trim'])
+    assert 'Trimmed 2 timeline entries' in result.output
+    titles, _ = get_feed_titles(client, alice)
+    assert titles == ['alice 3', 'alice 2']
+    assert 'Trimmed 0' in runner.invoke(args=['timelines', 'trim']).output
@@ -0,0 +1,60 @@
+import pytest
+
+from app import create_app
+from app.extensions import db
+
+
+def test_health(client):
+    response = client.get('/health')
+
+    assert response.status_code == 200
+    assert response.json['databases'] == {'default': True}
+    pool = response.json['pools']['default']
+    assert pool['class'] == 'TimedQueuePool'
+    assert pool['checked_out'] == 0
+    assert pool['waits'] >= 1
+
+
+@pytest.mark.parametrize(
+    'key, value',
+    [
+        ('SQLALCHEMY_POOL_SIZE', 0),
+        ('SQLALCHEMY_MAX_OVERFLOW', -2),
+        ('SQLALCHEMY_POOL_TIMEOUT', 'soon'),
+        ('SQLALCHEMY_POOL_PRE_PING', 'yes'),
+        ('SQLALCHEMY_STATEMENT_TIMEOUT', -1),
+    ],
+)
+def test_invalid_pool_config(key, value):
+    with pytest.raises(RuntimeError, match=key):
+        create_app('test_config.py', {key: value})
+
+
+def test_postgresql_engine_options():
+    app = create_app(
+        'test_config.py',
+        {
+            'SQLALCHEMY_ENGINES': {'default': 'postgresql+psycopg2://u:p@localhost/db'},
+            'SQLALCHEMY_POOL_SIZE': 7,
+            'SQLALCHEMY_STATEMENT_TIMEOUT': 3000,
+        },
+    )
+
+    options = app.config['SQLALCHEMY_ENGINES']['default']
+    assert options['connect_args']['options'] == '-c statement_timeout=3000'
+    with app.app_context():
+        assert db.engine.pool.size() == 7
+
+
+def test_pgbouncer_mode_skips_startup_options():
+    app = create_app(
+        'test_config.py',
+        {
+            'SQLALCHEMY_ENGINES': {'default': 'postgresql+psycopg2://u:p@localhost/db'},
+            'SQLALCHEMY_STATEMENT_TIMEOUT': 3000,
+            'SQLALCHEMY_PGBOUNCER': True,
+        },
+    )
+
+    connect_args = app.config['SQLALCHEMY_ENGINES']['default']['connect_args']
+    assert 'options' not in connect_args
@@ -0,0 +1,63 @@
+import logging
+
+from app.extensions import db
+from app.models import Post
+
+from .utils import register_and_login
+
+
+def test_server_timing_header(client):
+    token = register_and_login(client)
+
+    response = client.get('/users/1', headers={'Authorization': f'Bearer {token}'})
+
+    timings = response.headers.getlist('Server-Timing')
+    assert timings[0].startswith('db;dur=')
+    assert timings[0].endswith('desc="1 queries"')
+    assert timings[1].startswith('app;dur=')
+
+
+def test_query_budgets(client, query_budget):
+    with query_budget(3):
+        client.post(
+            '/auth/register',
+            json={
+                'username': 'testuser',
+                'email': 'test@example.com',
+                'password': 'password123',
+            },
+        )
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with query_budget(5):
+        client.post(
+            'posts/create', headers=headers, json={'title': 'title', 'content': 'body'}
+        )
+    with query_budget(1):
+        client.get('/posts/1', headers=headers)
+    with query_budget(0):
+        client.get('/posts/1', headers=headers)
+    with query_budget(1):
+        client.get('/posts/user/1', headers=headers)
+
+
+def test_n_plus_one_detection(app, client, caplog):
+    @app.get('/test/n_plus_one')
+    def n_plus_one():
+        for id in range(1, 6):
+            db.session.get(Post, id)
+        return {}
+
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(5):
+        client.post(
+            'posts/create', headers=headers, json={'title': 'title', 'content': 'body'}
+        )
+
+    with caplog.at_level(logging.WARNING, logger='app.sql'):
+        client.get('/test/n_plus_one')
+
+    assert '"event": "n_plus_one"' in caplog.text
+    assert '"times": 5' in caplog.text
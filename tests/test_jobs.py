@@ -0,0 +1,155 @@
+import pytest
+
+from datetime import datetime, timedelta
+from datetime import UTC
+from sqlalchemy import func, select, update
+
+from app.extensions import db
+from app.jobs import job, jobs
+from app.models import Job, TimelineEntry
+from app.timeline import fan_out_post
+
+from .utils import register_and_login
+
+calls = []
+
+
+def utcnow():
+    # What SQLite hands back, naive UTC
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+@job(name='tests.record')
+def record(session, value):
+    calls.append(value)
+
+
+@job(name='tests.record_batch', batch_size=3)
+def record_batch(session, items):
+    calls.append([item['value'] for item in items])
+
+
+@job(name='tests.fail', max_attempts=3)
+def fail(session):
+    raise ValueError('always fails')
+
+
+@pytest.fixture(autouse=True)
+def queued(app):
+    """Queue jobs instead of running them inline"""
+    app.config['JOBS_EAGER'] = False
+    calls.clear()
+
+
+def work(runner):
+    result = runner.invoke(args=['worker', '--burst', '--concurrency', '2'])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_create_post_fans_out_in_a_job(client, runner):
+    alice = register_and_login(client, 'alice', 'alice@example.com')
+    bob = register_and_login(client, 'bob', 'bob@example.com')
+    client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+
+    response = client.post(
+        'posts/create',
+        headers={'Authorization': f'Bearer {bob}'},
+        json={'title': 'queued', 'content': 'queued content'},
+    )
+    assert response.status_code == 201
+    assert jobs.depth()['queued'] == 1
+
+    feed = client.get('/feed', headers={'Authorization': f'Bearer {alice}'})
+    assert feed.json['posts'] == []
+
+    assert 'Processed 1 jobs' in work(runner)
+    feed = client.get('/feed', headers={'Authorization': f'Bearer {alice}'})
+    assert [post['title'] for post in feed.json['posts']] == ['queued']
+    assert not db.session.scalar(select(func.count()).select_from(Job))
+
+
+def test_fan_out_skips_timelines_that_have_the_post(client, runner):
+    alice = register_and_login(client, 'alice', 'alice@example.com')
+    bob = register_and_login(client, 'bob', 'bob@example.com')
+    client.post(
+        'posts/create',
+        headers={'Authorization': f'Bearer {bob}'},
+        json={'title': 'queued', 'content': 'queued content'},
+    )
+    # Backfilled into alice's timeline before the job pushes it
+    client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+
+    assert 'Processed 1 jobs' in work(runner)
+    # As if claimed again after its worker died
+    fan_out_post(db.session, post_id=1)
+    db.session.commit()
+
+    feed = client.get('/feed', headers={'Authorization': f'Bearer {alice}'})
+    assert [post['title'] for post in feed.json['posts']] == ['queued']
+    assert db.session.scalar(select(func.count()).select_from(TimelineEntry)) == 2
+
+
+def test_job_is_only_queued_if_the_transaction_commits(runner):
+    record.delay(value=1)
+    db.session.rollback()
+    record.delay(value=2)
+    db.session.commit()
+
+    work(runner)
+    assert calls == [2]
+
+
+def test_jobs_are_batched_by_name(runner):
+    for value in range(7):
+        record_batch.delay(value=value)
+    record.delay(value='single')
+    db.session.commit()
+
+    assert 'Processed 8 jobs' in work(runner)
+    assert sorted(calls, key=str) == [[0, 1, 2], [3, 4, 5], [6], 'single']
+
+
+def test_failed_job_backs_off_then_fails(app):
+    app.config['JOBS_BACKOFF_SECONDS'] = 60
+    fail.delay()
+    db.session.commit()
+
+    assert jobs.run(jobs.claim()) == 'retried'
+    row = db.session.scalar(select(Job))
+    assert row.state == 'queued'
+    assert 'always fails' in row.last_error
+    assert row.run_at - utcnow() > timedelta(seconds=55)
+    assert jobs.claim() == []  # not due yet
+
+    for attempt, delay in ((2, 120), (3, None)):
+        db.session.execute(update(Job).values(run_at=utcnow()))
+        db.session.commit()
+        rows = jobs.claim()
+        assert rows[0].attempts == attempt
+        jobs.run(rows)
+        db.session.expire_all()
+        if delay:
+            assert row.run_at - utcnow() > timedelta(seconds=delay - 5)
+
+    assert row.state == 'failed'
+    assert jobs.depth() == {
+        'queued': 0,
+        'running': 0,
+        'failed': 1,
+        'lag_seconds': 0,
+    }
+
+
+def test_abandoned_job_is_claimed_again(app):
+    record.delay(value=1)
+    db.session.commit()
+    assert len(jobs.claim()) == 1
+    assert jobs.claim() == []
+
+    db.session.execute(update(Job).values(locked_until=utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    rows = jobs.claim()
+    assert rows[0].attempts == 2
+    assert jobs.run(rows) == 'processed'
+    assert calls == [1]
@@ -0,0 +1,104 @@
+import json
+import subprocess
+import sys
+import threading
+
+from app import create_app
+from app.metrics import _State
+
+from .utils import register_and_login
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    samples = {}
+    for line in response.text.splitlines():
+        if not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            samples[series] = float(value)
+    return samples
+
+
+def test_metrics(client):
+    token = register_and_login(client)
+    client.get('/users/me', headers={'Authorization': f'Bearer {token}'})
+    client.get('/users/me', headers={'Authorization': 'Bearer nonsense'})
+    client.get('/users/me')
+    client.get('/nowhere')
+
+    samples = scrape(client)
+    me = 'endpoint="users.get_current_user"'
+    assert samples[f'http_requests_total{{{me},method="GET",status="200"}}'] == 1
+    assert samples[f'http_requests_total{{{me},method="GET",status="401"}}'] == 1
+    assert samples[f'http_requests_total{{{me},method="GET",status="422"}}'] == 1
+    assert (
+        samples['http_requests_total{endpoint="none",method="GET",status="404"}'] == 1
+    )
+    assert samples[f'http_request_duration_seconds_count{{{me}}}'] == 3
+    assert samples[f'http_request_duration_seconds_bucket{{{me},le="+Inf"}}'] == 3
+    assert samples[f'http_request_duration_seconds_sum{{{me}}}'] > 0
+    assert samples[f'http_response_size_bytes_count{{{me}}}'] == 3
+    assert samples['jwt_failures_total{error="NoAuthorizationError"}'] == 1
+    assert samples['jwt_failures_total{error="DecodeError"}'] == 1
+    assert samples['http_requests_in_flight'] == 1  # the scrape itself
+    assert samples['password_hash_pending'] == 0
+    assert 'password_hash_max_pending' in samples
+    assert samples['jobs{state="queued"}'] == 0
+    assert samples['stream_connections'] == 0
+
+    again = scrape(client)
+    metrics = 'endpoint="metrics.get_metrics",method="GET",status="200"'
+    assert again[f'http_requests_total{{{metrics}}}'] == 1
+
+
+def test_metrics_off(app):
+    app = create_app('test_config.py', {'METRICS': False})
+    assert app.test_client().get('/metrics').status_code == 404
+
+
+def test_metrics_sum_worker_processes(app, tmp_path):
+    # A worker that has exited: its counters still count, its gauges do not
+    pid = subprocess.run(
+        [sys.executable, '-c', 'import os; print(os.getpid())'],
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    series = 'endpoint="health.get_health",method="GET",status="200"'
+    (tmp_path / f'{pid}.json').write_text(
+        json.dumps(
+            {
+                'counters': [['http_requests_total', series, 5]],
+                'gauges': [['http_requests_in_flight', '', 3]],
+                'histograms': [],
+            }
+        )
+    )
+
+    worker = create_app('test_config.py', {'METRICS_MULTIPROC_DIR': str(tmp_path)})
+    client = worker.test_client()
+    client.get('/health')
+
+    samples = scrape(client)
+    assert samples[f'http_requests_total{{{series}}}'] == 6
+    assert samples['http_requests_in_flight'] == 1
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+
+def test_metrics_keep_counts_of_finished_threads():
+    state = _State((0.1, 1), (100,), None)
+
+    def request():
+        state.shard().observe('posts.get_post', 'GET', 200, 0.05, 50)
+
+    for _ in range(100):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+
+    total = state.merged()
+    assert len(state.shards) < 64
+    assert total.requests == {('posts.get_post', 'GET', 200): 100}
+    assert total.latency['posts.get_post'][:3] == [100, 0, 0]
+    assert total.size['posts.get_post'][:2] == [100, 0]
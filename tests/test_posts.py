@@ -1,5 +1,11 @@
 import pytest
 
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.likes import likes
+from app.models import Like, LikeCounter
+
 from .utils import register_and_login
 
 
@@ -108,3 +114,253 @@ def test_edit_post(client, title, content, status_code):
         user = response.json.get('post')
         assert user.get('title') == title
         assert user.get('content') == content
+
+
+def test_get_user_posts_pagination(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    for i in range(5):
+        client.post(
+            'posts/create',
+            headers=headers,
+            json={'title': f'title {i}', 'content': f'content {i}'},
+        )
+
+    titles = []
+    cursor = None
+    while True:
+        query = {'limit': 2}
+        if cursor:
+            query['cursor'] = cursor
+        response = client.get('/posts/user/1', headers=headers, query_string=query)
+        assert response.status_code == 200
+        assert len(response.json['posts']) <= 2
+        titles += [post['title'] for post in response.json['posts']]
+        cursor = response.json['next_cursor']
+        if cursor is None:
+            break
+
+    assert titles == [f'title {i}' for i in reversed(range(5))]
+
+
+def test_get_user_posts_bad_cursor(client):
+    token = register_and_login(client)
+
+    response = client.get(
+        '/posts/user/1',
+        headers={'Authorization': f'Bearer {token}'},
+        query_string={'cursor': 'garbage'},
+    )
+
+    assert response.status_code == 400
+
+
+def test_get_user_posts_unknown_user(client):
+    token = register_and_login(client)
+
+    response = client.get(
+        '/posts/user/42', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == 404
+
+
+def test_get_posts_batch(app, client, query_budget):
+    app.config['BATCH_MAX_IDS'] = 3
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    for title in ('first', 'second'):
+        client.post(
+            'posts/create', headers=headers, json={'title': title, 'content': title}
+        )
+
+    with query_budget(1):
+        response = client.get('/posts/batch?ids=2,3,1', headers=headers)
+
+    assert response.status_code == 200
+    assert [post['title'] for post in response.json['posts']] == ['second', 'first']
+    assert response.json['missing'] == [3]
+
+    etag = response.headers['ETag']
+    response = client.get(
+        '/posts/batch?ids=2,3,1', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == 304
+
+    response = client.get('/posts/batch?ids=1,2,3,4', headers=headers)
+    assert response.status_code == 400
+
+
+def test_search_posts(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    for title, content in [
+        ('Coffee', 'Brewing coffee every morning'),
+        ('Tea time', 'Green tea and a book'),
+        ('Breakfast', 'Toast, eggs and coffee'),
+    ]:
+        client.post(
+            'posts/create', headers=headers, json={'title': title, 'content': content}
+        )
+
+    response = client.get('/posts/search?q=coffee', headers=headers)
+    assert response.status_code == 200
+    # The title match ranks first
+    assert [post['id'] for post in response.json['posts']] == [1, 3]
+
+    # Stemmed, every word must match, query syntax is taken literally
+    response = client.get('/posts/search?q=brewed mornings', headers=headers)
+    assert [post['id'] for post in response.json['posts']] == [1]
+    response = client.get('/posts/search?q="coffee" OR (tea', headers=headers)
+    assert response.status_code == 200
+
+    # Edits and deletes reach the index
+    client.put(
+        '/posts/2/edit',
+        headers=headers,
+        json={'title': 'Coffee break', 'content': 'Now it is coffee'},
+    )
+    client.delete('/posts/1/delete', headers=headers)
+    response = client.get('/posts/search?q=coffee', headers=headers)
+    assert sorted(post['id'] for post in response.json['posts']) == [2, 3]
+
+
+def test_search_posts_pagination(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(5):
+        client.post(
+            'posts/create',
+            headers=headers,
+            json={'title': f'Post {i}', 'content': 'coffee ' * (i + 1)},
+        )
+
+    seen = []
+    url = '/posts/search?q=coffee&limit=2'
+    while url:
+        response = client.get(url, headers=headers)
+        seen += [post['id'] for post in response.json['posts']]
+        cursor = response.json['next_cursor']
+        url = cursor and f'/posts/search?q=coffee&limit=2&cursor={cursor}'
+
+    assert sorted(seen) == [1, 2, 3, 4, 5]
+    assert len(seen) == 5
+
+
+@pytest.mark.parametrize('query', ['', 'q=', 'q=%20!!', 'q=coffee&cursor=bad'])
+def test_search_posts_bad_request(client, query):
+    token = register_and_login(client)
+
+    response = client.get(
+        f'/posts/search?{query}', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 400
+
+
+def test_post_count(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    # Read the profile first, so a stale cached copy would show
+    assert client.get('/users/1', headers=headers).json['user']['post_count'] == 0
+    for title in ('first post', 'second post'):
+        client.post(
+            'posts/create', headers=headers, json={'title': title, 'content': title}
+        )
+    assert client.get('/users/1', headers=headers).json['user']['post_count'] == 2
+
+    response = client.delete('/posts/1/delete', headers=headers)
+
+    assert response.status_code == 200
+    assert client.get('/users/1', headers=headers).json['user']['post_count'] == 1
+
+
+def test_like_post(app, client):
+    token = register_and_login(client)
+    other = register_and_login(client, 'otheruser', 'other@example.com')
+    client.post(
+        'posts/create',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'liked post', 'content': 'liked content'},
+    )
+
+    for t in (token, other):
+        response = client.post(
+            '/posts/1/like', headers={'Authorization': f'Bearer {t}'}
+        )
+        assert response.status_code == 201
+
+    response = client.post(
+        '/posts/1/like', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 409
+
+    response = client.get(
+        '/posts/1/likes', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200
+    assert response.json['likes'] == 2
+    assert response.json['liked'] is True
+
+    response = client.delete(
+        '/posts/1/unlike', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200
+    response = client.delete(
+        '/posts/1/unlike', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 404
+
+    # The count is cached for LIKE_COUNT_MAX_AGE, whether it is liked is not
+    response = client.get(
+        '/posts/1/likes', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.json == {'message': 'Success', 'likes': 2, 'liked': False}
+
+    app.config['LIKE_COUNT_MAX_AGE'] = 0
+    response = client.get(
+        '/posts/1/likes', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.json['likes'] == 1
+
+
+def test_like_counter_shards(app, client):
+    app.config['LIKE_COUNTER_SHARDS'] = 4
+    token = register_and_login(client)
+    client.post(
+        'posts/create',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'liked post', 'content': 'liked content'},
+    )
+    for user_id in range(1, 11):
+        likes.like(1, user_id)
+    likes.unlike(1, 3)
+    db.session.commit()
+
+    shards = db.session.execute(
+        select(LikeCounter.shard, LikeCounter.count).order_by(LikeCounter.shard)
+    ).all()
+    assert shards == [(0, 2), (1, 3), (2, 3), (3, 1)]
+
+
+def test_like_missing_post(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.post('/posts/42/like', headers=headers).status_code == 404
+    assert client.get('/posts/42/likes', headers=headers).status_code == 404
+    assert client.delete('/posts/42/unlike', headers=headers).status_code == 404
+
+
+def test_delete_liked_post(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        'posts/create', headers=headers, json={'title': 'doomed', 'content': 'doomed'}
+    )
+    client.post('/posts/1/like', headers=headers)
+
+    assert client.delete('/posts/1/delete', headers=headers).status_code == 200
+    assert db.session.scalar(select(func.count()).select_from(Like)) == 0
+    assert db.session.scalar(select(func.count()).select_from(LikeCounter)) == 0
@@ -0,0 +1,152 @@
+import json
+import pytest
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from app import create_app
+from app.extensions import db, Base
+from app.models import Post, User
+from app.replicas import STICKY_COOKIE, router
+
+PROFILE = {
+    'display_name': 'Primary',
+    'bio': 'Writes go here',
+    'location': 'USA',
+    'website': 'https://example.com',
+    'profile_picture_url': 'https://example.com/profile_picture',
+    'cover_photo_url': 'https://example.com/cover_photo',
+}
+
+
+@pytest.fixture(params=[False, True], ids=['sync', 'async'])
+def replicated_app(request, tmp_path):
+    """Primary and two replicas as separate SQLite files, once per serving
+    mode. Nothing replicates, so each read shows which file served it.
+    """
+
+    def make(**config):
+        app = create_app(
+            'test_config.py',
+            {
+                'SQLALCHEMY_ENGINES': {
+                    'default': f'sqlite:///{tmp_path / "primary.db"}',
+                    'replica1': f'sqlite:///{tmp_path / "replica1.db"}',
+                    'replica2': f'sqlite:///{tmp_path / "replica2.db"}',
+                },
+                'CACHE_BACKEND': 'null',
+                'ASYNC_VIEWS': request.param,
+                **config,
+            },
+        )
+        with app.app_context():
+            for name, engine in db.engines.items():
+                Base.metadata.create_all(engine)
+                with engine.begin() as conn:
+                    conn.execute(
+                        insert(User).values(
+                            id=1,
+                            username='alice',
+                            email='alice@example.com',
+                            password_hash='hashed',
+                            display_name=name,
+                        )
+                    )
+            token = create_access_token(identity='1')
+            db.session.reset()
+        return app, {'Authorization': f'Bearer {token}'}
+
+    return make
+
+
+def served_by(client, headers):
+    return client.get('/users/1', headers=headers).json['user']['display_name']
+
+
+def test_reads_round_robin_over_replicas(replicated_app):
+    app, headers = replicated_app()
+    client = app.test_client()
+
+    assert [served_by(client, headers) for _ in range(4)] == [
+        'replica1',
+        'replica2',
+        'replica1',
+        'replica2',
+    ]
+
+
+def test_writes_stick_reads_to_primary(replicated_app):
+    app, headers = replicated_app()
+    client = app.test_client()
+
+    response = client.put('/users/me/edit', headers=headers, json=PROFILE)
+    assert response.status_code == 200
+    assert client.get_cookie(STICKY_COOKIE) is not None
+    assert served_by(client, headers) == 'Primary'
+
+    # Once the window has passed, reads go back to the replicas
+    client.set_cookie(STICKY_COOKIE, '0')
+    assert served_by(client, headers).startswith('replica')
+
+    # Other clients never stuck to the primary
+    assert served_by(app.test_client(), headers).startswith('replica')
+
+
+def test_reads_do_not_stick(replicated_app):
+    app, headers = replicated_app()
+    client = app.test_client()
+
+    served_by(client, headers)
+    assert client.get_cookie(STICKY_COOKIE) is None
+
+
+def test_unrouted_views_use_primary(replicated_app):
+    app, headers = replicated_app()
+
+    response = app.test_client().get('/users/me', headers=headers)
+    assert response.json['display_name'] == 'default'
+
+
+def test_streamed_export_reads_replica(replicated_app):
+    app, headers = replicated_app()
+    with app.app_context():
+        with db.get_engine('replica1').begin() as conn:
+            conn.execute(
+                insert(Post).values(
+                    id=1, title='replicated', content='only on replica1', user_id=1
+                )
+            )
+
+    response = app.test_client().get('/users/me/export', headers=headers)
+    lines = [json.loads(line) for line in response.get_data().splitlines()]
+    assert lines[0]['profile']['display_name'] == 'replica1'
+    assert [line['post']['title'] for line in lines[1:]] == ['replicated']
+
+
+def test_least_connections_avoids_busy_replica(replicated_app):
+    app, _ = replicated_app(SQLALCHEMY_REPLICA_SELECTION='least-connections')
+    if app.config['ASYNC_VIEWS']:
+        pytest.skip('async engines only connect from the views loop')
+
+    with app.test_request_context():
+        with db.get_engine('replica1').connect():
+            assert router.choose() is db.get_engine('replica2')
+        with db.get_engine('replica2').connect():
+            assert router.choose() is db.get_engine('replica1')
+
+
+def test_no_replicas_reads_primary(app):
+    with app.test_request_context():
+        assert router.choose() is None
+
+
+@pytest.mark.parametrize(
+    'config, key',
+    [
+        ({'SQLALCHEMY_REPLICAS': ['replica9']}, 'SQLALCHEMY_REPLICAS'),
+        ({'SQLALCHEMY_REPLICA_SELECTION': 'random'}, 'SQLALCHEMY_REPLICA_SELECTION'),
+    ],
+)
+def test_invalid_replica_settings(config, key):
+    with pytest.raises(RuntimeError, match=key):
+        create_app('test_config.py', config)
@@ -0,0 +1,109 @@
+import json
+import pytest
+import sys
+
+from datetime import datetime, UTC
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app
+from app.models import Post, User
+from app.schemas import (
+    post_schema,
+    post_serializer,
+    public_user_schema,
+    public_user_serializer,
+    user_schema,
+    user_serializer,
+)
+from app.serializers import OrjsonProvider
+
+CREATED = datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=UTC)
+
+
+def make_user(**fields):
+    defaults = {
+        'id': 7,
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'display_name': 'Tëst Üser',
+        'bio': None,
+        'follower_count': 3,
+        'created_at': CREATED,
+        'updated_at': datetime(2026, 1, 2, 3, 4, 5),
+    }
+    return User(**defaults | fields)
+
+
+def make_post(**fields):
+    defaults = {
+        'id': 11,
+        'title': 'Hello',
+        'content': 'Some "quoted" content\n',
+        'user_id': 7,
+        'created_at': CREATED,
+        'updated_at': None,
+    }
+    return Post(**defaults | fields)
+
+
+@pytest.mark.parametrize(
+    'schema, serializer, obj',
+    [
+        (post_schema, post_serializer, make_post()),
+        (user_schema, user_serializer, make_user()),
+        (public_user_schema, public_user_serializer, make_user()),
+        # Every column set, so the dump reads the instance dict
+        (
+            user_schema,
+            user_serializer,
+            make_user(
+                bio='Bio',
+                profile_picture_url=None,
+                cover_photo_url=None,
+                location='Somewhere',
+                website='https://example.com',
+            ),
+        ),
+    ],
+    ids=['post', 'user', 'public_user', 'loaded_user'],
+)
+def test_compiled_dump_matches_marshmallow(schema, serializer, obj):
+    assert serializer.source is not None
+
+    # Unsorted, so key order has to match too
+    expected = json.dumps(schema.dump(obj)).encode()
+    assert json.dumps(serializer.dump(obj)).encode() == expected
+    expected = json.dumps(schema.dump([obj, obj], many=True)).encode()
+    assert json.dumps(serializer.dump([obj, obj], many=True)).encode() == expected
+
+
+def test_orjson_response_matches_default():
+    app = Flask(__name__)
+    payload = {
+        'message': 'Success',
+        'posts': post_serializer.dump([make_post(), make_post(id=12)], many=True),
+        'next_cursor': None,
+        'generated_at': CREATED,
+    }
+
+    with app.app_context():
+        fast = OrjsonProvider(app).response(payload).get_data()
+        default = DefaultJSONProvider(app).response(payload).get_data()
+
+    assert fast == default
+
+
+def test_auto_encoder_uses_orjson(app):
+    assert isinstance(app.json, OrjsonProvider)
+    # The default provider would escape it
+    assert app.json.response({'a': 'é'}).get_data() == '{"a":"é"}\n'.encode()
+
+
+def test_auto_encoder_logs_fallback(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+
+    app = create_app('test_config.py')
+
+    assert type(app.json) is DefaultJSONProvider
+    assert 'orjson is not installed' in caplog.text
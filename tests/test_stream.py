@@ -0,0 +1,181 @@
+import json
+import pytest
+
+from werkzeug.test import EnvironBuilder
+
+from app.events import Hub, events, inbox_channel, posts_channel
+
+from .utils import register_and_login
+
+
+@pytest.fixture()
+def tokens(client):
+    alice = register_and_login(client, 'alice', 'alice@example.com')
+    bob = register_and_login(client, 'bob', 'bob@example.com')
+    return alice, bob
+
+
+@pytest.fixture()
+def stream_client(app, client):
+    if app.config['ASYNC_VIEWS']:
+        pytest.skip('/stream is only served in the sync serving mode')
+    return client
+
+
+def open_stream(client, token, **query):
+    response = client.get(
+        '/stream',
+        headers={'Authorization': f'Bearer {token}'},
+        query_string=query,
+        buffered=False,
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    body = iter(response.response)
+    assert next(body) == b': connected\n\n'
+    return response, body
+
+
+def read_events(body):
+    received = []
+    for message in next(body).decode().split('\n\n'):
+        if message.startswith('event: '):
+            event, data = message.split('\n')
+            received.append(
+                (event[len('event: ') :], json.loads(data[len('data: ') :]))
+            )
+    return received
+
+
+def test_writes_publish_events(client, tokens):
+    alice, bob = tokens
+    subscriber = events.hub.subscribe([posts_channel(2), inbox_channel(2)])
+    headers = {'Authorization': f'Bearer {bob}'}
+
+    client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+    client.post(
+        'posts/create', headers=headers, json={'title': 'new', 'content': 'hello world'}
+    )
+    client.put('posts/1/edit', headers=headers, json={'title': 'edited'})
+    client.delete('posts/1/delete', headers=headers)
+
+    received = [frame.split(b'\n')[0] for frame in subscriber.pull(0)]
+    assert received == [
+        b'event: followed',
+        b'event: post_created',
+        b'event: post_edited',
+        b'event: post_deleted',
+    ]
+    events.hub.unsubscribe(subscriber)
+
+
+def test_stream_refused_in_async_mode(app, client, tokens):
+    alice, _ = tokens
+    response = client.get('/stream', headers={'Authorization': f'Bearer {alice}'})
+    assert response.status_code == (501 if app.config['ASYNC_VIEWS'] else 200)
+    response.close()
+
+
+def test_stream_post_events(app, stream_client, tokens):
+    app.config['STREAM_HEARTBEAT_SECONDS'] = 0.1
+    alice, bob = tokens
+    stream_client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+    response, body = open_stream(stream_client, alice)
+    headers = {'Authorization': f'Bearer {bob}'}
+
+    stream_client.post(
+        'posts/create', headers=headers, json={'title': 'new', 'content': 'hello world'}
+    )
+    stream_client.put('posts/1/edit', headers=headers, json={'title': 'edited'})
+    stream_client.delete('posts/1/delete', headers=headers)
+
+    received = read_events(body)
+    assert [event for event, _ in received] == [
+        'post_created',
+        'post_edited',
+        'post_deleted',
+    ]
+    assert received[0][1]['title'] == 'new'
+    assert received[1][1]['title'] == 'edited'
+    assert received[2][1] == {'id': 1, 'user_id': 2}
+    assert next(body) == b': keepalive\n\n'
+
+    response.close()
+    assert len(events.hub) == 0
+
+
+def test_stream_notifications_and_chosen_users(stream_client, tokens):
+    alice, bob = tokens
+    response, body = open_stream(stream_client, bob, users='1')
+
+    stream_client.post('/users/2/follow', headers={'Authorization': f'Bearer {alice}'})
+    stream_client.post(
+        'posts/create',
+        headers={'Authorization': f'Bearer {alice}'},
+        json={'title': 'hello', 'content': 'hello world'},
+    )
+
+    received = read_events(body)
+    assert received[0] == ('followed', {'follower_id': 1})
+    assert received[1][0] == 'post_created'
+    response.close()
+
+
+def test_stream_token_in_query_string(stream_client, tokens):
+    alice, _ = tokens
+    response = stream_client.get('/stream', query_string={'jwt': alice}, buffered=False)
+    assert response.status_code == 200
+    response.close()
+
+    assert stream_client.get('/stream').status_code == 401
+    response = stream_client.get(
+        '/stream',
+        headers={'Authorization': f'Bearer {alice}'},
+        query_string={'users': 'x'},
+    )
+    assert response.status_code == 400
+
+
+def test_unread_stream_releases_its_subscriber(app, stream_client, tokens):
+    alice, _ = tokens
+    environ = EnvironBuilder(
+        path='/stream', headers={'Authorization': f'Bearer {alice}'}
+    ).get_environ()
+    body = app(environ, lambda status, headers: None)
+    assert len(events.hub) == 1
+
+    # Closed before the first chunk, as when the client goes away at once
+    body.close()
+    assert len(events.hub) == 0
+
+
+def test_stream_connection_limit(stream_client, tokens):
+    alice, _ = tokens
+    events.hub.max_subscribers = 1
+    response, _ = open_stream(stream_client, alice)
+
+    full = stream_client.get('/stream', headers={'Authorization': f'Bearer {alice}'})
+    assert full.status_code == 503
+    response.close()
+
+
+def test_hub_evicts_slow_consumers():
+    hub = Hub(buffer_size=2)
+    fast = hub.subscribe([posts_channel(1)])
+    slow = hub.subscribe([posts_channel(1), posts_channel(2)])
+
+    for i in range(3):
+        hub.dispatch(posts_channel(1), b'%d' % i)
+        if i < 2:
+            assert fast.pull(0) == [b'%d' % i]
+
+    assert slow.pull(0) is None
+    assert fast.pull(0) == [b'2']
+    assert len(hub) == 1
+    assert hub.stats.as_dict() == {'published': 3, 'delivered': 5, 'evicted': 1}
+
+    stream = hub.stream(slow, 0)
+    assert next(stream) == b': connected\n\n'
+    assert next(stream).startswith(b'event: evicted')
+    hub.unsubscribe(slow)
+    assert len(hub) == 1
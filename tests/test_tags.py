@@ -0,0 +1,175 @@
+import pytest
+
+from datetime import datetime, timedelta
+from datetime import UTC
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models import Post, PostTag
+from app.tags import extract_tags
+from app.trending import _Window
+
+from .utils import register_and_login
+
+
+@pytest.fixture()
+def headers(client):
+    return {'Authorization': f'Bearer {register_and_login(client)}'}
+
+
+def create_post(client, headers, title, content):
+    response = client.post(
+        'posts/create', headers=headers, json={'title': title, 'content': content}
+    )
+    assert response.status_code == 201
+    return response.json['post']['id']
+
+
+def test_extract_tags():
+    assert extract_tags('Hi #Flask', 'on #python, #flask and #py3!') == [
+        'flask',
+        'python',
+        'py3',
+    ]
+    assert extract_tags('mail a#b, ##double, #' + 'x' * 65, None) == []
+
+
+def test_tag_posts(client, headers):
+    for i in range(5):
+        create_post(client, headers, f'post {i}', f'Post number {i} #Python')
+    create_post(client, headers, 'other', 'Not tagged, python')
+
+    response = client.get(
+        '/tags/PYTHON/posts', headers=headers, query_string={'limit': 3}
+    )
+
+    assert response.status_code == 200
+    assert [p['title'] for p in response.json['posts']] == [
+        'post 4',
+        'post 3',
+        'post 2',
+    ]
+    response = client.get(
+        '/tags/python/posts',
+        headers=headers,
+        query_string={'limit': 3, 'cursor': response.json['next_cursor']},
+    )
+    assert [p['title'] for p in response.json['posts']] == ['post 1', 'post 0']
+    assert response.json['next_cursor'] is None
+
+    response = client.get('/tags/nothing/posts', headers=headers)
+    assert response.json['posts'] == []
+
+
+def test_edit_and_delete_update_tags(client, headers):
+    id = create_post(client, headers, 'tagged', 'about #flask and #python')
+
+    client.put(f'/posts/{id}/edit', headers=headers, json={'content': 'now #rust'})
+    tags = db.session.scalars(select(PostTag.tag).where(PostTag.post_id == id))
+    assert sorted(tags) == ['rust']
+
+    client.delete(f'/posts/{id}/delete', headers=headers)
+    assert db.session.scalars(select(PostTag)).all() == []
+
+
+def test_trending(client, headers):
+    for i in range(3):
+        create_post(client, headers, f'post {i}', '#python #flask' if i else '#python')
+    create_post(client, headers, 'once', '#rust')
+
+    response = client.get('/trending', headers=headers, query_string={'limit': 2})
+
+    assert response.status_code == 200
+    assert response.json['tags'] == [
+        {'tag': 'python', 'count': 3},
+        {'tag': 'flask', 'count': 2},
+    ]
+    assert client.get('/trending?limit=0', headers=headers).status_code == 400
+
+
+def test_trending_warms_from_post_tags(app, client, headers):
+    create_post(client, headers, 'warm', '#python')
+    app.config['TRENDING_REFRESH_SECONDS'] = 0
+    # Another worker's post is only in the table
+    created_at = db.session.scalar(select(PostTag.created_at))
+    db.session.add(PostTag(post_id=1, tag='elsewhere', created_at=created_at))
+    db.session.commit()
+
+    response = client.get('/trending', headers=headers)
+
+    assert {t['tag'] for t in response.json['tags']} == {'python', 'elsewhere'}
+
+
+def test_trending_counts_edits_when_they_happen(app, client, headers):
+    id = create_post(client, headers, 'old', 'Not tagged yet')
+    db.session.execute(
+        update(Post)
+        .where(Post.id == id)
+        .values(created_at=datetime.now(UTC) - timedelta(days=1))
+    )
+    db.session.commit()
+    client.put(f'/posts/{id}/edit', headers=headers, json={'content': 'Now #python'})
+    app.config['TRENDING_REFRESH_SECONDS'] = 0
+
+    # Rebuilt from post_tags, as after a restart
+    response = client.get('/trending', headers=headers)
+
+    assert response.json['tags'] == [{'tag': 'python', 'count': 1}]
+
+
+def test_window_slides():
+    window = _Window(window=60, bucket=10, width=256, depth=4, capacity=10)
+    window.add('old', now=0)
+    window.add('old', now=5)
+    window.add('new', now=30)
+
+    assert window.top(5, now=59) == [('old', 2), ('new', 1)]
+    assert window.top(5, now=60) == [('new', 1)]
+    assert window.top(5, now=95) == []
+
+
+def test_window_reads_rank_without_estimating():
+    window = _Window(window=60, bucket=10, width=256, depth=4, capacity=10)
+    window.add('a', now=0)
+    window.add('a', now=1)
+    window.add('b', now=1)
+    assert window.top(5, now=2) == [('a', 2), ('b', 1)]
+
+    # Until a tag is added or a bucket leaves the window
+    window.total.positions = None
+    assert window.top(1, now=3) == [('a', 2)]
+
+
+def test_window_keeps_heavy_hitters():
+    window = _Window(window=60, bucket=10, width=1024, depth=4, capacity=5)
+    for i in range(1000):
+        window.add(f'tail{i}', now=1)
+        if i % 10 == 0:
+            window.add('heavy', now=1)
+        if i % 20 == 0:
+            window.add('medium', now=1)
+
+    top = window.top(2, now=1)
+
+    assert [tag for tag, _ in top] == ['heavy', 'medium']
+    assert top[0][1] >= 100
+    assert len(window.candidates) <= 5
+
+
+def test_tags_reindex(runner):
+    runner.invoke(args=['seed', 'bulk', '--users', '10', '--posts-per-user', '5'])
+    seeded = db.session.scalars(
+        select(PostTag.tag).order_by(PostTag.post_id, PostTag.tag)
+    ).all()
+    assert seeded
+    db.session.execute(PostTag.__table__.delete())
+    db.session.commit()
+
+    result = runner.invoke(args=['tags', 'reindex', '--batch-size', '7'])
+
+    assert result.exit_code == 0, result.output
+    assert f'Indexed {len(seeded)} ' in result.output
+    reindexed = db.session.scalars(
+        select(PostTag.tag).order_by(PostTag.post_id, PostTag.tag)
+    )
+    assert reindexed.all() == seeded
@@ -1,3 +1,16 @@
+import gzip
+import json
+import tracemalloc
+
+import pytest
+
+from datetime import datetime
+from datetime import UTC
+from sqlalchemy import insert, text
+
+from app.extensions import db
+from app.models import Post
+
 from .utils import register_and_login
 
 
@@ -52,3 +65,162 @@ def test_edit_current_user(client):
         == 'https://example.com/testuser2/profile_picture'
     )
     assert user.get('cover_photo_url') == 'https://example.com/testuser2/cover_photo'
+
+
+def test_edit_current_user_partial(client, query_budget):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.put(
+        '/users/me/edit',
+        headers=headers,
+        json={'bio': 'Bio', 'website': 'https://example.com'},
+    )
+
+    # Load, UPDATE and reload after commit; validation adds no queries
+    with query_budget(3):
+        response = client.put(
+            '/users/me/edit',
+            headers=headers,
+            json={'website': None, 'location': 'Berlin', 'display_name': ''},
+        )
+
+    assert response.status_code == 200
+    user = response.json['user']
+    assert user['website'] is None
+    assert user['location'] == 'Berlin'
+    assert user['bio'] == 'Bio'
+    assert user['display_name'] is None
+
+
+def test_edit_current_user_invalid(client):
+    token = register_and_login(client)
+
+    response = client.put(
+        '/users/me/edit',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'website': 'not a url', 'location': 'NY'},
+    )
+
+    assert response.status_code == 400
+    assert set(response.json['error']) == {'website', 'location'}
+
+
+def test_get_user_hides_private_fields(client):
+    token = register_and_login(client)
+
+    response = client.get('/users/1', headers={'Authorization': f'Bearer {token}'})
+
+    user = response.json.get('user')
+    assert 'email' not in user
+    assert 'password_hash' not in user
+    assert 'posts' not in user
+
+
+def test_get_users_batch(client, query_budget):
+    token = register_and_login(client)
+    register_and_login(client, 'testuser2', 'test2@example.com')
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with query_budget(1):
+        response = client.get('/users/batch?ids=2,99,1,2', headers=headers)
+
+    assert response.status_code == 200
+    assert [user['username'] for user in response.json['users']] == [
+        'testuser2',
+        'testuser',
+    ]
+    assert response.json['missing'] == [99]
+    assert 'email' not in response.json['users'][0]
+
+    # Served from the cache, shared with GET /users/<id>
+    with query_budget(0):
+        client.get('/users/batch?ids=1&ids=2', headers=headers)
+        client.get('/users/1', headers=headers)
+
+
+@pytest.mark.parametrize('ids', ['', 'a,b', ','.join(map(str, range(101)))])
+def test_get_users_batch_bad_ids(client, ids):
+    token = register_and_login(client)
+
+    response = client.get(
+        f'/users/batch?ids={ids}', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 400
+
+
+def test_export_current_user(client):
+    token = register_and_login(client)
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(3):
+        client.post(
+            '/posts/create',
+            headers=headers,
+            json={'title': f'post {i}', 'content': 'exported'},
+        )
+
+    response = client.get('/users/me/export', headers=headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    assert lines[0]['profile']['username'] == 'testuser'
+    assert [line['post']['title'] for line in lines[1:]] == [
+        'post 0',
+        'post 1',
+        'post 2',
+    ]
+
+    response = client.get(
+        '/users/me/export', headers=headers | {'Accept-Encoding': 'gzip'}
+    )
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).splitlines() == [
+        json.dumps(line, separators=(',', ':'), sort_keys=True).encode()
+        for line in lines
+    ]
+
+
+def test_export_memory_is_bounded(app, client):
+    token = register_and_login(client)
+    posts = 100_000
+    now = datetime.now(UTC)
+    # Not searched here, and indexing 100k posts would dominate the test
+    db.session.execute(text('DROP TRIGGER posts_fts_insert'))
+    db.session.execute(
+        insert(Post),
+        [
+            {
+                'title': f'post {i}',
+                'content': 'A post long enough to make the export add up ' * 2,
+                'user_id': 1,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for i in range(posts)
+        ],
+    )
+    db.session.commit()
+
+    response = client.get(
+        '/users/me/export',
+        headers={'Authorization': f'Bearer {token}'},
+        buffered=False,
+    )
+    # Trace the second half only, tracing is slow. Anything kept per post
+    # would still add up to ~12MB there.
+    size = lines = 0
+    try:
+        for chunk in response.response:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+            if lines > posts // 2 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        response.close()
+
+    assert lines == posts + 1
+    assert size > 20 * 1024 * 1024
+    assert peak < 8 * 1024 * 1024, f'peak {peak / 2**20:.1f}MB'
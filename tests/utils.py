@@ -1,16 +1,47 @@
-def register_and_login(client):
+def register_and_login(
+    client, username='testuser', email='test@example.com', password='password123'
+):
     # register and login
     client.post(
         '/auth/register',
         json={
-            'username': 'testuser',
-            'email': 'test@example.com',
-            'password': 'password123',
+            'username': username,
+            'email': email,
+            'password': password,
         },
     )
 
     login_response = client.post(
-        '/auth/login', json={'username': 'testuser', 'password': 'password123'}
+        '/auth/login', json={'username': username, 'password': password}
     )
 
     return login_response.json['access_token']
+
+
+async def asgi_get(app, path, headers=()):
+    """GET `path` from an ASGI app, returns the status and body"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), *headers],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])